@@ -2,10 +2,11 @@
 
 import streamlit as st
 import requests
-import time
+from balance_feed import BalanceFeed  # 세션 간 공유 잔고 스냅샷
 
 # FastAPI 서버 주소
 API_URL = "http://localhost:8000"  # FastAPI 백엔드 주소
+REFRESH_SECONDS = 5  # 잔고 표시 갱신 주기
 
 st.title("📈 Upbit Trade Bot")
 
@@ -16,55 +17,63 @@ if "profit_rate" not in st.session_state:
     st.session_state.profit_rate = 0
 
 
-# 잔고 조회 및 수익률 계산 함수
+# 잔고 피드 (서버 프로세스에 하나, 모든 세션이 같은 스냅샷을 읽음)
+@st.cache_resource
+def get_balance_feed():
+    feed = BalanceFeed(API_URL, interval=REFRESH_SECONDS)
+    feed.start()
+    return feed
+
+
+# 잔고 조회 및 수익률 계산 함수 (네트워크 호출 없이 공유 스냅샷 사용)
 def fetch_balance():
-    try:
-        response = requests.get(f"{API_URL}/balance", timeout=5)
-        response.raise_for_status()  # HTTP 오류 발생 시 예외 발생
-        balances = response.json().get("balances", [])
-        total_balance = sum(
-            float(balance["balance"]) * float(balance.get("avg_buy_price", 1))
-            for balance in balances
-            if balance["currency"] != "KRW"
-        )
-
-        # 초기 잔고 설정 (최초 실행 시)
-        if st.session_state.initial_balance == 0:
-            st.session_state.initial_balance = total_balance
-
-        # 수익률 계산
-        if st.session_state.initial_balance > 0:
-            st.session_state.profit_rate = (
-                (total_balance - st.session_state.initial_balance)
-                / st.session_state.initial_balance
-            ) * 100
-
-        return balances, total_balance
-    except requests.exceptions.ConnectionError:
+    snapshot = get_balance_feed().snapshot(wait=5)
+    if not snapshot["connected"]:
         st.warning("⚠️ 백엔드 서버에 연결할 수 없습니다. 서버가 실행 중인지 확인하세요.")
-    except requests.exceptions.RequestException as e:
-        st.error(f"❌ 요청 중 오류 발생: {e}")
-
-    return [], 0
+    elif snapshot["error"]:
+        st.error(f"❌ 요청 중 오류 발생: {snapshot['error']}")
+    if snapshot["updated_at"] is None:
+        return [], 0
+
+    balances = snapshot["balances"]
+    total_balance = snapshot["total_balance"]
+
+    # 초기 잔고 설정 (최초 실행 시)
+    if st.session_state.initial_balance == 0:
+        st.session_state.initial_balance = total_balance
+
+    # 수익률 계산
+    if st.session_state.initial_balance > 0:
+        st.session_state.profit_rate = (
+            (total_balance - st.session_state.initial_balance)
+            / st.session_state.initial_balance
+        ) * 100
+
+    return balances, total_balance
+
+
+# 잔고 및 수익률 표시 (이 부분만 주기적으로 다시 실행)
+@st.fragment(run_every=REFRESH_SECONDS)
+def balance_section():
+    balances, total_balance = fetch_balance()
+    st.write(f"### 총 자산: {total_balance:,.2f} KRW")
+    st.write(f"### 수익률: {st.session_state.profit_rate:.2f}%")
+
+    if st.button("🔄 수익률 초기화"):
+        st.session_state.initial_balance = total_balance
+        st.session_state.profit_rate = 0
+        st.success("✅ 수익률이 초기화되었습니다!")
+
+    # 잔고 상세 정보
+    if balances:
+        for balance in balances:
+            st.write(
+                f"- {balance['currency']}: {balance['balance']} 개 (평균 매수가: {balance.get('avg_buy_price', 'N/A')} KRW)"
+            )
 
 
-# 잔고 및 수익률 표시
 st.header("💰 잔고 & 수익률")
-balances, total_balance = fetch_balance()
-st.write(f"### 총 자산: {total_balance:,.2f} KRW")
-st.write(f"### 수익률: {st.session_state.profit_rate:.2f}%")
-
-if st.button("🔄 수익률 초기화"):
-    st.session_state.initial_balance = total_balance
-    st.session_state.profit_rate = 0
-    st.success("✅ 수익률이 초기화되었습니다!")
-
-# 잔고 상세 정보
-if balances:
-    for balance in balances:
-        st.write(
-            f"- {balance['currency']}: {balance['balance']} 개 (평균 매수가: {balance.get('avg_buy_price', 'N/A')} KRW)"
-        )
+balance_section()
 
 # 매수 주문 (one-click 버튼)
 st.header("📥 매수 주문 (XRP)")
@@ -76,12 +85,12 @@ xrp_options = [
     ("XRP-2.0", 2.0),
     ("XRP-3.0", 3.0),
 ]
-amount_to_buy = total_balance * 0.1  # 현재 총 자산의 10%를 매수 금액으로 설정
-
 cols = st.columns(len(xrp_options))
 for col, (label, discount) in zip(cols, xrp_options):
     with col:
         if st.button(label):
+            # 현재 총 자산의 10%를 매수 금액으로 설정
+            amount_to_buy = get_balance_feed().snapshot()["total_balance"] * 0.1
             data = {
                 "coin": "XRP",
                 "amount": amount_to_buy,
@@ -90,6 +99,7 @@ for col, (label, discount) in zip(cols, xrp_options):
             try:
                 response = requests.post(f"{API_URL}/buy", json=data, timeout=5)
                 response.raise_for_status()
+                get_balance_feed().refresh()  # 주문 반영된 잔고를 바로 조회
                 st.success(f"✅ {label} 매수 주문 성공!")
             except requests.exceptions.ConnectionError:
                 st.warning(
@@ -127,9 +137,3 @@ with col2:
             )
         except requests.exceptions.RequestException as e:
             st.error(f"❌ 자동 매매 중지 실패! 오류: {e}")
-
-# 10초마다 잔고 자동 업데이트
-while True:
-    time.sleep(5)
-    fetch_balance()
-    st.rerun()
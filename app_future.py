@@ -1,11 +1,19 @@
 import streamlit as st
-import sqlite3
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import ccxt  # 암호화폐 거래소 API 라이브러리
 import numpy as np
+from candle_store import CandleStore  # 로컬 OHLCV 캔들 저장소
+from dashboard_data import DashboardData  # 증분 갱신 대시보드 데이터
+from trading_metrics import (  # 거래 성과 지표 (NumPy)
+    EMPTY_METRICS,
+    closed_trade_metrics,
+    daily_returns,
+    estimate_initial_investment,
+    rolling_sharpe,
+)
 
 # 페이지 설정
 st.set_page_config(
@@ -76,251 +84,188 @@ st.markdown(
 )
 
 
+# 기간 선택 → 최근 일수 (None은 전체 기간)
+TIME_FILTER_DAYS = {
+    "전체": None,
+    "최근 24시간": 1,
+    "최근 7일": 7,
+    "최근 30일": 30,
+    "최근 90일": 90,
+}
+
+
 # SQLite 데이터베이스에서 데이터를 읽는 함수들
-def get_trades_data():
-    # 새로운 연결을 만들어 현재 스레드에서 사용
-    conn = sqlite3.connect("bitcoin_trading.db")
-    query = """
-    SELECT 
-        id, timestamp, action, entry_price, exit_price, amount, leverage, 
-        status, profit_loss, profit_loss_percentage, exit_timestamp
-    FROM trades
-    ORDER BY timestamp DESC
-    """
-    df = pd.read_sql_query(query, conn)
-    conn.close()  # 연결 닫기
-    df["timestamp"] = pd.to_datetime(df["timestamp"])
-    if "exit_timestamp" in df.columns:
-        df["exit_timestamp"] = pd.to_datetime(df["exit_timestamp"])
-    return df
+# (데이터 계층은 세션 간 공유, 변경된 행만 읽어 메모리의 DataFrame에 반영)
+@st.cache_resource
+def get_dashboard_data():
+    return DashboardData("bitcoin_trading.db")
+
+
+def get_trades_data(days=None):
+    return get_dashboard_data().get_trades(days)
 
 
 def get_ai_analysis_data():
-    # 새로운 연결을 만들어 현재 스레드에서 사용
-    conn = sqlite3.connect("bitcoin_trading.db")
-    query = """
-    SELECT 
-        id, timestamp, current_price, direction, 
-        recommended_leverage, reasoning, trade_id
-    FROM ai_analysis
-    ORDER BY timestamp DESC
-    """
-    df = pd.read_sql_query(query, conn)
-    conn.close()  # 연결 닫기
-    df["timestamp"] = pd.to_datetime(df["timestamp"])
-    return df
+    return get_dashboard_data().get_ai_analysis()
 
 
-# 비트코인 가격 데이터 가져오기
+# AI 분석 근거 전체 내용 ("View Full Analysis" 클릭 시에만 조회)
+@st.cache_data(max_entries=100)
+def get_analysis_reasoning(analysis_id):
+    return get_dashboard_data().get_reasoning(analysis_id)
+
+
+# 캔들 저장소 (세션 간 공유, 트레이딩 봇과 같은 DB 파일 사용)
+@st.cache_resource
+def get_candle_store():
+    return CandleStore("bitcoin_trading.db")
+
+
+# 비트코인 가격 데이터 가져오기 (저장된 마지막 캔들 이후만 거래소에 요청)
 @st.cache_data(ttl=3600)  # 1시간 캐시
 def get_bitcoin_price_data(timeframe="1d", limit=90):
     exchange = ccxt.binance()
-    ohlcv = exchange.fetch_ohlcv("BTC/USDT", timeframe, limit=limit)
-    df = pd.DataFrame(
-        ohlcv, columns=["timestamp", "open", "high", "low", "close", "volume"]
-    )
-    df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
-    return df
+    return get_candle_store().get_candles(exchange, "BTC/USDT", timeframe, limit)
 
 
-# 트레이딩 성과 지표 계산 함수
-def calculate_trading_metrics(
-    trades_df, btc_price_df=None, time_filter=None, filter_time=None
-):
-    if trades_df.empty:
-        return {
-            "total_return": 0,
-            "market_return": 0,
-            "sharpe_ratio": 0,
-            "win_rate": 0,
-            "profit_factor": 0,
-            "max_drawdown": 0,
-            "total_trades": 0,
-            "avg_profit_loss": 0,
-            "avg_holding_time": 0,
-        }
+# 이동 샤프 비율 구간 (일)
+ROLLING_SHARPE_DAYS = 30
+
 
-    # 종료된 거래만 필터링
-    closed_trades = trades_df[trades_df["status"] == "CLOSED"]
+# 트레이딩 성과 지표 계산 함수
+# (시간순으로 한 번 정렬한 종료 거래 배열에서 NumPy로 한 번에 계산)
+def calculate_trading_metrics(trades_df, rolling_days=ROLLING_SHARPE_DAYS):
+    closed_trades = trades_df[trades_df["status"] == "CLOSED"].sort_values(
+        "timestamp", kind="stable"
+    )
     if closed_trades.empty:
         return {
-            "total_return": 0,
-            "market_return": 0,
-            "sharpe_ratio": 0,
-            "win_rate": 0,
-            "profit_factor": 0,
-            "max_drawdown": 0,
-            "total_trades": 0,
-            "avg_profit_loss": 0,
-            "avg_holding_time": 0,
+            "metrics": {**EMPTY_METRICS, "avg_holding_time": 0},
+            "first_trade_time": None,
+            "last_trade_time": None,
+            "equity": pd.DataFrame(
+                columns=["timestamp", "cumulative_pl", "balance", "drawdown"]
+            ),
+            "daily": pd.DataFrame(
+                columns=["date", "profit_loss", "return", "rolling_sharpe"]
+            ),
         }
 
-    # 총 수익률 (초기 투자 금액은 추정)
-    total_profit_loss = closed_trades["profit_loss"].sum()
-    # 초기 투자 금액 추정
-    initial_investment = (
-        closed_trades.sort_values("timestamp").head(3)["entry_price"].mean()
-        * closed_trades.sort_values("timestamp").head(3)["amount"].mean()
+    entry_times = closed_trades["timestamp"].to_numpy()
+    exit_times = closed_trades["exit_timestamp"].to_numpy()
+    entry_price = closed_trades["entry_price"].to_numpy(dtype=float)
+    amount = closed_trades["amount"].to_numpy(dtype=float)
+    profit_loss = closed_trades["profit_loss"].to_numpy(dtype=float, na_value=0.0)
+
+    # 수익률, 샤프 비율, 승률, 손익비, 최대 낙폭
+    metrics = closed_trade_metrics(
+        entry_price,
+        amount,
+        profit_loss,
+        closed_trades["profit_loss_percentage"].to_numpy(dtype=float, na_value=0.0),
     )
-    if initial_investment < 100:  # 너무 작은 경우 합리적인 값으로 설정
-        initial_investment = 10000
-    total_return = (total_profit_loss / initial_investment) * 100
-
-    # 시장 수익률 계산 (Buy & Hold 전략)
-    market_return = 0
-    if btc_price_df is not None and not btc_price_df.empty:
-        if time_filter != "전체" and filter_time is not None:
-            # 필터링된 기간에 해당하는 BTC 가격 데이터
-            filtered_btc = btc_price_df[btc_price_df["timestamp"] >= filter_time]
-            if not filtered_btc.empty:
-                start_price = filtered_btc.iloc[0]["close"]
-                end_price = filtered_btc.iloc[-1]["close"]
-                market_return = ((end_price - start_price) / start_price) * 100
-        else:
-            # 거래 기간에 맞춰 BTC 가격 데이터
-            first_trade_time = closed_trades.sort_values("timestamp").iloc[0][
-                "timestamp"
-            ]
-            last_trade_time = closed_trades.sort_values("timestamp").iloc[-1][
-                (
-                    "timestamp"
-                    if "exit_timestamp" not in closed_trades.columns
-                    else "exit_timestamp"
-                )
-            ]
-
-            relevant_btc = btc_price_df[
-                (btc_price_df["timestamp"] >= first_trade_time)
-                & (btc_price_df["timestamp"] <= last_trade_time)
-            ]
-
-            if not relevant_btc.empty:
-                start_price = relevant_btc.iloc[0]["close"]
-                end_price = relevant_btc.iloc[-1]["close"]
-                market_return = ((end_price - start_price) / start_price) * 100
 
-    # 승률
-    winning_trades = len(closed_trades[closed_trades["profit_loss"] > 0])
-    total_trades = len(closed_trades)
-    win_rate = (winning_trades / total_trades) * 100 if total_trades > 0 else 0
+    # 평균 보유 시간 (청산 시간이 있는 거래만)
+    has_exit = ~np.isnat(exit_times)
+    holding_hours = (exit_times[has_exit] - entry_times[has_exit]) / np.timedelta64(1, "h")
+    metrics["avg_holding_time"] = (
+        float(holding_hours.mean()) if holding_hours.size else 0
+    )
 
-    # 손익비 (Profit Factor)
-    total_profit = closed_trades[closed_trades["profit_loss"] > 0]["profit_loss"].sum()
-    total_loss = abs(
-        closed_trades[closed_trades["profit_loss"] < 0]["profit_loss"].sum()
+    # 거래별 잔고 곡선 (계좌 잔고 기준 낙폭)
+    initial_investment = estimate_initial_investment(entry_price, amount)
+    cumulative_pl = np.cumsum(profit_loss)
+    balances = initial_investment + cumulative_pl
+    peak_balances = np.maximum.accumulate(balances)
+    equity = pd.DataFrame(
+        {
+            "timestamp": entry_times,
+            "cumulative_pl": cumulative_pl,
+            "balance": balances,
+            "drawdown": (peak_balances - balances) / peak_balances * 100,
+        }
     )
-    profit_factor = total_profit / total_loss if total_loss > 0 else 0
-
-    # 최대 낙폭 (Maximum Drawdown) - 계좌 잔고 기준으로 변경
-    closed_trades_sorted = closed_trades.sort_values("timestamp")
-
-    # 계좌 잔고 추적 - 초기 계좌 잔고를 initial_investment로 설정
-    account_balance = initial_investment
-    balances = []
-
-    # 각 거래 후의 계좌 잔고 계산
-    for _, trade in closed_trades_sorted.iterrows():
-        account_balance += trade["profit_loss"]  # 이익/손실 반영
-        balances.append(account_balance)
-
-    if balances:
-        # NumPy 배열로 변환
-        balances = np.array(balances)
-        # 각 시점까지의 최고 잔고
-        peak_balances = np.maximum.accumulate(balances)
-        # 각 시점의 드로다운 계산 (최고 잔고 대비 현재 잔고의 하락률)
-        drawdowns = (peak_balances - balances) / peak_balances
-        # 최대 드로다운
-        max_drawdown = np.max(drawdowns) * 100 if drawdowns.size > 0 else 0
-    else:
-        max_drawdown = 0
 
-    # 샤프 비율 (일일 수익률 기반)
-    if "profit_loss_percentage" in closed_trades.columns and len(closed_trades) > 1:
-        returns = closed_trades["profit_loss_percentage"] / 100  # 비율로 변환
-        sharpe_ratio = (
-            (returns.mean() / returns.std()) * np.sqrt(365) if returns.std() > 0 else 0
-        )
-    else:
-        sharpe_ratio = 0
-
-    # 평균 손익
-    avg_profit_loss = closed_trades["profit_loss"].mean()
-
-    # 평균 보유 시간
-    if (
-        "exit_timestamp" in closed_trades.columns
-        and "timestamp" in closed_trades.columns
-    ):
-        # timestamp와 exit_timestamp가 모두 datetime인지 확인
-        valid_timestamps = closed_trades.dropna(subset=["exit_timestamp"])
-        if not valid_timestamps.empty:
-            holding_times = (
-                valid_timestamps["exit_timestamp"] - valid_timestamps["timestamp"]
-            ).dt.total_seconds() / 3600  # 시간 단위
-            avg_holding_time = holding_times.mean()
-        else:
-            avg_holding_time = 0
-    else:
-        avg_holding_time = 0
+    # 일별 수익률과 이동 샤프 비율 (손익은 청산일 기준)
+    realized_times = np.where(has_exit, exit_times, entry_times)
+    dates, daily_pl, returns = daily_returns(
+        realized_times.astype("datetime64[D]"), profit_loss, initial_investment
+    )
+    daily = pd.DataFrame(
+        {
+            "date": dates,
+            "profit_loss": daily_pl,
+            "return": returns * 100,
+            "rolling_sharpe": rolling_sharpe(returns, rolling_days),
+        }
+    )
 
     return {
-        "total_return": total_return,
-        "market_return": market_return,
-        "sharpe_ratio": sharpe_ratio,
-        "win_rate": win_rate,
-        "profit_factor": profit_factor,
-        "max_drawdown": max_drawdown,
-        "total_trades": total_trades,
-        "avg_profit_loss": avg_profit_loss,
-        "avg_holding_time": avg_holding_time,
+        "metrics": metrics,
+        "first_trade_time": entry_times[0],
+        "last_trade_time": realized_times[-1],
+        "equity": equity,
+        "daily": daily,
     }
 
 
-try:
-    # 데이터 로드
-    trades_df = get_trades_data()
-    ai_analysis_df = get_ai_analysis_data()
-    btc_price_df = get_bitcoin_price_data()
+# 데이터 버전과 기간별로 계산 결과 재사용 (거래 DataFrame은 해시하지 않음)
+@st.cache_data(max_entries=32)
+def get_trading_performance(data_version, time_filter, trade_count, _trades_df):
+    return calculate_trading_metrics(_trades_df)
+
+
+# 시장 수익률 계산 (Buy & Hold 전략)
+def calculate_market_return(btc_price_df, performance, filter_time=None):
+    if btc_price_df is None or btc_price_df.empty:
+        return 0
+    if performance["first_trade_time"] is None:
+        return 0
+    if filter_time is not None:
+        # 필터링된 기간에 해당하는 BTC 가격 데이터
+        relevant_btc = btc_price_df[btc_price_df["timestamp"] >= filter_time]
+    else:
+        # 거래 기간에 맞춰 BTC 가격 데이터
+        relevant_btc = btc_price_df[
+            (btc_price_df["timestamp"] >= performance["first_trade_time"])
+            & (btc_price_df["timestamp"] <= performance["last_trade_time"])
+        ]
+    if relevant_btc.empty:
+        return 0
+    start_price = relevant_btc["close"].iloc[0]
+    end_price = relevant_btc["close"].iloc[-1]
+    return ((end_price - start_price) / start_price) * 100
 
+try:
     # 시간 필터
     st.sidebar.title("Bitcoin Trading Bot")
-    time_filter = st.sidebar.selectbox(
-        "기간 선택:", ["전체", "최근 24시간", "최근 7일", "최근 30일", "최근 90일"]
-    )
+    time_filter = st.sidebar.selectbox("기간 선택:", list(TIME_FILTER_DAYS))
 
-    # 시간 필터 적용
+    # 시간 필터 적용 (기간 안의 거래만 SQL에서 조회)
     now = datetime.now()
-    if time_filter == "최근 24시간":
-        filter_time = now - timedelta(days=1)
-        filtered_trades = trades_df[trades_df["timestamp"] > filter_time]
-        chart_days = 1
-    elif time_filter == "최근 7일":
-        filter_time = now - timedelta(days=7)
-        filtered_trades = trades_df[trades_df["timestamp"] > filter_time]
-        chart_days = 7
-    elif time_filter == "최근 30일":
-        filter_time = now - timedelta(days=30)
-        filtered_trades = trades_df[trades_df["timestamp"] > filter_time]
-        chart_days = 30
-    elif time_filter == "최근 90일":
-        filter_time = now - timedelta(days=90)
-        filtered_trades = trades_df[trades_df["timestamp"] > filter_time]
-        chart_days = 90
-    else:
-        filtered_trades = trades_df
-        filter_time = None
-        chart_days = 90
+    filter_days = TIME_FILTER_DAYS[time_filter]
+    filter_time = None if filter_days is None else now - timedelta(days=filter_days)
+    chart_days = filter_days or 90
+
+    # 데이터 로드
+    filtered_trades = get_trades_data(filter_days)
+    ai_analysis_df = get_ai_analysis_data()
+    btc_price_df = get_bitcoin_price_data()
 
     # 트레이딩 지표 계산
-    metrics = calculate_trading_metrics(
-        filtered_trades, btc_price_df, time_filter, filter_time
+    performance = get_trading_performance(
+        get_dashboard_data().version, time_filter, len(filtered_trades), filtered_trades
     )
+    metrics = {
+        **performance["metrics"],
+        "market_return": calculate_market_return(
+            btc_price_df, performance, filter_time
+        ),
+    }
 
     # 현재 오픈 포지션
-    open_trades = trades_df[trades_df["status"] == "OPEN"]
-    has_open_position = len(open_trades) > 0
-    current_position = open_trades.iloc[0] if has_open_position else None
+    current_position = get_dashboard_data().get_open_trade()
+    has_open_position = current_position is not None
 
     # 현재 BTC 가격
     current_btc_price = (
@@ -534,14 +479,11 @@ try:
     chart_cols = st.columns(2)
 
     with chart_cols[0]:
-        closed_trades = filtered_trades[filtered_trades["status"] == "CLOSED"]
-        if not closed_trades.empty:
+        equity = performance["equity"]
+        if not equity.empty:
             # 누적 수익 차트
-            trades_sorted = closed_trades.sort_values("timestamp")
-            trades_sorted["cumulative_pl"] = trades_sorted["profit_loss"].cumsum()
-
             fig = px.line(
-                trades_sorted,
+                equity,
                 x="timestamp",
                 y="cumulative_pl",
                 title="Cumulative Profit/Loss",
@@ -553,11 +495,10 @@ try:
             st.info("No closed trades to display.")
 
     with chart_cols[1]:
-        total_trades = len(closed_trades)
+        total_trades = metrics["total_trades"]
         if total_trades > 0:
             # 거래 결정 분포
-            decisions = filtered_trades["action"].value_counts().reset_index()
-            decisions.columns = ["Direction", "Count"]
+            decisions = get_dashboard_data().get_direction_counts(filter_days)
 
             fig = px.pie(
                 decisions,
@@ -572,6 +513,38 @@ try:
         else:
             st.info("No trades to display.")
 
+    # 일별 수익률 / 이동 샤프 비율 차트
+    daily = performance["daily"]
+    if not daily.empty:
+        daily_cols = st.columns(2)
+        with daily_cols[0]:
+            fig = px.bar(
+                daily,
+                x="date",
+                y="return",
+                title="Daily Returns",
+                labels={"date": "Date", "return": "Return (%)"},
+                color=np.where(daily["return"] >= 0, "gain", "loss"),
+                color_discrete_map={"gain": "#00CC96", "loss": "#EF553B"},
+            )
+            fig.update_layout(height=400, showlegend=False)
+            st.plotly_chart(fig, use_container_width=True)
+        with daily_cols[1]:
+            if daily["rolling_sharpe"].notna().any():
+                fig = px.line(
+                    daily,
+                    x="date",
+                    y="rolling_sharpe",
+                    title=f"Rolling Sharpe Ratio ({ROLLING_SHARPE_DAYS}d)",
+                    labels={"date": "Date", "rolling_sharpe": "Sharpe"},
+                )
+                fig.update_layout(height=400)
+                st.plotly_chart(fig, use_container_width=True)
+            else:
+                st.info(
+                    f"Rolling Sharpe needs at least {ROLLING_SHARPE_DAYS} days of trades."
+                )
+
     # 거래 내역
     st.markdown("<h2 class='subheader'>Recent Trades</h2>", unsafe_allow_html=True)
     if not filtered_trades.empty:
@@ -669,16 +642,16 @@ try:
 
         with analysis_cols[1]:
             st.markdown("### Analysis Reasoning")
-            # 분석 내용 일부만 표시
+            # 분석 내용 일부만 표시 (전체 내용은 버튼 클릭 시 조회)
             reasoning_preview = (
-                latest_analysis["reasoning"][:200] + "..."
-                if len(latest_analysis["reasoning"]) > 200
-                else latest_analysis["reasoning"]
+                latest_analysis["reasoning_preview"] + "..."
+                if latest_analysis["reasoning_length"] > 200
+                else latest_analysis["reasoning_preview"]
             )
             st.write(reasoning_preview)
 
             if st.button("View Full Analysis"):
-                st.write(latest_analysis["reasoning"])
+                st.write(get_analysis_reasoning(int(latest_analysis["id"])))
     else:
         st.info("No AI analysis data available.")
 
@@ -0,0 +1,276 @@
+"""
+비동기 거래 실행 엔진
+--------------------------------------------------------
+기능:
+- ccxt.async_support와 AsyncOpenAI로 서로 독립적인 단계를 동시에 실행
+  - AI 결정을 기다리는 동안 잔액 조회 및 마켓 정보 로드
+  - AI 응답을 스트리밍으로 받아 주문 필드가 도착하면 reasoning을 기다리지 않고 결정
+  - 잘못된 응답은 자동 복구 후 안 되면 오류 내용을 알려 즉시 다시 요청
+  - 진입/스탑로스/테이크프로핏 주문을 하나의 배치 요청으로 제출 (order_execution)
+- 하나의 작업이 실패하거나 시간 초과되면 나머지 작업을 취소 (구조적 취소)
+- 동기식 메인 루프에서 run()으로 호출 (엔진 전용 이벤트 루프 하나를 계속 사용)
+- AI 요청/응답 기록, 재생 모드에서는 AI API 네트워크 호출 없음 (llm_recorder)
+--------------------------------------------------------
+"""
+
+import asyncio  # 비동기 실행
+import time  # 단계별 소요 시간 측정
+import ccxt.async_support as ccxt_async  # 비동기 거래소 API
+from openai import AsyncOpenAI  # 비동기 OpenAI API
+from decision_parser import (  # AI 결정 파싱/검증
+    DECISION_FIELDS,
+    DecisionError,
+    IncrementalDecisionParser,
+    parse_decision,
+    validate_decision,
+)
+from llm_recorder import RecordingChatClient  # AI 요청/응답 기록 및 재생
+from order_execution import submit_bracket  # 브래킷 주문 배치 제출/롤백
+
+LLM_TIMEOUT = 180  # AI 응답 최대 대기 시간 (초)
+REASK_TIMEOUT = 60  # 잘못된 응답 재요청 최대 대기 시간 (초)
+PREFETCH_TIMEOUT = 15  # 잔액/마켓 정보 조회 최대 대기 시간 (초)
+ORDER_TIMEOUT_MS = 10000  # 주문 HTTP 요청 시간 제한 (ccxt timeout, ms)
+
+
+async def gather_or_cancel(*awaitables, timeout=None):
+    """
+    여러 작업을 동시에 실행하고 모든 결과를 순서대로 반환합니다
+
+    하나라도 예외가 발생하거나 timeout(초)을 넘기면 남은 작업을 모두 취소하고
+    취소가 끝난 뒤 예외를 다시 발생시킵니다.
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in awaitables]
+    try:
+        return await asyncio.wait_for(asyncio.gather(*tasks), timeout)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+class AsyncTradingEngine:
+    """
+    비동기 거래소/AI 클라이언트를 가진 실행 엔진
+
+    주문은 이미 거래소에 전송된 뒤 로컬에서 취소해도 되돌릴 수 없으므로
+    주문 단계에는 asyncio 시간 제한 대신 ccxt 요청 timeout을 사용합니다.
+    """
+
+    def __init__(self, api_key, secret, symbol, model="o3-mini", recorder=None):
+        """
+        매개변수:
+            api_key (str): 바이낸스 API 키
+            secret (str): 바이낸스 시크릿 키
+            symbol (str): 거래 페어
+            model (str): OpenAI 모델 이름
+            recorder (LLMRecorder, optional): AI 요청/응답 기록/재생 저장소
+        """
+        self.api_key = api_key
+        self.secret = secret
+        self.symbol = symbol
+        self.model = model
+        self.recorder = recorder
+        self.loop = asyncio.new_event_loop()
+        self.exchange = None  # 이벤트 루프 안에서 생성
+        self.client = None
+        self.last_response_text = ""  # 마지막 AI 응답 원문 (디버깅용)
+        self._messages = None  # 진행 중인 결정 요청 메시지
+        self._stream_task = None  # reasoning까지 받는 스트리밍 작업
+        self.timings = {}  # 마지막 실행의 단계별 소요 시간 (초)
+
+    def run(self, coro):
+        """동기 코드에서 코루틴을 실행하고 결과를 반환합니다"""
+        return self.loop.run_until_complete(coro)
+
+    def close(self):
+        """거래소 세션과 이벤트 루프를 닫습니다"""
+        if self.exchange is not None:
+            self.run(self.exchange.close())
+        self.loop.close()
+
+    async def _ensure_clients(self):
+        if self.exchange is None:
+            self.exchange = ccxt_async.binance(
+                {
+                    "apiKey": self.api_key,
+                    "secret": self.secret,
+                    "enableRateLimit": True,
+                    "timeout": ORDER_TIMEOUT_MS,
+                    "options": {
+                        "defaultType": "future",
+                        "adjustForTimeDifference": True,
+                    },
+                }
+            )
+        if self.client is None:
+            if self.recorder is None:
+                self.client = AsyncOpenAI()
+            elif self.recorder.mode == "replay":
+                self.client = RecordingChatClient(self.recorder)  # AI API 연결 없음
+            else:
+                self.client = RecordingChatClient(self.recorder, AsyncOpenAI())
+
+    async def _consume_stream(self, parser, early):
+        stream = await self.client.chat.completions.create(
+            model=self.model, messages=self._messages, stream=True
+        )
+        async for chunk in stream:
+            if not chunk.choices or not chunk.choices[0].delta.content:
+                continue
+            parser.feed(chunk.choices[0].delta.content)
+            if not early.done() and parser.has_fields(DECISION_FIELDS):
+                early.set_result(dict(parser.fields))
+        self.last_response_text = parser.text
+        return parser.text
+
+    async def _reask(self, bad_text, error):
+        """오류 내용을 알려주고 올바른 JSON 객체만 다시 요청합니다"""
+        print(f"AI 응답 오류, 재요청: {error}")
+        response = await asyncio.wait_for(
+            self.client.chat.completions.create(
+                model=self.model,
+                messages=self._messages
+                + [
+                    {"role": "assistant", "content": bad_text},
+                    {
+                        "role": "user",
+                        "content": f"Your response was invalid: {error}. "
+                        "Return ONLY the corrected raw JSON object with the 6 required fields.",
+                    },
+                ],
+            ),
+            REASK_TIMEOUT,
+        )
+        self.last_response_text = response.choices[0].message.content
+        return parse_decision(self.last_response_text)
+
+    async def _parse_or_reask(self, text):
+        try:
+            return parse_decision(text)
+        except DecisionError as e:
+            return await self._reask(text, e)
+
+    async def request_decision(self, system_prompt, user_message):
+        """
+        AI에 트레이딩 결정을 스트리밍으로 요청합니다
+
+        주문에 필요한 5개 필드가 도착해 검증되면 reasoning을 기다리지 않고 반환합니다.
+        이 경우 스트리밍은 계속되며 finish_reasoning()으로 나머지를 받습니다.
+        응답이 잘못되었으면 복구를 시도하고, 실패하면 한 번 다시 요청합니다.
+
+        반환값:
+            dict: 검증된 결정 (조기 반환 시 reasoning 없음)
+
+        예외:
+            DecisionError: 재요청 후에도 올바른 결정이 아닐 때
+        """
+        if self._stream_task is not None:
+            self._stream_task.cancel()  # 이전 주기에서 마치지 못한 스트리밍 정리
+        self._messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_message},
+        ]
+        parser = IncrementalDecisionParser()
+        early = asyncio.get_running_loop().create_future()
+        self._stream_task = asyncio.ensure_future(
+            asyncio.wait_for(self._consume_stream(parser, early), LLM_TIMEOUT)
+        )
+        try:
+            await asyncio.wait(
+                {early, self._stream_task}, return_when=asyncio.FIRST_COMPLETED
+            )
+            if early.done():
+                try:
+                    return validate_decision(early.result(), require_reasoning=False)
+                except DecisionError:
+                    pass  # 전체 응답을 받아 복구/재요청
+            decision = await self._parse_or_reask(await self._stream_task)
+        except BaseException:
+            self._stream_task.cancel()
+            raise
+        self._stream_task = None
+        return decision
+
+    async def finish_reasoning(self):
+        """
+        조기 반환 이후 계속 받던 응답을 마저 받아 reasoning을 반환합니다
+
+        스트리밍 도중 연결이 끊기거나 시간 초과되면 빈 문자열을 반환합니다.
+        """
+        task, self._stream_task = self._stream_task, None
+        if task is None:
+            return ""
+        try:
+            text = await task
+        except Exception as e:
+            print(f"AI 응답 스트리밍 중단: {e}")
+            return ""
+        try:
+            return parse_decision(text)["reasoning"]
+        except DecisionError:
+            parser = IncrementalDecisionParser()
+            parser.feed(text)
+            return str(parser.fields.get("reasoning", ""))
+
+    async def _prefetch(self):
+        balance, _ = await gather_or_cancel(
+            self.exchange.fetch_balance(),
+            self.exchange.load_markets(),
+            timeout=PREFETCH_TIMEOUT,
+        )
+        return balance
+
+    async def decide_with_prefetch(self, system_prompt, user_message, request_llm=True):
+        """
+        AI 결정 요청과 잔액 조회를 동시에 실행합니다
+
+        매개변수:
+            system_prompt (str): 시스템 프롬프트
+            user_message (str): 사용자 메시지
+            request_llm (bool): False면 잔액만 조회 (캐시된 결정 사용 시)
+
+        반환값:
+            tuple: (request_decision() 결과 또는 None, fetch_balance() 결과)
+        """
+        await self._ensure_clients()
+        started = time.perf_counter()
+        if request_llm:
+            decision, balance = await gather_or_cancel(
+                self.request_decision(system_prompt, user_message), self._prefetch()
+            )
+        else:
+            decision, balance = None, await self._prefetch()
+        self.timings["decide"] = time.perf_counter() - started
+        return decision, balance
+
+    async def open_bracket(self, side, amount, leverage, sl_price, tp_price):
+        """
+        레버리지 설정 → 진입 + SL/TP 브래킷 주문 (배치 요청)
+
+        레버리지는 진입 주문에 적용되어야 하므로 브래킷 제출 전에 완료합니다.
+
+        매개변수:
+            side (str): "buy"(롱) 또는 "sell"(숏)
+            amount (float): 주문 수량 (BTC)
+            leverage (int): 레버리지 배수
+            sl_price (float): 스탑로스 가격
+            tp_price (float): 테이크프로핏 가격
+
+        반환값:
+            dict: entry, stop_loss, take_profit 주문 결과
+
+        예외:
+            BracketOrderError: 일부 주문이 거부되어 롤백한 경우
+        """
+        await self._ensure_clients()
+        started = time.perf_counter()
+        await self.exchange.set_leverage(leverage, self.symbol)
+        leveraged = time.perf_counter()
+        legs = await submit_bracket(
+            self.exchange, self.symbol, side, amount, sl_price, tp_price
+        )
+        self.timings["leverage"] = leveraged - started
+        self.timings["bracket"] = time.perf_counter() - leveraged  # 진입~보호 주문 완료
+        return legs
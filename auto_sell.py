@@ -12,6 +12,7 @@ import uuid
 import logging
 from urllib.parse import urlencode, unquote
 from dotenv import load_dotenv
+from market_stream import MarketState, UpbitTickerStream
 
 # .env 파일에서 API 키 로드
 load_dotenv()
@@ -25,6 +26,30 @@ upbit = pyupbit.Upbit(access, secret)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 웹소켓 현재가 상태 (스트림은 실행 시 보유 코인 기준으로 시작)
+market_state = MarketState()
+TARGET_COIN = "XRP"  # 재매수 대상 코인
+
+
+# 📌 구독할 마켓 코드 (보유 코인 + 재매수 대상 코인)
+def get_watched_market_codes():
+    coins = {
+        balance["currency"]
+        for balance in upbit.get_balances()
+        if balance["currency"] != "KRW"
+    }
+    coins.add(TARGET_COIN)
+    return sorted(f"KRW-{coin}" for coin in coins)
+
+
+# 📌 현재가 조회 (스트림 가격 우선, 없거나 오래된 경우 REST 조회)
+def get_current_price(market_code):
+    current_price = market_state.get_price(market_code)
+    if current_price is None:
+        time.sleep(1)  # REST 호출 간격 유지
+        current_price = pyupbit.get_current_price(market_code)
+    return current_price
+
 
 def _get_tick_size_from_orderbook(bid_prices):
     """
@@ -188,9 +213,9 @@ def auto_sell():
             xrp_exist = True
 
     # 가격 차이 1% 이상일 경우 재주문
-    target_coin = "XRP"
+    target_coin = TARGET_COIN
     pending_prices = get_pending_buy_prices(target_coin)
-    current_price = pyupbit.get_current_price(f"KRW-{target_coin}")
+    current_price = get_current_price(f"KRW-{target_coin}")
 
     if xrp_exist == False and pending_prices == []:
         logger.debug(f"🔁 {target_coin} 신규 주문 수행")
@@ -204,7 +229,6 @@ def auto_sell():
         return
 
     for balance in balances:
-        time.sleep(1)
         coin = balance["currency"]
         if coin == "KRW":
             continue
@@ -216,7 +240,7 @@ def auto_sell():
             continue
 
         market_code = f"KRW-{coin}"
-        current_price = pyupbit.get_current_price(market_code)
+        current_price = get_current_price(market_code)
         if not current_price:
             continue
 
@@ -247,9 +271,12 @@ def auto_sell():
 
 
 # ✅ 주기적 실행 설정
-schedule.every(10).seconds.do(auto_sell)
-logger.info("🚀 자동 매도 시스템 시작...")
-
-while True:
-    schedule.run_pending()
-    time.sleep(1)
+if __name__ == "__main__":
+    ticker_stream = UpbitTickerStream(market_state, get_watched_market_codes())
+    ticker_stream.start()
+    schedule.every(10).seconds.do(auto_sell)
+    logger.info("🚀 자동 매도 시스템 시작...")
+
+    while True:
+        schedule.run_pending()
+        time.sleep(1)
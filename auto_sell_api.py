@@ -6,6 +6,7 @@ import time
 import threading
 from fastapi import FastAPI, HTTPException
 from dotenv import load_dotenv
+from snapshot_cache import SnapshotCache  # 잔고/현재가 스냅샷 공유
 
 # .env 파일에서 API 키 로드
 load_dotenv()
@@ -32,6 +33,30 @@ app = FastAPI()
 # 자동 매매 활성화 플래그
 auto_trading = True
 
+# 잔고/현재가 스냅샷 (API 핸들러와 자동 매도 스레드가 같은 조회 결과를 공유)
+snapshots = SnapshotCache()
+
+# 호출 위치별 스냅샷 허용 나이 (초)
+BALANCE_MAX_AGE = {"balance": 2.0, "sell": 0.5, "auto_sell": 1.0}
+PRICE_MAX_AGE = {"buy": 0.5, "auto_sell": 1.0}
+
+
+def get_balances(endpoint):
+    """잔고 스냅샷 (허용 나이 안이면 재사용, 동시 조회는 한 번만 호출)"""
+    return snapshots.get(
+        "balances", upbit.get_balances, BALANCE_MAX_AGE[endpoint], endpoint
+    )
+
+
+def get_current_price(market_code, endpoint):
+    """현재가 스냅샷 (허용 나이 안이면 재사용, 동시 조회는 한 번만 호출)"""
+    return snapshots.get(
+        ("price", market_code),
+        lambda: pyupbit.get_current_price(market_code),
+        PRICE_MAX_AGE[endpoint],
+        endpoint,
+    )
+
 
 def get_tick_size_from_orderbook(bid_prices):
     """주문장의 bid_price 리스트를 기반으로 호가 단위 계산"""
@@ -75,7 +100,7 @@ def auto_sell():
     global auto_trading
     while auto_trading:
         logger.debug("🔍 자동 매도 시스템 실행 중...")
-        balances = upbit.get_balances()
+        balances = get_balances("auto_sell")
         for balance in balances:
             time.sleep(1)
             coin = balance["currency"]
@@ -86,13 +111,14 @@ def auto_sell():
             if amount <= 0:
                 continue
             market_code = f"KRW-{coin}"
-            current_price = pyupbit.get_current_price(market_code)
+            current_price = get_current_price(market_code, "auto_sell")
             if not current_price:
                 continue
             profit_percent = ((current_price - avg_buy_price) / avg_buy_price) * 100
             if profit_percent <= -1 or profit_percent >= 3:
                 logger.info(f"📉 {coin} 매도 진행 중... 수익률: {profit_percent:.2f}%")
                 upbit.sell_market_order(market_code, amount)
+                snapshots.invalidate("balances")  # 매도 후 잔고 다시 조회
         time.sleep(5)
 
 
@@ -100,11 +126,12 @@ def auto_sell():
 def place_buy_order(coin: str, amount: float, discount_percent: float):
     """매수 주문 API"""
     market_code = f"KRW-{coin}"
-    current_price = pyupbit.get_current_price(market_code)
+    current_price = get_current_price(market_code, "buy")
     if not current_price:
         raise HTTPException(status_code=400, detail="Failed to get current price")
     buy_price = calculate_buy_price(market_code, current_price, discount_percent)
     buy_order = upbit.buy_limit_order(market_code, buy_price, amount)
+    snapshots.invalidate("balances")  # 주문 후 잔고 다시 조회
     if buy_order:
         return {"status": "success", "message": "Buy order placed", "order": buy_order}
     else:
@@ -115,12 +142,13 @@ def place_buy_order(coin: str, amount: float, discount_percent: float):
 def place_sell_order(coin: str):
     """매도 주문 API"""
     market_code = f"KRW-{coin}"
-    balances = upbit.get_balances()
+    balances = get_balances("sell")
     balance_info = next((b for b in balances if b["currency"] == coin), None)
     if not balance_info or float(balance_info["balance"]) <= 0:
         raise HTTPException(status_code=400, detail="Insufficient balance")
     amount = float(balance_info["balance"])
     sell_order = upbit.sell_market_order(market_code, amount)
+    snapshots.invalidate("balances")  # 주문 후 잔고 다시 조회
     if sell_order:
         return {
             "status": "success",
@@ -134,10 +162,16 @@ def place_sell_order(coin: str):
 @app.get("/balance")
 def get_balance():
     """잔고 조회 API"""
-    balances = upbit.get_balances()
+    balances = get_balances("balance")
     return {"balances": balances}
 
 
+@app.get("/cache_stats")
+def get_cache_stats():
+    """스냅샷 캐시 적중률/허용 나이 조회 API (엔드포인트별)"""
+    return {"endpoints": snapshots.stats()}
+
+
 @app.post("/start_auto_trading")
 def start_auto_trading():
     """자동 매매 시작 API"""
@@ -16,15 +16,25 @@ import ccxt  # 암호화폐 거래소 API 라이브러리
 import os  # 환경 변수 및 파일 시스템 접근
 import math  # 수학 연산
 import time  # 시간 지연 및 타임스탬프
-import pandas as pd  # 데이터 분석 및 조작
 import requests  # HTTP 요청
-import json  # JSON 데이터 처리
-import sqlite3  # 로컬 데이터베이스
+import threading  # 병렬 요청 간 레이트 리밋 공유
+from concurrent.futures import ThreadPoolExecutor  # 타임프레임 병렬 수집
 from dotenv import load_dotenv  # 환경 변수 로드
 
 load_dotenv()  # .env 파일에서 환경 변수 로드
 from openai import OpenAI  # OpenAI API 접근
 from datetime import datetime  # 날짜 및 시간 처리
+from trade_repository import TradeRepository  # 거래 DB 저장소 계층
+from candle_store import CandleStore  # 로컬 OHLCV 캔들 저장소
+from decision_cache import DecisionCache, make_fingerprint  # AI 결정 캐시
+from llm_recorder import LLMRecorder  # AI 요청/응답 기록 및 재생
+from async_engine import AsyncTradingEngine  # AI 요청/주문 비동기 실행
+from decision_parser import DecisionError  # AI 응답 검증 오류
+from order_execution import BracketOrderError  # 브래킷 주문 롤백 오류
+from market_stream import MarketState, BinanceFuturesStream  # 웹소켓 시장 데이터
+from indicators import StreamingIndicatorEngine  # 기술적 지표 증분 계산
+from prompt_encoder import encode_market_analysis, token_report  # 프롬프트 압축
+from ohlcv_resample import required_base_candles, resample_ohlcv  # 상위 타임프레임 생성
 
 # ===== 설정 및 초기화 =====
 # 바이낸스 API 설정
@@ -43,472 +53,71 @@ exchange = ccxt.binance(
 )
 symbol = "BTC/USDT"  # 거래 페어 설정
 
-# OpenAI API 클라이언트 초기화
-client = OpenAI()
+# 병렬 요청 시에도 요청 시작 간격을 거래소 rateLimit(ms) 이상으로 유지
+rate_limit_lock = threading.Lock()
+last_request_time = 0  # 마지막 요청 시작 시각 (ms)
+
+# 웹소켓 시장 데이터 (최신가, 포지션, 미체결 주문을 메모리에 유지)
+market_state = MarketState()
+market_stream = BinanceFuturesStream(market_state, api_key, secret, symbol)
+futures_symbol = "BTC/USDT:USDT"  # 선물 포지션/주문의 통합 심볼
+
+# AI 요청/응답 기록 모드: record(기본, 호출 후 저장) / replay(저장된 응답만 사용) / off
+LLM_MODE = os.getenv("LLM_MODE", "record")
+
+# OpenAI API 클라이언트 초기화 (재생 모드에서는 사용하지 않음)
+client = OpenAI() if LLM_MODE != "replay" else None
 
 # SERP API 설정 (뉴스 데이터 수집용)
 serp_api_key = os.getenv("SERP_API_KEY")  # 서프 API 키
 
 # SQLite 데이터베이스 설정
 DB_FILE = "bitcoin_trading.db"  # 데이터베이스 파일명
+repo = TradeRepository(DB_FILE)  # 프로그램 수명 동안 유지되는 단일 DB 연결
+candle_store = CandleStore(DB_FILE)  # 캔들 저장소 (대시보드와 공유)
+decision_cache = DecisionCache(DB_FILE)  # 같은 시장 상태의 AI 결정 재사용
+llm_recorder = None if LLM_MODE == "off" else LLMRecorder(DB_FILE, LLM_MODE)  # AI 응답 기록
+engine = AsyncTradingEngine(
+    api_key, secret, symbol, recorder=llm_recorder
+)  # 독립 단계 동시 실행
+INDICATOR_STATE_FILE = os.path.splitext(DB_FILE)[0] + ".indicators.json"  # 증분 지표 상태 (DB 옆)
+indicator_engine = StreamingIndicatorEngine(INDICATOR_STATE_FILE)  # 새 캔들만 반영하는 지표 계산
 
 
-# ===== 데이터베이스 관련 함수 =====
-def setup_database():
-    """
-    데이터베이스 및 필요한 테이블 생성
-
-    거래 기록과 AI 분석 결과를 저장하기 위한 테이블을 생성합니다.
-    - trades: 모든 거래 정보 (진입가, 청산가, 손익 등)
-    - ai_analysis: AI의 분석 결과 및 추천 사항
-    """
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-
-    # 거래 기록 테이블
-    cursor.execute(
-        """
-    CREATE TABLE IF NOT EXISTS trades (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        timestamp TEXT NOT NULL,           -- 거래 시작 시간
-        action TEXT NOT NULL,              -- long 또는 short
-        entry_price REAL NOT NULL,         -- 진입 가격
-        amount REAL NOT NULL,              -- 거래량 (BTC)
-        leverage INTEGER NOT NULL,         -- 레버리지 배수
-        sl_price REAL NOT NULL,            -- 스탑로스 가격
-        tp_price REAL NOT NULL,            -- 테이크프로핏 가격
-        sl_percentage REAL NOT NULL,       -- 스탑로스 백분율
-        tp_percentage REAL NOT NULL,       -- 테이크프로핏 백분율
-        position_size_percentage REAL NOT NULL,  -- 자본 대비 포지션 크기
-        investment_amount REAL NOT NULL,   -- 투자 금액 (USDT)
-        status TEXT DEFAULT 'OPEN',        -- 거래 상태 (OPEN/CLOSED)
-        exit_price REAL,                   -- 청산 가격
-        exit_timestamp TEXT,               -- 청산 시간
-        profit_loss REAL,                  -- 손익 (USDT)
-        profit_loss_percentage REAL        -- 손익 백분율
-    )
-    """
-    )
-
-    # AI 분석 결과 테이블
-    cursor.execute(
-        """
-    CREATE TABLE IF NOT EXISTS ai_analysis (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        timestamp TEXT NOT NULL,               -- 분석 시간
-        current_price REAL NOT NULL,           -- 분석 시점 가격
-        direction TEXT NOT NULL,               -- 방향 추천 (LONG/SHORT/NO_POSITION)
-        recommended_position_size REAL NOT NULL,  -- 추천 포지션 크기
-        recommended_leverage INTEGER NOT NULL,    -- 추천 레버리지
-        stop_loss_percentage REAL NOT NULL,       -- 추천 스탑로스 비율
-        take_profit_percentage REAL NOT NULL,     -- 추천 테이크프로핏 비율
-        reasoning TEXT NOT NULL,                  -- 분석 근거 설명
-        trade_id INTEGER,                         -- 연결된 거래 ID
-        FOREIGN KEY (trade_id) REFERENCES trades (id)  -- 외래 키 설정
-    )
-    """
-    )
-
-    conn.commit()
-    conn.close()
-    print("데이터베이스 설정 완료")
-
-
-def save_ai_analysis(analysis_data, trade_id=None):
-    """
-    AI 분석 결과를 데이터베이스에 저장
-
-    매개변수:
-        analysis_data (dict): AI 분석 결과 데이터
-        trade_id (int, optional): 연결된 거래 ID
-
-    반환값:
-        int: 생성된 분석 기록의 ID
-    """
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-
-    cursor.execute(
-        """
-    INSERT INTO ai_analysis (
-        timestamp, 
-        current_price, 
-        direction, 
-        recommended_position_size, 
-        recommended_leverage, 
-        stop_loss_percentage, 
-        take_profit_percentage, 
-        reasoning,
-        trade_id
-    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """,
-        (
-            datetime.now().isoformat(),  # 현재 시간
-            analysis_data.get("current_price", 0),  # 현재 가격
-            analysis_data.get("direction", "NO_POSITION"),  # 추천 방향
-            analysis_data.get("recommended_position_size", 0),  # 추천 포지션 크기
-            analysis_data.get("recommended_leverage", 0),  # 추천 레버리지
-            analysis_data.get("stop_loss_percentage", 0),  # 스탑로스 비율
-            analysis_data.get("take_profit_percentage", 0),  # 테이크프로핏 비율
-            analysis_data.get("reasoning", ""),  # 분석 근거
-            trade_id,  # 연결된 거래 ID
-        ),
-    )
-
-    analysis_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
-    return analysis_id
-
-
-def save_trade(trade_data):
-    """
-    거래 정보를 데이터베이스에 저장
-
-    매개변수:
-        trade_data (dict): 거래 정보 데이터
-
-    반환값:
-        int: 생성된 거래 기록의 ID
-    """
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-
-    cursor.execute(
-        """
-    INSERT INTO trades (
-        timestamp,
-        action,
-        entry_price,
-        amount,
-        leverage,
-        sl_price,
-        tp_price,
-        sl_percentage,
-        tp_percentage,
-        position_size_percentage,
-        investment_amount
-    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """,
-        (
-            datetime.now().isoformat(),  # 진입 시간
-            trade_data.get("action", ""),  # 포지션 방향
-            trade_data.get("entry_price", 0),  # 진입 가격
-            trade_data.get("amount", 0),  # 거래량
-            trade_data.get("leverage", 0),  # 레버리지
-            trade_data.get("sl_price", 0),  # 스탑로스 가격
-            trade_data.get("tp_price", 0),  # 테이크프로핏 가격
-            trade_data.get("sl_percentage", 0),  # 스탑로스 비율
-            trade_data.get("tp_percentage", 0),  # 테이크프로핏 비율
-            trade_data.get("position_size_percentage", 0),  # 자본 대비 포지션 크기
-            trade_data.get("investment_amount", 0),  # 투자 금액
-        ),
-    )
-
-    trade_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
-    return trade_id
-
-
-def update_trade_status(
-    trade_id,
-    status,
-    exit_price=None,
-    exit_timestamp=None,
-    profit_loss=None,
-    profit_loss_percentage=None,
-):
-    """
-    거래 상태를 업데이트합니다
-
-    매개변수:
-        trade_id (int): 업데이트할 거래의 ID
-        status (str): 새 상태 ('OPEN' 또는 'CLOSED')
-        exit_price (float, optional): 청산 가격
-        exit_timestamp (str, optional): 청산 시간
-        profit_loss (float, optional): 손익 금액
-        profit_loss_percentage (float, optional): 손익 비율
-    """
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-
-    # 동적으로 SQL 업데이트 쿼리 구성
-    update_fields = ["status = ?"]
-    update_values = [status]
-
-    # 제공된 필드만 업데이트에 포함
-    if exit_price is not None:
-        update_fields.append("exit_price = ?")
-        update_values.append(exit_price)
-
-    if exit_timestamp is not None:
-        update_fields.append("exit_timestamp = ?")
-        update_values.append(exit_timestamp)
-
-    if profit_loss is not None:
-        update_fields.append("profit_loss = ?")
-        update_values.append(profit_loss)
-
-    if profit_loss_percentage is not None:
-        update_fields.append("profit_loss_percentage = ?")
-        update_values.append(profit_loss_percentage)
-
-    update_sql = f"UPDATE trades SET {', '.join(update_fields)} WHERE id = ?"
-    update_values.append(trade_id)
-
-    cursor.execute(update_sql, update_values)
-    conn.commit()
-    conn.close()
-
-
-def get_latest_open_trade():
+# ===== 데이터 수집 함수 =====
+def wait_for_rate_limit():
     """
-    가장 최근의 열린 거래 정보를 가져옵니다
+    공유 레이트 리미터
 
-    반환값:
-        dict: 거래 정보 또는 None (열린 거래가 없는 경우)
-    """
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-
-    cursor.execute(
-        """
-    SELECT id, action, entry_price, amount, leverage, sl_price, tp_price
-    FROM trades
-    WHERE status = 'OPEN'
-    ORDER BY timestamp DESC  -- 가장 최근 거래 먼저
-    LIMIT 1
+    여러 스레드가 동시에 요청하더라도 요청 시작 간격을 exchange.rateLimit 이상으로 벌립니다.
+    대기만 잠금 안에서 하고 실제 네트워크 왕복은 잠금 밖에서 겹쳐 실행됩니다.
     """
-    )
-
-    result = cursor.fetchone()
-    conn.close()
-
-    # 결과가 있을 경우 사전 형태로 변환하여 반환
-    if result:
-        return {
-            "id": result[0],
-            "action": result[1],
-            "entry_price": result[2],
-            "amount": result[3],
-            "leverage": result[4],
-            "sl_price": result[5],
-            "tp_price": result[6],
-        }
-    return None  # 열린 거래가 없음
+    global last_request_time
+    with rate_limit_lock:
+        elapsed = time.time() * 1000 - last_request_time
+        delay = exchange.rateLimit - elapsed
+        if delay > 0:
+            time.sleep(delay / 1000)
+        last_request_time = time.time() * 1000
 
 
-def get_trade_summary(days=7):
+def fetch_timeframe_data(tf_params):
     """
-    지정된 일수 동안의 거래 요약 정보를 가져옵니다
+    한 타임프레임의 캔들 데이터를 가져옵니다
 
     매개변수:
-        days (int): 요약할 기간(일)
+        tf_params (dict): {"timeframe": 타임프레임, "limit": 캔들 개수}
 
     반환값:
-        dict: 거래 요약 정보 또는 None
+        DataFrame: OHLCV 데이터
     """
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-
-    cursor.execute(
-        """
-    SELECT 
-        COUNT(*) as total_trades,                            -- 총 거래 수
-        SUM(CASE WHEN profit_loss > 0 THEN 1 ELSE 0 END) as winning_trades,  -- 이익 거래 수
-        SUM(CASE WHEN profit_loss < 0 THEN 1 ELSE 0 END) as losing_trades,   -- 손실 거래 수
-        SUM(profit_loss) as total_profit_loss,               -- 총 손익
-        AVG(profit_loss_percentage) as avg_profit_loss_percentage  -- 평균 손익률
-    FROM trades
-    WHERE exit_timestamp IS NOT NULL  -- 청산된 거래만
-    AND timestamp >= datetime('now', ?)  -- 지정된 일수 내 거래만
-    """,
-        (f"-{days} days",),
+    wait_for_rate_limit()
+    return candle_store.get_candles(
+        exchange, symbol, tf_params["timeframe"], tf_params["limit"]
     )
 
-    result = cursor.fetchone()
-    conn.close()
-
-    # 결과가 있을 경우 사전 형태로 변환하여 반환
-    if result:
-        return {
-            "total_trades": result[0] or 0,
-            "winning_trades": result[1] or 0,
-            "losing_trades": result[2] or 0,
-            "total_profit_loss": result[3] or 0,
-            "avg_profit_loss_percentage": result[4] or 0,
-        }
-    return None
 
-
-def get_historical_trading_data(limit=10):
-    """
-    과거 거래 내역과 관련 AI 분석 결과를 가져옵니다
-
-    매개변수:
-        limit (int): 가져올 최대 거래 기록 수
-
-    반환값:
-        list: 거래 및 분석 데이터 사전 목록
-    """
-    conn = sqlite3.connect(DB_FILE)
-    conn.row_factory = sqlite3.Row  # 컬럼명으로 결과에 접근 가능하게 설정
-    cursor = conn.cursor()
-
-    # 완료된 거래 내역과 관련 AI 분석 함께 조회 (LEFT JOIN 사용)
-    cursor.execute(
-        """
-    SELECT 
-        t.id as trade_id,
-        t.timestamp as trade_timestamp,
-        t.action,
-        t.entry_price,
-        t.exit_price,
-        t.amount,
-        t.leverage,
-        t.sl_price,
-        t.tp_price,
-        t.sl_percentage,
-        t.tp_percentage,
-        t.position_size_percentage,
-        t.status,
-        t.profit_loss,
-        t.profit_loss_percentage,
-        a.id as analysis_id,
-        a.reasoning,
-        a.direction,
-        a.recommended_leverage,
-        a.recommended_position_size,
-        a.stop_loss_percentage,
-        a.take_profit_percentage
-    FROM 
-        trades t
-    LEFT JOIN 
-        ai_analysis a ON t.id = a.trade_id
-    WHERE 
-        t.status = 'CLOSED'  -- 완료된 거래만
-    ORDER BY 
-        t.timestamp DESC  -- 최신 거래 먼저
-    LIMIT ?
-    """,
-        (limit,),
-    )
-
-    results = cursor.fetchall()
-
-    # 결과를 사전 목록으로 변환
-    historical_data = []
-    for row in results:
-        historical_data.append({k: row[k] for k in row.keys()})
-
-    conn.close()
-    return historical_data
-
-
-def get_performance_metrics():
-    """
-    거래 성과 메트릭스를 계산합니다
-
-    이 함수는 다음을 포함한 전체 및 방향별(롱/숏) 성과 지표를 계산합니다:
-    - 총 거래 수
-    - 승률
-    - 평균 수익률
-    - 최대 이익/손실
-    - 방향별 성과
-
-    반환값:
-        dict: 성과 메트릭스 데이터
-    """
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-
-    # 전체 거래 성과 쿼리
-    cursor.execute(
-        """
-    SELECT 
-        COUNT(*) as total_trades,
-        SUM(CASE WHEN profit_loss > 0 THEN 1 ELSE 0 END) as winning_trades,
-        SUM(CASE WHEN profit_loss < 0 THEN 1 ELSE 0 END) as losing_trades,
-        SUM(profit_loss) as total_profit_loss,
-        AVG(profit_loss_percentage) as avg_profit_loss_percentage,
-        MAX(profit_loss_percentage) as max_profit_percentage,
-        MIN(profit_loss_percentage) as max_loss_percentage,
-        AVG(CASE WHEN profit_loss > 0 THEN profit_loss_percentage ELSE NULL END) as avg_win_percentage,
-        AVG(CASE WHEN profit_loss < 0 THEN profit_loss_percentage ELSE NULL END) as avg_loss_percentage
-    FROM trades
-    WHERE status = 'CLOSED'
-    """
-    )
-
-    overall_metrics = cursor.fetchone()
-
-    # 방향별(롱/숏) 성과 쿼리
-    cursor.execute(
-        """
-    SELECT 
-        action,
-        COUNT(*) as total_trades,
-        SUM(CASE WHEN profit_loss > 0 THEN 1 ELSE 0 END) as winning_trades,
-        SUM(CASE WHEN profit_loss < 0 THEN 1 ELSE 0 END) as losing_trades,
-        SUM(profit_loss) as total_profit_loss,
-        AVG(profit_loss_percentage) as avg_profit_loss_percentage
-    FROM trades
-    WHERE status = 'CLOSED'
-    GROUP BY action
-    """
-    )
-
-    directional_metrics = cursor.fetchall()
-
-    conn.close()
-
-    # 결과 구성
-    metrics = {
-        "overall": {
-            "total_trades": overall_metrics[0] or 0,
-            "winning_trades": overall_metrics[1] or 0,
-            "losing_trades": overall_metrics[2] or 0,
-            "total_profit_loss": overall_metrics[3] or 0,
-            "avg_profit_loss_percentage": overall_metrics[4] or 0,
-            "max_profit_percentage": overall_metrics[5] or 0,
-            "max_loss_percentage": overall_metrics[6] or 0,
-            "avg_win_percentage": overall_metrics[7] or 0,
-            "avg_loss_percentage": overall_metrics[8] or 0,
-        },
-        "directional": {},
-    }
-
-    # 승률 계산
-    if metrics["overall"]["total_trades"] > 0:
-        metrics["overall"]["win_rate"] = (
-            metrics["overall"]["winning_trades"] / metrics["overall"]["total_trades"]
-        ) * 100
-    else:
-        metrics["overall"]["win_rate"] = 0
-
-    # 방향별 메트릭스 추가
-    for row in directional_metrics:
-        action = row[0]  # 'long' 또는 'short'
-        total = row[1] or 0
-        winning = row[2] or 0
-
-        direction_metrics = {
-            "total_trades": total,
-            "winning_trades": winning,
-            "losing_trades": row[3] or 0,
-            "total_profit_loss": row[4] or 0,
-            "avg_profit_loss_percentage": row[5] or 0,
-            "win_rate": (winning / total * 100) if total > 0 else 0,
-        }
-
-        metrics["directional"][action] = direction_metrics
-
-    return metrics
-
-
-# ===== 데이터 수집 함수 =====
-def fetch_multi_timeframe_data():
+def fetch_multi_timeframe_data(parallel=True, mode="resample"):
     """
     여러 타임프레임의 가격 데이터를 수집합니다
 
@@ -520,6 +129,13 @@ def fetch_multi_timeframe_data():
     - 종가
     - 거래량
 
+    캔들은 로컬 저장소에 보관되며, 마지막 저장 캔들 이후의 캔들만 거래소에 요청합니다.
+
+    매개변수:
+        parallel (bool): True이면 모든 타임프레임을 동시에 요청 (약 1회 왕복 시간)
+        mode (str): "resample"이면 가장 작은 타임프레임(15분)만 요청하고
+            1시간/4시간 캔들은 로컬에서 집계, "direct"이면 타임프레임별로 요청
+
     반환값:
         dict: 타임프레임별 DataFrame 데이터
     """
@@ -530,23 +146,29 @@ def fetch_multi_timeframe_data():
         "4h": {"timeframe": "4h", "limit": 30},  # 5일 (4시간 * 30)
     }
 
+    if mode == "resample":
+        return resample_multi_timeframe_data(timeframes)
+
+    # 요청 시작 (병렬 모드에서는 모든 타임프레임을 한 번에 제출)
+    if parallel:
+        executor = ThreadPoolExecutor(max_workers=len(timeframes))
+        futures = {
+            tf_name: executor.submit(fetch_timeframe_data, tf_params)
+            for tf_name, tf_params in timeframes.items()
+        }
+        executor.shutdown(wait=False)
+    else:
+        futures = None
+
     multi_tf_data = {}
 
-    # 각 타임프레임별로 데이터 수집
+    # 각 타임프레임별로 결과 수집 (순서 유지)
     for tf_name, tf_params in timeframes.items():
         try:
-            # OHLCV 데이터 가져오기 (시가, 고가, 저가, 종가, 거래량)
-            ohlcv = exchange.fetch_ohlcv(
-                symbol, timeframe=tf_params["timeframe"], limit=tf_params["limit"]
-            )
-
-            # 데이터프레임으로 변환
-            df = pd.DataFrame(
-                ohlcv, columns=["timestamp", "open", "high", "low", "close", "volume"]
-            )
-
-            # 타임스탬프를 날짜/시간 형식으로 변환
-            df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
+            if futures is not None:
+                df = futures[tf_name].result()
+            else:
+                df = fetch_timeframe_data(tf_params)
 
             # 결과 딕셔너리에 저장
             multi_tf_data[tf_name] = df
@@ -557,6 +179,45 @@ def fetch_multi_timeframe_data():
     return multi_tf_data
 
 
+def resample_multi_timeframe_data(timeframes):
+    """
+    가장 작은 타임프레임만 요청하고 나머지는 리샘플링으로 만듭니다
+
+    매개변수:
+        timeframes (dict): fetch_multi_timeframe_data()의 타임프레임 설정 (작은 순서)
+
+    반환값:
+        dict: 타임프레임별 DataFrame 데이터
+    """
+    base_name, base_params = next(iter(timeframes.items()))
+    base_timeframe = base_params["timeframe"]
+    base_limit = required_base_candles(
+        base_timeframe,
+        {params["timeframe"]: params["limit"] for params in timeframes.values()},
+    )
+
+    multi_tf_data = {}
+    try:
+        base_df = fetch_timeframe_data(
+            {"timeframe": base_timeframe, "limit": base_limit}
+        )
+    except Exception as e:
+        print(f"Error fetching {base_name} data: {e}")
+        return multi_tf_data
+
+    for tf_name, tf_params in timeframes.items():
+        if tf_name == base_name:
+            df = base_df.tail(tf_params["limit"]).reset_index(drop=True)
+        else:
+            df = resample_ohlcv(
+                base_df, base_timeframe, tf_params["timeframe"], tf_params["limit"]
+            )
+        multi_tf_data[tf_name] = df
+        print(f"Collected {tf_name} data: {len(df)} candles")
+
+    return multi_tf_data
+
+
 def fetch_bitcoin_news():
     """
     비트코인 관련 최신 뉴스를 가져옵니다
@@ -577,25 +238,47 @@ def fetch_bitcoin_news():
 
 
 # ===== 포지션 관리 함수 =====
-def handle_position_closure(current_price, side, amount, current_trade_id=None):
+def complete_decision(trading_decision, analysis_data, cache_key=None):
+    """
+    AI 결정의 reasoning을 채우고 결정을 캐시에 저장합니다
+
+    스트리밍으로 주문 필드만 먼저 받은 경우, 주문을 처리하는 동안 계속 수신한
+    나머지 응답에서 reasoning을 가져옵니다.
+
+    매개변수:
+        trading_decision (dict): AI 결정 (reasoning이 채워짐)
+        analysis_data (dict): 저장할 AI 분석 데이터 (reasoning이 채워짐)
+        cache_key (str, optional): 결정 캐시 키 (캐시에서 가져온 결정이면 None)
+    """
+    if "reasoning" not in trading_decision:
+        trading_decision["reasoning"] = engine.run(engine.finish_reasoning())
+    analysis_data["reasoning"] = trading_decision["reasoning"]
+    if cache_key is not None:
+        decision_cache.put(cache_key, trading_decision)
+
+
+def handle_position_closure(
+    current_price, side, amount, current_trade_id=None, exit_timestamp=None
+):
     """
     포지션 종료 시 데이터베이스를 업데이트하고 결과를 표시합니다
 
     매개변수:
-        current_price (float): 현재 가격(청산 가격)
+        current_price (float): 현재 가격(청산 가격) 또는 보호 주문의 실제 체결가
         side (str): 포지션 방향 ('long' 또는 'short')
         amount (float): 포지션 수량
         current_trade_id (int, optional): 현재 거래 ID
+        exit_timestamp (str, optional): 실제 청산 시간 (없으면 현재 시간)
     """
     # 거래 ID가 제공되지 않은 경우 최신 열린 거래 정보 조회
     if current_trade_id is None:
-        latest_trade = get_latest_open_trade()
+        latest_trade = repo.get_latest_open_trade()
         if latest_trade:
             current_trade_id = latest_trade["id"]
 
     if current_trade_id:
         # 가장 최근의 열린 거래 가져오기
-        latest_trade = get_latest_open_trade()
+        latest_trade = repo.get_latest_open_trade()
         if latest_trade:
             entry_price = latest_trade["entry_price"]
             action = latest_trade["action"]
@@ -610,12 +293,11 @@ def handle_position_closure(current_price, side, amount, current_trade_id=None):
                 profit_loss = (entry_price - current_price) * amount
                 profit_loss_percentage = (1 - current_price / entry_price) * 100
 
-            # 거래 상태 업데이트
-            update_trade_status(
+            # 거래 종료 및 누적 성과 집계 갱신
+            repo.close_trade(
                 current_trade_id,
-                "CLOSED",  # 상태를 '종료됨'으로 변경
                 exit_price=current_price,
-                exit_timestamp=datetime.now().isoformat(),
+                exit_timestamp=exit_timestamp or datetime.now().isoformat(),
                 profit_loss=profit_loss,
                 profit_loss_percentage=profit_loss_percentage,
             )
@@ -628,7 +310,7 @@ def handle_position_closure(current_price, side, amount, current_trade_id=None):
             print("=======================")
 
             # 최근 거래 요약 표시
-            summary = get_trade_summary(days=7)
+            summary = repo.get_trade_summary(days=7)
             if summary:
                 print("\n=== 7-Day Trading Summary ===")
                 print(f"Total Trades: {summary['total_trades']}")
@@ -645,131 +327,9 @@ def handle_position_closure(current_price, side, amount, current_trade_id=None):
                 print("=============================")
 
 
-# ===== 메인 프로그램 시작 =====
-print("\n=== Bitcoin Trading Bot Started ===")
-print(f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-print("Trading Pair:", symbol)
-print("Dynamic Leverage: AI Optimized")
-print("Dynamic SL/TP: AI Optimized")
-print("Multi Timeframe Analysis: 15m, 1h, 4h")
-print("News Sentiment Analysis: Enabled")
-print("Historical Performance Learning: Enabled")
-print("Database Logging: Enabled")
-print("===================================\n")
-
-# 데이터베이스 설정
-setup_database()
-
-# ===== 메인 트레이딩 루프 =====
-while True:
-    try:
-        # 현재 시간 및 가격 조회
-        current_time = datetime.now().strftime("%H:%M:%S")
-        current_price = exchange.fetch_ticker(symbol)["last"]
-        print(f"\n[{current_time}] Current BTC Price: ${current_price:,.2f}")
-
-        # ===== 1. 현재 포지션 확인 =====
-        current_side = None  # 현재 포지션 방향 (long/short/None)
-        amount = 0  # 포지션 수량
-
-        # 바이낸스에서 현재 포지션 조회
-        positions = exchange.fetch_positions([symbol])
-        for position in positions:
-            if position["symbol"] == "BTC/USDT:USDT":
-                amt = float(position["info"]["positionAmt"])
-                if amt > 0:
-                    current_side = "long"
-                    amount = amt
-                elif amt < 0:
-                    current_side = "short"
-                    amount = abs(amt)
-
-        # 데이터베이스에서 현재 거래 정보 조회
-        current_trade = get_latest_open_trade()
-        current_trade_id = current_trade["id"] if current_trade else None
-
-        # ===== 2. 포지션이 있는 경우 처리 =====
-        if current_side:
-            print(f"Current Position: {current_side.upper()} {amount} BTC")
-
-            # 포지션이 있지만 DB에 기록이 없는 경우 (프로그램 재시작 등)
-            if not current_trade:
-                # 임시 거래 정보 생성하여 DB에 저장
-                temp_trade_data = {
-                    "action": current_side,
-                    "entry_price": current_price,  # 현재 가격으로 임시 설정
-                    "amount": amount,
-                    "leverage": 1,  # 기본값
-                    "sl_price": 0,
-                    "tp_price": 0,
-                    "sl_percentage": 0,
-                    "tp_percentage": 0,
-                    "position_size_percentage": 0,
-                    "investment_amount": 0,
-                }
-                current_trade_id = save_trade(temp_trade_data)
-                print("새로운 거래 기록 생성 (기존 포지션)")
-
-        # ===== 3. 포지션이 없는 경우 처리 =====
-        else:
-            # 이전에 포지션이 있었고 DB에 열린 거래가 있는 경우 (포지션 종료됨)
-            if current_trade:
-                handle_position_closure(
-                    current_price,
-                    current_trade["action"],
-                    current_trade["amount"],
-                    current_trade_id,
-                )
-
-            # 포지션이 없을 경우, 남아있는 미체결 주문 취소
-            try:
-                open_orders = exchange.fetch_open_orders(symbol)
-                if open_orders:
-                    for order in open_orders:
-                        exchange.cancel_order(order["id"], symbol)
-                    print("Cancelled remaining open orders for", symbol)
-                else:
-                    print("No remaining open orders to cancel.")
-            except Exception as e:
-                print("Error cancelling orders:", e)
-
-            # 잠시 대기 후 시장 분석 시작
-            time.sleep(5)
-            print("No position. Analyzing market...")
-
-            # ===== 4. 시장 데이터 수집 =====
-            # 멀티 타임프레임 차트 데이터 수집
-            multi_tf_data = fetch_multi_timeframe_data()
-
-            # 최신 비트코인 뉴스 수집
-            # recent_news = fetch_bitcoin_news()
-            recent_news = ""
-
-            # 과거 거래 내역 및 AI 분석 결과 가져오기
-            historical_trading_data = get_historical_trading_data(
-                limit=10
-            )  # 최근 10개 거래
-
-            # 전체 거래 성과 메트릭스 계산
-            performance_metrics = get_performance_metrics()
-
-            # ===== 5. AI 분석을 위한 데이터 준비 =====
-            market_analysis = {
-                "timestamp": datetime.now().isoformat(),
-                "current_price": current_price,
-                "timeframes": {},
-                "recent_news": recent_news,
-                "historical_trading_data": historical_trading_data,
-                "performance_metrics": performance_metrics,
-            }
-
-            # 각 타임프레임 데이터를 dict로 변환하여 저장
-            for tf_name, df in multi_tf_data.items():
-                market_analysis["timeframes"][tf_name] = df.to_dict(orient="records")
-
-            # ===== 6. AI 트레이딩 결정 요청 =====
-            # AI 분석을 위한 시스템 프롬프트 설정
-            system_prompt = """
+# ===== 메인 프로그램 =====
+# AI 분석을 위한 시스템 프롬프트
+SYSTEM_PROMPT = """
 You are a crypto trading expert specializing in multi-timeframe analysis and news sentiment analysis applying Kelly criterion to determine optimal position sizing, leverage, and risk management.
 You adhere strictly to Warren Buffett's investment principles:
 
@@ -777,6 +337,7 @@ You adhere strictly to Warren Buffett's investment principles:
 **Rule No.2: Never forget rule No.1.**
 
 Analyze the market data across different timeframes (15m, 1h, 4h), recent news headlines, and historical trading performance to provide your trading decision.
+The market data is given as precomputed technical indicators per timeframe (computed on the latest candle): ATR and ATR %, realized volatility % (std of log returns), fast/slow EMA and SMA with their slopes %, RSI(14), MACD(12,26,9), Bollinger band width %, volume ratio, classic pivot support/resistance levels and swing high/low.
 
 Follow this process:
 1. Review historical trading performance:
@@ -837,7 +398,7 @@ Follow this process:
    - Discuss how historical performance informed your current decision
    - Mention specific patterns you've observed in successful vs unsuccessful trades
 
-Your response must contain ONLY a valid JSON object with exactly these 6 fields:
+Your response must contain ONLY a valid JSON object with exactly these 6 fields, in this order (reasoning last):
 {
   "direction": "LONG" or "SHORT" or "NO_POSITION",
   "recommended_position_size": [final recommended position size as decimal between 0.1-1.0],
@@ -850,255 +411,399 @@ Your response must contain ONLY a valid JSON object with exactly these 6 fields:
 IMPORTANT: Do not format your response as a code block. Do not include ```json, ```, or any other markdown formatting. Return ONLY the raw JSON object.
 """
 
-            # OpenAI API 호출하여 트레이딩 결정 요청
-            response = client.chat.completions.create(
-                model="o3-mini",  # gpt-4o, o3-mini
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": str(market_analysis)},
-                ],
-            )
 
-            # ===== 7. AI 응답 처리 및 거래 실행 =====
-            try:
-                # API 응답에서 내용 추출
-                response_content = response.choices[0].message.content.strip()
-                print(f"Raw AI response: {response_content}")  # 디버깅용 출력
-
-                # JSON 형식 정리 (코드 블록 제거)
-                if response_content.startswith("```"):
-                    # 첫 번째 줄바꿈 이후부터 마지막 ``` 이전까지의 내용만 추출
-                    content_parts = response_content.split("\n", 1)
-                    if len(content_parts) > 1:
-                        response_content = content_parts[1]
-                    # 마지막 ``` 제거
-                    if "```" in response_content:
-                        response_content = response_content.rsplit("```", 1)[0]
-                    response_content = response_content.strip()
-
-                # JSON 파싱
-                trading_decision = json.loads(response_content)
-
-                # 결정 내용 출력
-                print(f"AI 거래 결정:")
-                print(f"방향: {trading_decision['direction']}")
-                print(
-                    f"추천 포지션 크기: {trading_decision['recommended_position_size']*100:.1f}%"
-                )
-                print(f"추천 레버리지: {trading_decision['recommended_leverage']}x")
-                print(
-                    f"스탑로스 레벨: {trading_decision['stop_loss_percentage']*100:.2f}%"
-                )
-                print(
-                    f"테이크프로핏 레벨: {trading_decision['take_profit_percentage']*100:.2f}%"
-                )
-                print(f"근거: {trading_decision['reasoning']}")
+def main(max_cycles=None):
+    """
+    트레이딩 봇을 실행합니다
 
-                # AI 분석 결과를 데이터베이스에 저장
-                analysis_data = {
+    매개변수:
+        max_cycles (int, optional): 실행할 루프 횟수 (없으면 무한 반복, 벤치마크용)
+    """
+    print("\n=== Bitcoin Trading Bot Started ===")
+    print(f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print("Trading Pair:", symbol)
+    print("Dynamic Leverage: AI Optimized")
+    print("Dynamic SL/TP: AI Optimized")
+    print("Multi Timeframe Analysis: 15m, 1h, 4h")
+    print("News Sentiment Analysis: Enabled")
+    print("Historical Performance Learning: Enabled")
+    print("Database Logging: Enabled")
+    print("===================================\n")
+
+    # 데이터베이스 설정
+    repo.setup_database()
+
+    # 실시간 시장 데이터 스트림 시작
+    market_stream.start()
+
+    # ===== 메인 트레이딩 루프 =====
+    cycle = 0
+    while max_cycles is None or cycle < max_cycles:
+        cycle += 1
+        try:
+            # 현재 시간 및 가격 조회
+            current_time = datetime.now().strftime("%H:%M:%S")
+            # 스트림 가격이 없거나 오래된 경우 REST로 조회
+            current_price = market_state.get_price(symbol)
+            if current_price is None:
+                current_price = exchange.fetch_ticker(symbol)["last"]
+            print(f"\n[{current_time}] Current BTC Price: ${current_price:,.2f}")
+
+            # ===== 1. 현재 포지션 확인 =====
+            current_side = None  # 현재 포지션 방향 (long/short/None)
+            amount = 0  # 포지션 수량
+
+            # 스트림의 포지션 상태 사용 (포지션 채널이 끊긴 경우 REST로 조회)
+            stream_position = market_state.get_position(futures_symbol)
+            if stream_position is not None:
+                current_side = stream_position["side"]
+                amount = stream_position["amount"]
+            else:
+                positions = exchange.fetch_positions([symbol])
+                for position in positions:
+                    if position["symbol"] == futures_symbol:
+                        amt = float(position["info"]["positionAmt"])
+                        if amt > 0:
+                            current_side = "long"
+                            amount = amt
+                        elif amt < 0:
+                            current_side = "short"
+                            amount = abs(amt)
+
+            # 데이터베이스에서 현재 거래 정보 조회
+            current_trade = repo.get_latest_open_trade()
+            current_trade_id = current_trade["id"] if current_trade else None
+
+            # ===== 2. 포지션이 있는 경우 처리 =====
+            if current_side:
+                print(f"Current Position: {current_side.upper()} {amount} BTC")
+
+                # 포지션이 있지만 DB에 기록이 없는 경우 (프로그램 재시작 등)
+                if not current_trade:
+                    # 임시 거래 정보 생성하여 DB에 저장
+                    temp_trade_data = {
+                        "action": current_side,
+                        "entry_price": current_price,  # 현재 가격으로 임시 설정
+                        "amount": amount,
+                        "leverage": 1,  # 기본값
+                        "sl_price": 0,
+                        "tp_price": 0,
+                        "sl_percentage": 0,
+                        "tp_percentage": 0,
+                        "position_size_percentage": 0,
+                        "investment_amount": 0,
+                    }
+                    current_trade_id = repo.save_trade(temp_trade_data)
+                    print("새로운 거래 기록 생성 (기존 포지션)")
+
+            # ===== 3. 포지션이 없는 경우 처리 =====
+            else:
+                # 이전에 포지션이 있었고 DB에 열린 거래가 있는 경우 (포지션 종료됨)
+                if current_trade:
+                    handle_position_closure(
+                        current_price,
+                        current_trade["action"],
+                        current_trade["amount"],
+                        current_trade_id,
+                    )
+
+                # 포지션이 없을 경우, 남아있는 미체결 주문 취소
+                try:
+                    open_orders = market_state.get_open_orders()
+                    if open_orders is None:  # 주문 채널이 끊긴 경우 REST로 조회
+                        open_orders = exchange.fetch_open_orders(symbol)
+                    if open_orders:
+                        for order in open_orders:
+                            exchange.cancel_order(order["id"], symbol)
+                        print("Cancelled remaining open orders for", symbol)
+                    else:
+                        print("No remaining open orders to cancel.")
+                except Exception as e:
+                    print("Error cancelling orders:", e)
+
+                # 이전 포지션의 체결 이벤트는 이미 처리되었으므로 비움
+                market_state.clear_fills()
+
+                # 잠시 대기 후 시장 분석 시작
+                time.sleep(5)
+                print("No position. Analyzing market...")
+
+                # ===== 4. 시장 데이터 수집 =====
+                # 멀티 타임프레임 차트 데이터 수집
+                multi_tf_data = fetch_multi_timeframe_data()
+
+                # 최신 비트코인 뉴스 수집
+                # recent_news = fetch_bitcoin_news()
+                recent_news = ""
+
+                # 과거 거래 내역 및 AI 분석 결과 가져오기
+                historical_trading_data = repo.get_historical_trading_data(
+                    limit=10
+                )  # 최근 10개 거래
+
+                # 전체 거래 성과 메트릭스 계산
+                performance_metrics = repo.get_performance_metrics()
+
+                # ===== 5. AI 분석을 위한 데이터 준비 =====
+                market_analysis = {
+                    "timestamp": datetime.now().isoformat(),
                     "current_price": current_price,
-                    "direction": trading_decision["direction"],
-                    "recommended_position_size": trading_decision[
-                        "recommended_position_size"
-                    ],
-                    "recommended_leverage": trading_decision["recommended_leverage"],
-                    "stop_loss_percentage": trading_decision["stop_loss_percentage"],
-                    "take_profit_percentage": trading_decision[
-                        "take_profit_percentage"
-                    ],
-                    "reasoning": trading_decision["reasoning"],
+                    # 원시 캔들 대신 타임프레임별 지표 요약만 전달
+                    "indicators": indicator_engine.compute_features(multi_tf_data),
+                    "recent_news": recent_news,
+                    "historical_trading_data": historical_trading_data,
+                    "performance_metrics": performance_metrics,
                 }
-                analysis_id = save_ai_analysis(analysis_data)
 
-                # AI 추천 방향 가져오기
-                action = trading_decision["direction"].lower()
+                # 타임프레임별 지표 및 거래 기록을 한 줄 JSON으로 압축 인코딩
+                user_message = encode_market_analysis(market_analysis)
+                report = token_report(user_message)
+                print(
+                    f"Prompt size: {report['tokens']} tokens"
+                    f"{'' if report['exact'] else ' (estimated)'}, {report['chars']} chars"
+                )
 
-                # ===== 8. 트레이딩 결정에 따른 액션 실행 =====
-                # 포지션을 열지 말아야 하는 경우
-                if action == "no_position":
-                    print("현재 시장 상황에서는 포지션을 열지 않는 것이 좋습니다.")
-                    print(f"이유: {trading_decision['reasoning']}")
-                    time.sleep(60)  # 포지션 없을 때 1분 대기
-                    continue
+                # ===== 6. AI 트레이딩 결정 요청 =====
+                # 양자화한 시장 상태가 같으면 이전 결정 재사용 (LLM 호출 생략)
+                fingerprint = make_fingerprint(
+                    current_price,
+                    market_analysis["indicators"],
+                    "flat",  # 분석은 포지션이 없을 때만 실행됨
+                    [row["trade_id"] for row in historical_trading_data],
+                )
+                cached_decision = decision_cache.get(fingerprint)
+                cache_stats = decision_cache.stats()
+                print(
+                    f"Decision cache: {'hit' if cached_decision else 'miss'} "
+                    f"(hits {cache_stats['hits']}, misses {cache_stats['misses']}, "
+                    f"hit rate {cache_stats['hit_rate']:.1f}%)"
+                )
 
-                # ===== 9. 투자 금액 계산 =====
-                # 현재 잔액 확인
-                balance = exchange.fetch_balance()
-                available_capital = balance["USDT"]["free"]  # 가용 USDT 잔액
-
-                # AI 추천 포지션 크기 비율 적용
-                position_size_percentage = trading_decision["recommended_position_size"]
-                investment_amount = available_capital * position_size_percentage
-
-                # 최소 주문 금액 확인 (최소 100 USDT)
-                if investment_amount < 100:
-                    investment_amount = 100
-                    print(f"최소 주문 금액(100 USDT)으로 조정됨")
-
-                print(f"투자 금액: {investment_amount:.2f} USDT")
-
-                # ===== 10. 주문 수량 계산 =====
-                # BTC 수량 = 투자금액 / 현재가격, 소수점 3자리까지 반올림
-                amount = math.ceil((investment_amount / current_price) * 1000) / 1000
-                print(f"주문 수량: {amount} BTC")
-
-                # ===== 11. 레버리지 설정 =====
-                # AI 추천 레버리지 설정
-                recommended_leverage = trading_decision["recommended_leverage"]
-                exchange.set_leverage(recommended_leverage, symbol)
-                print(f"레버리지 설정: {recommended_leverage}x")
-
-                # ===== 12. 스탑로스/테이크프로핏 설정 =====
-                # AI 추천 SL/TP 비율 가져오기
-                sl_percentage = trading_decision["stop_loss_percentage"]
-                tp_percentage = trading_decision["take_profit_percentage"]
-
-                # ===== 13. 포지션 진입 및 SL/TP 주문 실행 =====
-                if action == "long":  # 롱 포지션
-                    # 시장가 매수 주문
-                    order = exchange.create_market_buy_order(symbol, amount)
-                    entry_price = current_price
-
-                    # 스탑로스/테이크프로핏 가격 계산
-                    sl_price = round(
-                        entry_price * (1 - sl_percentage), 2
-                    )  # AI 추천 비율만큼 하락
-                    tp_price = round(
-                        entry_price * (1 + tp_percentage), 2
-                    )  # AI 추천 비율만큼 상승
-
-                    # SL/TP 주문 생성
-                    exchange.create_order(
-                        symbol,
-                        "STOP_MARKET",
-                        "sell",
-                        amount,
-                        None,
-                        {"stopPrice": sl_price},
-                    )
-                    exchange.create_order(
-                        symbol,
-                        "TAKE_PROFIT_MARKET",
-                        "sell",
-                        amount,
-                        None,
-                        {"stopPrice": tp_price},
+                # ===== 7. AI 응답 처리 및 거래 실행 =====
+                try:
+                    # OpenAI API 호출(스트리밍)과 잔액 조회를 동시에 실행
+                    # 주문 필드가 검증되는 즉시 반환되고 reasoning은 계속 수신 (캐시 적중 시 잔액만 조회)
+                    streamed_decision, balance = engine.run(
+                        engine.decide_with_prefetch(
+                            SYSTEM_PROMPT, user_message, request_llm=cached_decision is None
+                        )
                     )
+                    trading_decision = cached_decision or streamed_decision
 
-                    # 거래 데이터 저장
-                    trade_data = {
-                        "action": "long",
-                        "entry_price": entry_price,
-                        "amount": amount,
-                        "leverage": recommended_leverage,
-                        "sl_price": sl_price,
-                        "tp_price": tp_price,
-                        "sl_percentage": sl_percentage,
-                        "tp_percentage": tp_percentage,
-                        "position_size_percentage": position_size_percentage,
-                        "investment_amount": investment_amount,
-                    }
-                    trade_id = save_trade(trade_data)
-
-                    # AI 분석 결과와 거래 연결
-                    update_analysis_sql = (
-                        "UPDATE ai_analysis SET trade_id = ? WHERE id = ?"
+                    # 결정 내용 출력
+                    print(f"AI 거래 결정:")
+                    print(f"방향: {trading_decision['direction']}")
+                    print(
+                        f"추천 포지션 크기: {trading_decision['recommended_position_size']*100:.1f}%"
                     )
-                    conn = sqlite3.connect(DB_FILE)
-                    cursor = conn.cursor()
-                    cursor.execute(update_analysis_sql, (trade_id, analysis_id))
-                    conn.commit()
-                    conn.close()
-
-                    print(f"\n=== LONG Position Opened ===")
-                    print(f"Entry: ${entry_price:,.2f}")
-                    print(f"Stop Loss: ${sl_price:,.2f} (-{sl_percentage*100:.2f}%)")
-                    print(f"Take Profit: ${tp_price:,.2f} (+{tp_percentage*100:.2f}%)")
-                    print(f"Leverage: {recommended_leverage}x")
-                    print(f"분석 근거: {trading_decision['reasoning']}")
-                    print("===========================")
-
-                elif action == "short":  # 숏 포지션
-                    # 시장가 매도 주문
-                    order = exchange.create_market_sell_order(symbol, amount)
-                    entry_price = current_price
-
-                    # 스탑로스/테이크프로핏 가격 계산
-                    sl_price = round(
-                        entry_price * (1 + sl_percentage), 2
-                    )  # AI 추천 비율만큼 상승
-                    tp_price = round(
-                        entry_price * (1 - tp_percentage), 2
-                    )  # AI 추천 비율만큼 하락
-
-                    # SL/TP 주문 생성
-                    exchange.create_order(
-                        symbol,
-                        "STOP_MARKET",
-                        "buy",
-                        amount,
-                        None,
-                        {"stopPrice": sl_price},
+                    print(f"추천 레버리지: {trading_decision['recommended_leverage']}x")
+                    print(
+                        f"스탑로스 레벨: {trading_decision['stop_loss_percentage']*100:.2f}%"
                     )
-                    exchange.create_order(
-                        symbol,
-                        "TAKE_PROFIT_MARKET",
-                        "buy",
-                        amount,
-                        None,
-                        {"stopPrice": tp_price},
+                    print(
+                        f"테이크프로핏 레벨: {trading_decision['take_profit_percentage']*100:.2f}%"
                     )
 
-                    # 거래 데이터 저장
-                    trade_data = {
-                        "action": "short",
-                        "entry_price": entry_price,
-                        "amount": amount,
-                        "leverage": recommended_leverage,
-                        "sl_price": sl_price,
-                        "tp_price": tp_price,
-                        "sl_percentage": sl_percentage,
-                        "tp_percentage": tp_percentage,
-                        "position_size_percentage": position_size_percentage,
-                        "investment_amount": investment_amount,
+                    # AI 분석 결과 (포지션 진입 시 거래 기록과 함께 저장)
+                    analysis_data = {
+                        "current_price": current_price,
+                        "direction": trading_decision["direction"],
+                        "recommended_position_size": trading_decision[
+                            "recommended_position_size"
+                        ],
+                        "recommended_leverage": trading_decision["recommended_leverage"],
+                        "stop_loss_percentage": trading_decision["stop_loss_percentage"],
+                        "take_profit_percentage": trading_decision[
+                            "take_profit_percentage"
+                        ],
                     }
-                    trade_id = save_trade(trade_data)
+                    decision_key = fingerprint if cached_decision is None else None
+
+                    # AI 추천 방향 가져오기
+                    action = trading_decision["direction"].lower()
+
+                    # ===== 8. 트레이딩 결정에 따른 액션 실행 =====
+                    # 포지션을 열지 말아야 하는 경우
+                    if action == "no_position":
+                        complete_decision(trading_decision, analysis_data, decision_key)
+                        repo.save_ai_analysis(analysis_data)
+                        print("현재 시장 상황에서는 포지션을 열지 않는 것이 좋습니다.")
+                        print(f"이유: {trading_decision['reasoning']}")
+                        time.sleep(60)  # 포지션 없을 때 1분 대기
+                        continue
+
+                    # ===== 9. 투자 금액 계산 =====
+                    # AI 결정과 동시에 조회한 잔액 사용
+                    available_capital = balance["USDT"]["free"]  # 가용 USDT 잔액
+
+                    # AI 추천 포지션 크기 비율 적용
+                    position_size_percentage = trading_decision["recommended_position_size"]
+                    investment_amount = available_capital * position_size_percentage
+
+                    # 최소 주문 금액 확인 (최소 100 USDT)
+                    if investment_amount < 100:
+                        investment_amount = 100
+                        print(f"최소 주문 금액(100 USDT)으로 조정됨")
+
+                    print(f"투자 금액: {investment_amount:.2f} USDT")
+
+                    # ===== 10. 주문 수량 계산 =====
+                    # BTC 수량 = 투자금액 / 현재가격, 소수점 3자리까지 반올림
+                    amount = math.ceil((investment_amount / current_price) * 1000) / 1000
+                    print(f"주문 수량: {amount} BTC")
+
+                    # ===== 11. 레버리지 설정 =====
+                    # AI 추천 레버리지 설정
+                    # (진입 주문 직전에 open_bracket()에서 설정)
+                    recommended_leverage = trading_decision["recommended_leverage"]
+                    print(f"레버리지 설정: {recommended_leverage}x")
+
+                    # ===== 12. 스탑로스/테이크프로핏 설정 =====
+                    # AI 추천 SL/TP 비율 가져오기
+                    sl_percentage = trading_decision["stop_loss_percentage"]
+                    tp_percentage = trading_decision["take_profit_percentage"]
+
+                    # ===== 13. 포지션 진입 및 SL/TP 주문 실행 =====
+                    if action == "long":  # 롱 포지션
+                        entry_price = current_price
+
+                        # 스탑로스/테이크프로핏 가격 계산
+                        sl_price = round(
+                            entry_price * (1 - sl_percentage), 2
+                        )  # AI 추천 비율만큼 하락
+                        tp_price = round(
+                            entry_price * (1 + tp_percentage), 2
+                        )  # AI 추천 비율만큼 상승
+
+                        # 시장가 매수 + SL/TP 주문을 한 번에 생성 (거부 시 롤백)
+                        orders = engine.run(
+                            engine.open_bracket(
+                                "buy", amount, recommended_leverage, sl_price, tp_price
+                            )
+                        )
+                        order = orders["entry"]
+                        complete_decision(trading_decision, analysis_data, decision_key)
+
+                        # 거래 데이터와 AI 분석 결과를 하나의 트랜잭션으로 저장
+                        trade_data = {
+                            "action": "long",
+                            "entry_price": entry_price,
+                            "amount": amount,
+                            "leverage": recommended_leverage,
+                            "sl_price": sl_price,
+                            "tp_price": tp_price,
+                            "sl_percentage": sl_percentage,
+                            "tp_percentage": tp_percentage,
+                            "position_size_percentage": position_size_percentage,
+                            "investment_amount": investment_amount,
+                            "entry_order_id": order.get("id"),  # 중복 기록 방지 키
+                        }
+                        repo.record_trade_open(analysis_data, trade_data)
+
+                        print(f"\n=== LONG Position Opened ===")
+                        print(f"Entry: ${entry_price:,.2f}")
+                        print(f"Stop Loss: ${sl_price:,.2f} (-{sl_percentage*100:.2f}%)")
+                        print(f"Take Profit: ${tp_price:,.2f} (+{tp_percentage*100:.2f}%)")
+                        print(f"Leverage: {recommended_leverage}x")
+                        print(f"Bracket orders: {engine.timings['bracket']*1000:.0f} ms")
+                        print(f"분석 근거: {trading_decision['reasoning']}")
+                        print("===========================")
+
+                    elif action == "short":  # 숏 포지션
+                        entry_price = current_price
+
+                        # 스탑로스/테이크프로핏 가격 계산
+                        sl_price = round(
+                            entry_price * (1 + sl_percentage), 2
+                        )  # AI 추천 비율만큼 상승
+                        tp_price = round(
+                            entry_price * (1 - tp_percentage), 2
+                        )  # AI 추천 비율만큼 하락
+
+                        # 시장가 매도 + SL/TP 주문을 한 번에 생성 (거부 시 롤백)
+                        orders = engine.run(
+                            engine.open_bracket(
+                                "sell", amount, recommended_leverage, sl_price, tp_price
+                            )
+                        )
+                        order = orders["entry"]
+                        complete_decision(trading_decision, analysis_data, decision_key)
+
+                        # 거래 데이터와 AI 분석 결과를 하나의 트랜잭션으로 저장
+                        trade_data = {
+                            "action": "short",
+                            "entry_price": entry_price,
+                            "amount": amount,
+                            "leverage": recommended_leverage,
+                            "sl_price": sl_price,
+                            "tp_price": tp_price,
+                            "sl_percentage": sl_percentage,
+                            "tp_percentage": tp_percentage,
+                            "position_size_percentage": position_size_percentage,
+                            "investment_amount": investment_amount,
+                            "entry_order_id": order.get("id"),  # 중복 기록 방지 키
+                        }
+                        repo.record_trade_open(analysis_data, trade_data)
+
+                        print(f"\n=== SHORT Position Opened ===")
+                        print(f"Entry: ${entry_price:,.2f}")
+                        print(f"Stop Loss: ${sl_price:,.2f} (+{sl_percentage*100:.2f}%)")
+                        print(f"Take Profit: ${tp_price:,.2f} (-{tp_percentage*100:.2f}%)")
+                        print(f"Leverage: {recommended_leverage}x")
+                        print(f"Bracket orders: {engine.timings['bracket']*1000:.0f} ms")
+                        print(f"분석 근거: {trading_decision['reasoning']}")
+                        print("============================")
+                    else:
+                        complete_decision(trading_decision, analysis_data, decision_key)
+                        repo.save_ai_analysis(analysis_data)
+                        print(
+                            "Action이 'long' 또는 'short'가 아니므로 주문을 실행하지 않습니다."
+                        )
+
+                except BracketOrderError as e:
+                    # 접수된 주문은 취소/청산 시도 완료 (요청 실패 시 거래소 조회로 확인)
+                    # 롤백 오류가 있으면 포지션이나 보호 주문이 남아 있을 수 있음
+                    print(f"브래킷 주문 실패: {e}")
+                    for error in e.rollback_errors:
+                        print(f"롤백 오류: {error}")
+                    if e.rollback_errors:
+                        print("경고: 포지션/미체결 주문이 남아 있을 수 있습니다. 거래소에서 확인하세요.")
+                    time.sleep(10)
+                    continue
+                except DecisionError as e:
+                    # 자동 복구와 재요청까지 실패한 경우에만 잠시 대기 후 다시 분석
+                    print(f"AI 결정 오류: {e}")
+                    print(f"AI 응답: {engine.last_response_text}")
+                    time.sleep(5)
+                    continue
+                except Exception as e:
+                    print(f"기타 오류: {e}")
+                    time.sleep(10)
+                    continue
 
-                    # AI 분석 결과와 거래 연결
-                    update_analysis_sql = (
-                        "UPDATE ai_analysis SET trade_id = ? WHERE id = ?"
-                    )
-                    conn = sqlite3.connect(DB_FILE)
-                    cursor = conn.cursor()
-                    cursor.execute(update_analysis_sql, (trade_id, analysis_id))
-                    conn.commit()
-                    conn.close()
-
-                    print(f"\n=== SHORT Position Opened ===")
-                    print(f"Entry: ${entry_price:,.2f}")
-                    print(f"Stop Loss: ${sl_price:,.2f} (+{sl_percentage*100:.2f}%)")
-                    print(f"Take Profit: ${tp_price:,.2f} (-{tp_percentage*100:.2f}%)")
-                    print(f"Leverage: {recommended_leverage}x")
-                    print(f"분석 근거: {trading_decision['reasoning']}")
-                    print("============================")
-                else:
-                    print(
-                        "Action이 'long' 또는 'short'가 아니므로 주문을 실행하지 않습니다."
+            # ===== 14. 보호 주문 체결 또는 일정 시간까지 대기 =====
+            # 스탑로스/테이크프로핏이 체결되면 즉시 깨어나 실제 체결가로 청산을 기록
+            fill = market_state.wait_for_fill(timeout=60 * 60 * 1)
+            if fill:
+                print(f"\n{fill['type']} filled at ${fill['price']:,.2f}")
+                open_trade = repo.get_latest_open_trade()
+                if open_trade:
+                    handle_position_closure(
+                        fill["price"],
+                        open_trade["action"],
+                        open_trade["amount"],
+                        open_trade["id"],
+                        exit_timestamp=datetime.fromtimestamp(
+                            fill["timestamp"] / 1000
+                        ).isoformat(),
                     )
+                # 포지션 스트림이 청산을 반영한 뒤 바로 다음 분석 시작
+                market_state.wait_for_flat(futures_symbol, timeout=5)
 
-            except json.JSONDecodeError as e:
-                print(f"JSON 파싱 오류: {e}")
-                print(f"AI 응답: {response.choices[0].message.content}")
-                time.sleep(30)  # 대기 후 다시 시도
-                continue
-            except Exception as e:
-                print(f"기타 오류: {e}")
-                time.sleep(10)
-                continue
+        except Exception as e:
+            print(f"\n Error: {e}")
+            time.sleep(5)
 
-        # ===== 14. 일정 시간 대기 후 다음 루프 실행 =====
-        time.sleep(60 * 60 * 1)  # 메인 루프는 30분마다 실행
 
-    except Exception as e:
-        print(f"\n Error: {e}")
-        time.sleep(5)
+if __name__ == "__main__":
+    main()
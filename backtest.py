@@ -0,0 +1,565 @@
+"""
+벡터화 백테스트 엔진
+--------------------------------------------------------
+기능:
+- 로컬 캔들 저장소(candles 테이블)의 OHLCV로 전략을 오프라인 재생
+- auto_trade_future.py 주문 경로와 같은 진입/사이징/레버리지/SL-TP 규칙
+  - 투자 금액 = 가용 잔액 × 추천 포지션 크기 (최소 100 USDT)
+  - 수량 = 투자 금액 / 진입가, 0.001 BTC 단위로 올림
+  - SL/TP 가격 = 진입가 × (1 ∓ 비율), 소수점 2자리 반올림
+  - 포지션은 SL/TP 체결로만 종료, 종료 후 바로 다음 분석
+- 보유 구간의 SL/TP 도달 봉을 NumPy 배열 비교로 한 번에 탐색 (봉 단위 반복 없음)
+- 결정 함수 교체 가능 (규칙 기반, ai_analysis의 AI 결정 또는 llm_records의
+  AI 응답 원문 재생 등, AI API 호출 없음)
+- 결과를 trades 테이블과 같은 스키마로 저장 (대시보드에서 그대로 조회 가능)
+
+실행 예:
+    python backtest.py --strategy ema --since 2023-01-01 --out backtest.db
+--------------------------------------------------------
+"""
+
+import argparse  # 명령행 인자
+import math  # 수량 올림
+import time  # 실행 시간 측정
+from datetime import datetime  # 기록된 분석 시간 해석 / 거래 시간 기록
+import numpy as np  # 벡터 연산
+import pandas as pd  # 시간 변환 / EMA 계산
+from candle_store import OHLCV_COLUMNS, CandleStore  # 로컬 캔들 저장소
+from decision_parser import DecisionError, parse_decision, validate_decision  # 결정 검증
+from indicators import EMA_FAST, EMA_SLOW  # 기본 EMA 기간
+from llm_recorder import LLMRecorder  # 기록된 AI 응답
+from ohlcv_resample import timeframe_to_ms  # 타임프레임 길이 (ms)
+from trade_repository import TradeRepository, connect_database  # 결과 저장
+from trading_metrics import closed_trade_metrics  # 대시보드와 같은 성과 지표
+
+BASE_TIMEFRAME = "15m"  # 트레이딩 봇의 가장 작은 분석 타임프레임
+SERIES_KEY = "binance:future:BTC/USDT"  # 트레이딩 봇의 캔들 저장 키
+MIN_INVESTMENT = 100  # 최소 주문 금액 (USDT)
+FEE_RATE = 0.0004  # 바이낸스 선물 시장가 수수료
+SEARCH_BLOCK = 512  # SL/TP 탐색 첫 구간 길이 (봉 수, 이후 두 배씩 확장)
+
+
+def load_candles(db_file, key=SERIES_KEY, timeframe=BASE_TIMEFRAME, since=None, until=None):
+    """
+    저장된 캔들을 NumPy 배열로 읽습니다
+
+    매개변수:
+        db_file (str): 캔들이 저장된 데이터베이스 파일
+        key (str): 캔들 저장 키
+        timeframe (str): 타임프레임
+        since (int, optional): 시작 시간 (ms)
+        until (int, optional): 끝 시간 (ms, 제외)
+
+    반환값:
+        dict: 컬럼 이름별 배열 (timestamp는 봉 시작 시간 ms 정수)
+    """
+    store = CandleStore(db_file)
+    try:
+        df = store.load_range(key, timeframe, since, until)
+    finally:
+        store.close()
+    return {
+        column: df[column].to_numpy(np.int64 if column == "timestamp" else np.float64)
+        for column in OHLCV_COLUMNS
+    }
+
+
+def plan_entry(decision, price, free_balance):
+    """
+    AI 결정으로 주문 내용을 계산합니다 (auto_trade_future의 9~12단계와 같은 계산)
+
+    매개변수:
+        decision (dict): 검증된 LONG/SHORT 결정
+        price (float): 현재 가격
+        free_balance (float): 가용 USDT 잔액
+
+    반환값:
+        dict: trades 테이블 컬럼 이름의 주문 내용
+    """
+    action = decision["direction"].lower()
+    position_size_percentage = decision["recommended_position_size"]
+    investment_amount = max(free_balance * position_size_percentage, MIN_INVESTMENT)
+    amount = math.ceil((investment_amount / price) * 1000) / 1000
+    sl_percentage = decision["stop_loss_percentage"]
+    tp_percentage = decision["take_profit_percentage"]
+    if action == "long":
+        sl_price = round(price * (1 - sl_percentage), 2)
+        tp_price = round(price * (1 + tp_percentage), 2)
+    else:
+        sl_price = round(price * (1 + sl_percentage), 2)
+        tp_price = round(price * (1 - tp_percentage), 2)
+    return {
+        "action": action,
+        "entry_price": price,
+        "amount": amount,
+        "leverage": decision["recommended_leverage"],
+        "sl_price": sl_price,
+        "tp_price": tp_price,
+        "sl_percentage": sl_percentage,
+        "tp_percentage": tp_percentage,
+        "position_size_percentage": position_size_percentage,
+        "investment_amount": investment_amount,
+    }
+
+
+def find_exit(high, low, start, action, sl_price, tp_price, block=SEARCH_BLOCK):
+    """
+    start 봉부터 SL 또는 TP 가격에 처음 도달한 봉을 찾습니다
+
+    구간 전체를 배열 비교로 한 번에 검사하고, 없으면 두 배 길이의 다음 구간을 검사합니다.
+    한 봉 안에서 둘 다 도달했으면 봉 안의 순서를 알 수 없으므로 SL로 처리합니다
+    (모의 거래소와 같이 STOP_MARKET 우선, 보수적 가정).
+
+    반환값:
+        tuple: (봉 인덱스, SL 여부) 또는 도달하지 않았으면 (None, None)
+    """
+    n = len(high)
+    pos = start
+    while pos < n:
+        end = min(n, pos + block)
+        if action == "long":
+            sl_hit = low[pos:end] <= sl_price
+            tp_hit = high[pos:end] >= tp_price
+        else:
+            sl_hit = high[pos:end] >= sl_price
+            tp_hit = low[pos:end] <= tp_price
+        hit = sl_hit | tp_hit
+        if hit.any():
+            k = int(hit.argmax())
+            return pos + k, bool(sl_hit[k])
+        pos = end
+        block *= 2
+    return None, None
+
+
+def exit_fill_price(action, is_stop, trigger_price, bar_open):
+    """
+    보호 주문 체결가 (시가가 이미 발동 가격을 넘어 갭이 생겼으면 시가에 체결)
+    """
+    # 롱 SL/숏 TP는 하락 시, 롱 TP/숏 SL은 상승 시 발동
+    falling = is_stop == (action == "long")
+    return min(trigger_price, bar_open) if falling else max(trigger_price, bar_open)
+
+
+def _iso(ms):
+    """
+    ms 시간을 실거래 기록과 같은 형식의 시간 문자열로 변환합니다
+
+    실거래 기록(datetime.now().isoformat())과 같이 시간대 표시 없는 로컬 시간으로 저장합니다.
+    """
+    return datetime.fromtimestamp(ms / 1000).isoformat()
+
+
+class BacktestResult:
+    """백테스트 결과 (trades 스키마 거래 목록, 봉별 평가 자산)"""
+
+    def __init__(
+        self,
+        trades,
+        timestamps,
+        equity,
+        initial_balance,
+        invalid_decisions=0,
+        skipped_entries=0,
+    ):
+        self.trades = trades  # trades 테이블 컬럼 이름의 dict 목록
+        self.timestamps = timestamps  # 봉 시작 시간 (ms)
+        self.equity = equity  # 봉 종가 기준 평가 자산 (USDT)
+        self.initial_balance = initial_balance
+        self.invalid_decisions = invalid_decisions  # 검증에 실패한 결정 수
+        self.skipped_entries = skipped_entries  # 증거금 부족으로 건너뛴 진입 수
+
+    def summary(self):
+        """
+        주요 성과 요약
+
+        반환값:
+            dict: 거래 수, 승률, 총 손익, 수익률, 최대 낙폭 등
+        """
+        closed = [t for t in self.trades if t["status"] == "CLOSED"]
+        pnl = np.array([t["profit_loss"] for t in closed], dtype=np.float64)
+        final = float(self.equity[-1]) if len(self.equity) else self.initial_balance
+        if len(self.equity):
+            peak = np.maximum.accumulate(self.equity)
+            max_drawdown = float(((self.equity - peak) / peak).min() * 100)
+        else:
+            max_drawdown = 0.0
+        return {
+            "bars": len(self.equity),
+            "total_trades": len(closed),
+            "open_trades": len(self.trades) - len(closed),
+            "winning_trades": int((pnl > 0).sum()),
+            "losing_trades": int((pnl < 0).sum()),
+            "win_rate": float((pnl > 0).mean() * 100) if len(pnl) else 0.0,
+            "total_profit_loss": float(pnl.sum()),
+            "final_equity": final,
+            "return_pct": (final / self.initial_balance - 1) * 100,
+            "max_drawdown_pct": max_drawdown,
+            "invalid_decisions": self.invalid_decisions,
+            "skipped_entries": self.skipped_entries,
+        }
+
+    def metrics(self):
+        """
+        대시보드와 같은 방식의 성과 지표 (샤프 비율, 손익비, 최대 낙폭 등)
+
+        반환값:
+            dict: trading_metrics.closed_trade_metrics() 결과
+        """
+        closed = [t for t in self.trades if t["status"] == "CLOSED"]
+        columns = ("entry_price", "amount", "profit_loss", "profit_loss_percentage")
+        arrays = [np.array([t[c] for t in closed], dtype=np.float64) for c in columns]
+        return closed_trade_metrics(*arrays)
+
+
+class Backtester:
+    """
+    저장된 캔들로 트레이딩 봇의 진입/청산 규칙을 재생합니다
+
+    포지션이 없는 봉마다 종가 시점에 결정 함수를 호출하고, 진입하면 SL/TP 도달 봉을
+    배열 연산으로 찾아 그 봉으로 바로 이동합니다. 따라서 Python 반복은 포지션이 없는
+    봉과 거래 수에만 비례합니다.
+
+    결정 함수는 decide(i, candles) 형태로, i번째 봉 종가 시점의 결정 dict
+    (decision_parser 형식, reasoning 생략 가능) 또는 None(포지션 없음)을 반환합니다.
+    prepare(candles, timeframe) 메서드가 있으면 실행 전에 한 번 호출합니다.
+    """
+
+    def __init__(
+        self,
+        candles,
+        decide,
+        balance=10000.0,
+        fee_rate=FEE_RATE,
+        slippage_bps=0.0,
+        timeframe=BASE_TIMEFRAME,
+    ):
+        """
+        매개변수:
+            candles (dict): load_candles() 결과
+            decide (callable): 결정 함수
+            balance (float): 시작 USDT 잔액
+            fee_rate (float): 진입/청산 체결 금액 대비 수수료율
+            slippage_bps (float): 시장가 체결 시 불리한 방향 가격 차이 (bp)
+            timeframe (str): 캔들 타임프레임
+        """
+        self.candles = candles
+        self.decide = decide
+        self.balance = balance
+        self.fee_rate = fee_rate
+        self.slippage = slippage_bps / 10000
+        self.timeframe = timeframe
+
+    def _slipped(self, price, side):
+        return price * (1 + self.slippage) if side == "buy" else price * (1 - self.slippage)
+
+    def run(self):
+        """
+        백테스트를 실행합니다
+
+        손익(profit_loss)은 수수료를 뺀 금액이고, 손익률(profit_loss_percentage)은
+        트레이딩 봇과 같이 진입가 대비 가격 변화율(%)입니다.
+
+        반환값:
+            BacktestResult: 거래 목록과 봉별 평가 자산
+        """
+        candles = self.candles
+        opens, closes = candles["open"], candles["close"]
+        highs, lows = candles["high"], candles["low"]
+        open_times = candles["timestamp"]
+        timeframe_ms = timeframe_to_ms(self.timeframe)
+        n = len(closes)
+        if hasattr(self.decide, "prepare"):
+            self.decide.prepare(candles, self.timeframe)
+
+        wallet = self.balance
+        trades = []
+        spans = []  # (진입 봉, 청산 봉 또는 None, 방향 부호, 진입가, 수량)
+        invalid_decisions = skipped_entries = 0
+        i = 0
+        while i < n - 1:
+            decision = self.decide(i, candles)
+            if decision is None:
+                i += 1
+                continue
+            try:
+                decision = validate_decision(decision, require_reasoning=False)
+            except DecisionError:
+                invalid_decisions += 1
+                i += 1
+                continue
+            if decision["direction"] == "NO_POSITION":
+                i += 1
+                continue
+
+            price = float(closes[i])
+            trade = plan_entry(decision, price, wallet)
+            action = trade["action"]
+            direction = 1 if action == "long" else -1
+            entry_price = self._slipped(price, "buy" if direction > 0 else "sell")
+            amount = trade["amount"]
+            if amount * entry_price / trade["leverage"] > wallet:
+                skipped_entries += 1  # 증거금 부족 → 거래소가 주문 거부
+                i += 1
+                continue
+
+            trade.update(
+                timestamp=_iso(open_times[i] + timeframe_ms),  # 결정 봉 종가 시점
+                entry_price=entry_price,
+                status="OPEN",
+                exit_price=None,
+                exit_timestamp=None,
+                profit_loss=None,
+                profit_loss_percentage=None,
+                entry_order_id=None,
+            )
+            trades.append(trade)
+
+            exit_index, is_stop = find_exit(
+                highs, lows, i + 1, action, trade["sl_price"], trade["tp_price"]
+            )
+            if exit_index is None:
+                spans.append((i, None, direction, entry_price, amount))
+                break
+
+            trigger = trade["sl_price"] if is_stop else trade["tp_price"]
+            exit_price = self._slipped(
+                exit_fill_price(action, is_stop, trigger, float(opens[exit_index])),
+                "sell" if direction > 0 else "buy",
+            )
+            fees = (entry_price + exit_price) * amount * self.fee_rate
+            profit_loss = (exit_price - entry_price) * amount * direction - fees
+            wallet += profit_loss
+            trade.update(
+                status="CLOSED",
+                exit_price=exit_price,
+                exit_timestamp=_iso(open_times[exit_index]),
+                profit_loss=profit_loss,
+                profit_loss_percentage=(exit_price / entry_price - 1) * 100 * direction,
+            )
+            spans.append((i, exit_index, direction, entry_price, amount))
+            i = exit_index  # 청산된 봉의 종가 시점에 다시 분석
+
+        return BacktestResult(
+            trades,
+            open_times,
+            self._equity_curve(closes, trades, spans),
+            self.balance,
+            invalid_decisions,
+            skipped_entries,
+        )
+
+    def _equity_curve(self, closes, trades, spans):
+        """실현 손익 누적 + 보유 구간 미실현 손익을 봉별 배열로 계산합니다"""
+        realized = np.zeros(len(closes))
+        equity = np.full(len(closes), self.balance)
+        for trade, (entry, exit_index, direction, entry_price, amount) in zip(trades, spans):
+            end = len(closes) if exit_index is None else exit_index
+            equity[entry:end] += (closes[entry:end] - entry_price) * amount * direction
+            if exit_index is not None:
+                realized[exit_index] += trade["profit_loss"]
+        return equity + np.cumsum(realized)
+
+
+def save_results(result, db_file):
+    """
+    거래 기록을 trades 테이블 스키마의 데이터베이스에 저장합니다
+
+    반환값:
+        int: 저장한 거래 수
+    """
+    repo = TradeRepository(db_file)
+    try:
+        repo.setup_database()
+        return repo.import_trades(result.trades)
+    finally:
+        repo.close()
+
+
+class EmaCrossDecision:
+    """
+    규칙 기반 결정 함수: 빠른/느린 EMA 교차 시 교차 방향으로 진입
+
+    EMA는 실행 전에 전체 종가 배열로 한 번 계산합니다 (indicators와 같은 adjust=False).
+    """
+
+    def __init__(
+        self,
+        fast=EMA_FAST,
+        slow=EMA_SLOW,
+        position_size=0.2,
+        leverage=3,
+        stop_loss=0.01,
+        take_profit=0.02,
+    ):
+        self.fast = fast
+        self.slow = slow
+        self.order = {
+            "recommended_position_size": position_size,
+            "recommended_leverage": leverage,
+            "stop_loss_percentage": stop_loss,
+            "take_profit_percentage": take_profit,
+        }
+        self.cross = None  # 봉별 교차 방향 (1 상향, -1 하향, 0 없음)
+
+    def prepare(self, candles, timeframe):
+        close = pd.Series(candles["close"])
+        diff = (
+            close.ewm(span=self.fast, adjust=False).mean()
+            - close.ewm(span=self.slow, adjust=False).mean()
+        ).to_numpy()
+        side = np.sign(diff)
+        self.cross = np.zeros(len(side), dtype=np.int8)
+        self.cross[1:] = np.where(side[1:] != side[:-1], side[1:], 0)
+        self.cross[: self.slow] = 0  # EMA 안정 전 구간 제외
+
+    def __call__(self, i, candles):
+        if not self.cross[i]:
+            return None
+        return {"direction": "LONG" if self.cross[i] > 0 else "SHORT", **self.order}
+
+
+SELECT_RECORDED_DECISIONS_SQL = """
+SELECT
+    timestamp,
+    direction,
+    recommended_position_size,
+    recommended_leverage,
+    stop_loss_percentage,
+    take_profit_percentage,
+    reasoning
+FROM ai_analysis
+ORDER BY timestamp
+"""
+
+
+class RecordedDecisions:
+    """
+    기록된 AI 결정을 재생하는 결정 함수
+
+    ai_analysis 테이블의 결정을 시간 순서로 읽어, 각 봉 종가 시점 직전 max_age_ms
+    이내에 기록된 마지막 결정을 사용합니다 (같은 결정은 한 번만 사용).
+    ai_analysis의 시간은 트레이딩 봇이 실행된 컴퓨터의 현지 시간입니다.
+    """
+
+    def __init__(self, db_file, max_age_ms=None):
+        """
+        매개변수:
+            db_file (str): ai_analysis 테이블이 있는 데이터베이스 파일
+            max_age_ms (int, optional): 결정 유효 시간 (기본 한 봉 길이)
+        """
+        self.db_file = db_file
+        self.max_age_ms = max_age_ms
+        self.times = None
+        self.decisions = []
+        self._timeframe_ms = None
+        self._last_used = -1
+
+    def _load(self):
+        """(기록 시간 ms 목록, 결정 목록)을 시간 순서로 반환합니다"""
+        conn = connect_database(self.db_file)
+        try:
+            rows = conn.execute(SELECT_RECORDED_DECISIONS_SQL).fetchall()
+        finally:
+            conn.close()
+        times = [datetime.fromisoformat(row[0]).timestamp() * 1000 for row in rows]
+        decisions = [
+            {
+                "direction": row[1],
+                "recommended_position_size": row[2],
+                "recommended_leverage": row[3],
+                "stop_loss_percentage": row[4],
+                "take_profit_percentage": row[5],
+                "reasoning": row[6],
+            }
+            for row in rows
+        ]
+        return times, decisions
+
+    def prepare(self, candles, timeframe):
+        times, self.decisions = self._load()
+        self.times = np.array(times, dtype=np.float64)
+        self._timeframe_ms = timeframe_to_ms(timeframe)
+        if self.max_age_ms is None:
+            self.max_age_ms = self._timeframe_ms
+        self._last_used = -1
+
+    def __call__(self, i, candles):
+        close_time = candles["timestamp"][i] + self._timeframe_ms
+        j = int(np.searchsorted(self.times, close_time, side="right")) - 1
+        if j <= self._last_used or close_time - self.times[j] > self.max_age_ms:
+            return None
+        self._last_used = j
+        return self.decisions[j]
+
+
+class ReplayedLLMDecisions(RecordedDecisions):
+    """
+    기록된 AI 응답 원문(llm_records)을 다시 파싱해 재생하는 결정 함수
+
+    응답 완료 시각을 결정 시간으로 사용하며, 파싱/검증에 실패한 응답은 건너뜁니다.
+    AI API는 호출하지 않습니다.
+    """
+
+    def _load(self):
+        recorder = LLMRecorder(self.db_file, mode="replay")
+        try:
+            records = recorder.records()
+        finally:
+            recorder.close()
+        times, decisions = [], []
+        for created_at, _, _, response_text in sorted(records, key=lambda r: r[0]):
+            try:
+                decisions.append(parse_decision(response_text))
+            except DecisionError:
+                continue
+            times.append(created_at * 1000)
+        return times, decisions
+
+
+def date_to_ms(value):
+    """날짜 문자열(UTC)을 ms로 변환합니다 (None은 그대로)"""
+    return None if value is None else int(pd.Timestamp(value, tz="UTC").value // 10**6)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="저장된 캔들로 백테스트")
+    parser.add_argument("--db", default="bitcoin_trading.db", help="캔들/AI 분석 DB 파일")
+    parser.add_argument("--out", default="backtest.db", help="결과 저장 DB 파일")
+    parser.add_argument("--key", default=SERIES_KEY, help="캔들 저장 키")
+    parser.add_argument("--timeframe", default=BASE_TIMEFRAME, help="캔들 타임프레임")
+    parser.add_argument("--since", help="시작 날짜 (UTC, 예: 2023-01-01)")
+    parser.add_argument("--until", help="끝 날짜 (UTC, 제외)")
+    parser.add_argument("--strategy", choices=["ema", "recorded", "llm"], default="ema")
+    parser.add_argument("--balance", type=float, default=10000.0, help="시작 잔액 (USDT)")
+    parser.add_argument("--fee", type=float, default=FEE_RATE, help="수수료율")
+    parser.add_argument("--slippage-bps", type=float, default=0.0, help="슬리피지 (bp)")
+    args = parser.parse_args()
+
+    candles = load_candles(
+        args.db, args.key, args.timeframe, date_to_ms(args.since), date_to_ms(args.until)
+    )
+    if not len(candles["close"]):
+        print("저장된 캔들이 없습니다.")
+        return
+    if args.strategy == "ema":
+        decide = EmaCrossDecision()
+    elif args.strategy == "recorded":
+        decide = RecordedDecisions(args.db)
+    else:
+        decide = ReplayedLLMDecisions(args.db)
+
+    started = time.perf_counter()
+    result = Backtester(
+        candles, decide, args.balance, args.fee, args.slippage_bps, args.timeframe
+    ).run()
+    elapsed = time.perf_counter() - started
+
+    for name, value in result.summary().items():
+        print(f"{name}: {value:,.2f}" if isinstance(value, float) else f"{name}: {value}")
+    print(f"실행 시간: {elapsed:.2f}초")
+    print(f"저장한 거래 수: {save_results(result, args.out)} ({args.out})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+잔고 스냅샷 공유 피드
+--------------------------------------------------------
+기능:
+- 백그라운드 스레드 하나가 FastAPI /balance를 주기적으로 조회하여 최신 스냅샷 유지
+  - Streamlit 서버 프로세스에 하나만 만들어 모든 세션이 공유 (st.cache_resource)
+  - 세션 수와 관계없이 백엔드/업비트 조회는 주기당 한 번
+  - HTTP 연결 재사용 (requests.Session)
+- 일정 시간 동안 읽는 세션이 없으면 조회를 멈추고 다음 읽기 때 다시 시작
+- 주문 직후 등 즉시 갱신이 필요하면 refresh()로 다음 조회를 앞당김
+- 조회 실패 시 마지막 성공 스냅샷을 유지하고 오류 정보만 갱신
+--------------------------------------------------------
+"""
+
+import threading  # 백그라운드 조회 스레드
+import time  # 조회 시각 / 유휴 시간
+import requests  # FastAPI 백엔드 호출
+
+
+def total_balance_of(balances):
+    """
+    KRW를 제외한 보유 코인의 평가 금액 합계 (수량 × 평균 매수가)
+
+    매개변수:
+        balances (list): /balance 응답의 balances 목록
+
+    반환값:
+        float: 총 자산 (KRW)
+    """
+    return sum(
+        float(balance["balance"]) * float(balance.get("avg_buy_price", 1))
+        for balance in balances
+        if balance["currency"] != "KRW"
+    )
+
+
+class BalanceFeed:
+    """
+    /balance 조회 결과를 공유하는 스냅샷 피드 (스레드 안전)
+
+    snapshot()은 네트워크 호출 없이 마지막 조회 결과를 반환합니다.
+    """
+
+    def __init__(self, api_url, interval=5.0, idle_timeout=60.0, timeout=5):
+        """
+        매개변수:
+            api_url (str): FastAPI 백엔드 주소
+            interval (float): 조회 주기 (초)
+            idle_timeout (float): 이 시간 동안 읽기가 없으면 조회 중지 (초)
+            timeout (float): HTTP 요청 제한 시간 (초)
+        """
+        self.api_url = api_url
+        self.interval = interval
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.polls = 0  # /balance 조회 횟수
+        self.reads = 0  # 세션의 스냅샷 읽기 횟수
+        self._lock = threading.Lock()
+        self._wake = threading.Event()  # 대기 중인 조회 스레드 깨우기
+        self._ready = threading.Event()  # 첫 조회 완료
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_read = time.time()
+        self._session = requests.Session()
+        self._snapshot = {
+            "balances": [],
+            "total_balance": 0,
+            "updated_at": None,  # 마지막 성공 조회 시각 (epoch 초)
+            "connected": True,  # 마지막 조회에서 백엔드에 연결되었는지
+            "error": None,  # 마지막 조회 오류 메시지 (성공 시 None)
+        }
+
+    def start(self):
+        """조회 스레드를 시작합니다 (이미 실행 중이면 무시)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="balance-feed", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        """조회 스레드를 종료합니다"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.timeout + 1)
+        self._session.close()
+
+    def refresh(self):
+        """다음 조회를 즉시 실행하도록 요청합니다 (주문 직후 등)"""
+        self._wake.set()
+
+    def snapshot(self, wait=None):
+        """
+        마지막 조회 결과를 반환합니다
+
+        매개변수:
+            wait (float, optional): 첫 조회가 끝나지 않았으면 기다릴 최대 시간 (초)
+
+        반환값:
+            dict: balances, total_balance, updated_at, connected, error
+        """
+        with self._lock:
+            idle = time.time() - self._last_read > self.idle_timeout
+            self._last_read = time.time()
+            self.reads += 1
+        if idle:
+            self._wake.set()  # 유휴 상태로 멈춘 조회 재개
+        if wait:
+            self._ready.wait(wait)
+        with self._lock:
+            return dict(self._snapshot)
+
+    def stats(self):
+        """조회/읽기 횟수 (읽기 대비 조회 비율 확인용)"""
+        with self._lock:
+            return {"polls": self.polls, "reads": self.reads}
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self._lock:
+                idle = time.time() - self._last_read > self.idle_timeout
+            if idle:
+                # 읽는 세션이 없으면 다음 읽기(또는 refresh)까지 대기
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            self._poll()
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def _poll(self):
+        try:
+            response = self._session.get(f"{self.api_url}/balance", timeout=self.timeout)
+            response.raise_for_status()  # HTTP 오류 발생 시 예외 발생
+            balances = response.json().get("balances", [])
+            update = {
+                "balances": balances,
+                "total_balance": total_balance_of(balances),
+                "updated_at": time.time(),
+                "connected": True,
+                "error": None,
+            }
+        except requests.exceptions.ConnectionError as e:
+            update = {"connected": False, "error": str(e)}
+        except requests.exceptions.RequestException as e:
+            update = {"connected": True, "error": str(e)}
+        with self._lock:
+            self._snapshot.update(update)
+            self.polls += 1
+        self._ready.set()
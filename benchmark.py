@@ -0,0 +1,452 @@
+"""
+오프라인 벤치마크
+--------------------------------------------------------
+기능:
+- 모의 거래소(sim_exchange)에 실제 트레이딩 코드를 연결하여 API 키 없이 측정
+  - auto_trade_future.main(): 루프 지연 시간, 주문 처리량, DB 쓰기 처리량
+  - auto_sell.auto_sell(): 라운드 지연 시간, 주문 처리량
+  - auto_sell_api: auto_sell() 라운드 및 /balance, /buy, /sell 핸들러 지연 시간
+  - TradeRepository: 거래 기록/종료 쓰기 처리량
+- AI 응답은 규칙 기반 모의 LLM(스트리밍 지원) 또는 기록된 실제 응답 재생(llm_records)으로 대체
+- 코드 안의 대기(time.sleep)는 가상 시계로 바꿔 실제로 기다리지 않음
+
+실행 예:
+    python benchmark.py --cycles 20 --latency 0.05 --llm-latency 2
+--------------------------------------------------------
+"""
+
+import argparse  # 명령행 인자
+import asyncio  # 모의 LLM 스트리밍
+import contextlib  # 출력 숨기기
+import importlib  # 트레이딩 모듈 새로 임포트
+import io  # 출력 버퍼
+import json  # 모의 LLM 응답 / 결과 출력
+import os  # 작업 디렉터리, 환경 변수
+import random  # 모의 LLM 결정
+import statistics  # 지연 시간 통계
+import sys  # 모듈 캐시
+import tempfile  # 임시 DB/작업 디렉터리
+import threading  # 임포트 시 시작되는 스레드 막기
+import time  # 실제 경과 시간
+from unittest import mock  # 스레드 시작 교체
+from types import SimpleNamespace  # OpenAI 응답 형태 흉내
+from sim_exchange import (  # 모의 거래소
+    AsyncSimulatedBinanceFutures,
+    SimulatedBinanceFutures,
+    SimulatedFuturesAccount,
+    SimulatedMarket,
+    SimulatedUpbit,
+    VirtualTime,
+)
+from llm_recorder import LLMRecorder, RecordingChatClient  # 기록된 AI 응답 재생
+from market_stream import ReplayMarketStream  # 모의 계좌 이벤트를 MarketState에 반영
+from trade_repository import TradeRepository  # DB 쓰기 벤치마크
+
+WARMUP_BARS = 8000  # 4시간 봉 30개를 15분 봉으로 만들 수 있는 1분 봉 수
+
+
+def latency_summary(samples):
+    """지연 시간 목록(초)의 요약 통계 (ms)"""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+    return {
+        "count": len(samples),
+        "mean_ms": statistics.fmean(samples) * 1000,
+        "p50_ms": ordered[len(ordered) // 2] * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def rule_based_decision(rng):
+    """무작위로 방향을 고르는 모의 AI 결정 함수를 만듭니다"""
+
+    def decide(messages):
+        direction = rng.choice(["LONG", "SHORT", "NO_POSITION"])
+        return {
+            "direction": direction,
+            "recommended_position_size": 0.2,
+            "recommended_leverage": 3,
+            "stop_loss_percentage": 0.005,
+            "take_profit_percentage": 0.01,
+            "reasoning": "Simulated decision for benchmarking. " * 20,
+        }
+
+    return decide
+
+
+class SimulatedLLM:
+    """
+    AsyncOpenAI와 같은 chat.completions.create()를 가진 모의 LLM
+
+    stream=True면 응답을 조각으로 나눠 latency를 조각마다 나눠서 보냅니다.
+    """
+
+    def __init__(self, decide, latency=0.0, chunk_size=16):
+        """
+        매개변수:
+            decide (callable): messages를 받아 결정 dict를 반환하는 함수
+            latency (float): 응답 전체 지연 시간 (초)
+            chunk_size (int): 스트리밍 조각 크기 (글자 수)
+        """
+        self.decide = decide
+        self.latency = latency
+        self.chunk_size = chunk_size
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, model=None, messages=None, stream=False, **kwargs):
+        self.calls += 1
+        text = json.dumps(self.decide(messages))
+        if not stream:
+            await asyncio.sleep(self.latency)
+            return SimpleNamespace(
+                choices=[SimpleNamespace(message=SimpleNamespace(content=text))]
+            )
+        return self._stream(text)
+
+    async def _stream(self, text):
+        chunks = [
+            text[i : i + self.chunk_size] for i in range(0, len(text), self.chunk_size)
+        ]
+        for chunk in chunks:
+            await asyncio.sleep(self.latency / len(chunks))
+            yield SimpleNamespace(
+                choices=[SimpleNamespace(delta=SimpleNamespace(content=chunk))]
+            )
+
+
+def _fresh_import(name):
+    sys.modules.pop(name, None)
+    return importlib.import_module(name)
+
+
+def _quiet(verbose):
+    return contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+
+
+@contextlib.contextmanager
+def _temp_workdir():
+    """임시 디렉터리에서 실행 (임포트 시 만들어지는 로그 파일이 작업 디렉터리에 남지 않음)"""
+    previous_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            yield workdir
+        finally:
+            os.chdir(previous_dir)
+
+
+def bench_trading_loop(
+    cycles=20, latency=0.0, llm_latency=0.0, seed=0, verbose=False, replay_db=None
+):
+    """
+    auto_trade_future.main()을 모의 거래소에서 실행합니다
+
+    루프마다 한 번 호출되는 시세 조회 시점으로 루프 시작을 구분합니다.
+    DB는 임시 디렉터리에 만듭니다. replay_db를 지정하면 모의 LLM 대신 그 DB에
+    기록된 실제 AI 응답을 기록 순서대로 재생합니다 (llm_latency는 원래 응답 시간 배율).
+
+    반환값:
+        dict: 루프 지연 시간, 주문/초, DB 행/초, 모의 LLM 호출 수
+    """
+    market = SimulatedMarket(latency=latency, seed=seed, warmup_bars=WARMUP_BARS)
+    market.add_symbol("BTC/USDT", 60000.0, 0.001)
+    account = SimulatedFuturesAccount(market, balance=10000.0)
+    if replay_db:
+        recorder = LLMRecorder(
+            os.path.abspath(replay_db), "replay", match="sequence", latency_scale=llm_latency
+        )
+        llm = RecordingChatClient(recorder)
+    else:
+        recorder = None
+        llm = SimulatedLLM(rule_based_decision(random.Random(seed)), llm_latency)
+    os.environ.setdefault("OPENAI_API_KEY", "simulated")
+
+    previous_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            with _quiet(verbose):
+                bot = _fresh_import("auto_trade_future")
+            clock = VirtualTime(market)
+            bot.time = clock
+            sys.modules["candle_store"].time = clock
+            bot.exchange = SimulatedBinanceFutures(account)
+            bot.engine.exchange = AsyncSimulatedBinanceFutures(account)
+            bot.engine.client = llm
+            # 웹소켓 스트림 대신 모의 계좌의 주문/포지션/마크 가격 변경을 재생
+            # (시세 이벤트는 보내지 않으므로 가격은 루프마다 REST로 조회)
+            bot.market_stream = ReplayMarketStream(bot.market_state, [])
+            account.stream_events(bot.market_stream.push)
+
+            def wait_for_fill(timeout):
+                fills = bot.market_state.fills
+                market.run_until(lambda: not fills.empty(), timeout)
+                return None if fills.empty() else fills.get_nowait()
+
+            bot.market_state.wait_for_fill = wait_for_fill
+
+            # 루프 시작 시점 기록 (루프마다 REST 시세 조회가 한 번 일어남)
+            cycle_starts = []
+            fetch_ticker = bot.exchange.fetch_ticker
+
+            def timed_fetch_ticker(symbol):
+                cycle_starts.append(time.perf_counter())
+                return fetch_ticker(symbol)
+
+            bot.exchange.fetch_ticker = timed_fetch_ticker
+
+            started = time.perf_counter()
+            with _quiet(verbose):
+                bot.main(max_cycles=cycles)
+            elapsed = time.perf_counter() - started
+
+            db_rows = bot.repo.conn.execute(
+                "SELECT (SELECT COUNT(*) FROM trades) + (SELECT COUNT(*) FROM ai_analysis)"
+            ).fetchone()[0]
+            closed = bot.repo.conn.execute(
+                "SELECT COUNT(*) FROM trades WHERE status = 'CLOSED'"
+            ).fetchone()[0]
+            for resource in (bot.repo, bot.candle_store, bot.decision_cache):
+                resource.close()
+            if bot.llm_recorder is not None:
+                bot.llm_recorder.close()
+            bot.engine.close()
+        finally:
+            os.chdir(previous_dir)
+
+    cycle_times = [b - a for a, b in zip(cycle_starts, cycle_starts[1:])]
+    return {
+        "cycles": cycles,
+        "elapsed_s": elapsed,
+        "loop_latency": latency_summary(cycle_times),
+        "orders_submitted": account.submitted_orders,
+        "orders_per_s": account.submitted_orders / elapsed if elapsed else 0.0,
+        "db_rows": db_rows,
+        "db_rows_per_s": db_rows / elapsed if elapsed else 0.0,
+        "closed_trades": closed,
+        "llm_calls": recorder.replayed if recorder else llm.calls,
+        "exchange_requests": market.requests,
+        "virtual_hours": clock.slept / 3600,
+        "wallet_usdt": account.wallet,
+    }
+
+
+def _upbit_market(latency, seed):
+    market = SimulatedMarket(latency=latency, seed=seed, warmup_bars=10)
+    market.add_symbol("KRW-BTC", 90_000_000.0, 0.001)
+    market.add_symbol("KRW-XRP", 3000.0, 0.002)
+    upbit = SimulatedUpbit(market, krw=3_000_000.0)
+    return market, upbit
+
+
+def bench_auto_sell(rounds=50, latency=0.0, seed=0):
+    """
+    auto_sell.auto_sell()을 모의 업비트에서 10초(가상) 간격으로 실행합니다
+
+    반환값:
+        dict: 라운드 지연 시간, 주문/초
+    """
+    import pyupbit  # 모의 계좌로 교체할 모듈
+
+    market, upbit = _upbit_market(latency, seed)
+    upbit.deposit("BTC", 0.01, 89_000_000.0)
+    original = upbit.install(pyupbit)
+    os.environ.setdefault("UPBIT_SECRET_KEY", "simulated")
+    with _temp_workdir():
+        try:
+            module = _fresh_import("auto_sell")
+            module.time = VirtualTime(market)
+
+            def delete(url, params=None, headers=None, **kwargs):
+                upbit.cancel_all(params["pairs"])
+                return SimpleNamespace(status_code=200, text="")
+
+            module.requests = SimpleNamespace(delete=delete)
+
+            round_times = []
+            started = time.perf_counter()
+            for _ in range(rounds):
+                round_started = time.perf_counter()
+                module.auto_sell()
+                round_times.append(time.perf_counter() - round_started)
+                module.time.sleep(10)  # schedule.every(10).seconds
+            elapsed = time.perf_counter() - started
+        finally:
+            upbit.restore(pyupbit, original)
+
+    return {
+        "rounds": rounds,
+        "elapsed_s": elapsed,
+        "round_latency": latency_summary(round_times),
+        "orders_submitted": upbit.submitted_orders,
+        "orders_filled": upbit.filled_orders,
+        "orders_per_s": upbit.submitted_orders / elapsed if elapsed else 0.0,
+        "exchange_requests": market.requests,
+    }
+
+
+def bench_auto_sell_api(rounds=50, requests_per_handler=100, latency=0.0, seed=0):
+    """
+    auto_sell_api의 자동 매도 루프와 API 핸들러를 모의 업비트에서 실행합니다
+
+    임포트 시 시작되는 자동 매매 스레드는 시작하지 않고, 같은 함수를 직접 실행해 측정합니다.
+
+    반환값:
+        dict: 라운드 지연 시간, 핸들러별 지연 시간
+    """
+    import pyupbit  # 모의 계좌로 교체할 모듈
+
+    market, upbit = _upbit_market(latency, seed)
+    upbit.deposit("XRP", 1000.0, 3000.0)
+    original = upbit.install(pyupbit)
+    with _temp_workdir():
+        try:
+            # 임포트 시 자동 매매 스레드를 시작하지 않음 (실제 시계로 도는 스레드가 없도록)
+            with mock.patch.object(threading.Thread, "start"):
+                api = _fresh_import("auto_sell_api")
+            completed = []
+
+            def on_sleep(seconds):
+                if seconds == 5:  # 라운드 끝의 time.sleep(5)
+                    completed.append(time.perf_counter())
+                    if len(completed) >= rounds:
+                        api.auto_trading = False
+
+            api.time = VirtualTime(market, on_sleep)
+            api.auto_trading = True
+            started = time.perf_counter()
+            api.auto_sell()
+            round_times = [b - a for a, b in zip([started] + completed, completed)]
+
+            handlers = {}
+            for name, call in (
+                ("balance", lambda: api.get_balance()),
+                ("buy", lambda: api.place_buy_order("XRP", 1.0, 1.0)),
+                ("sell", lambda: api.place_sell_order("XRP")),
+            ):
+                samples = []
+                for _ in range(requests_per_handler):
+                    if name == "sell":
+                        upbit.deposit("XRP", 1.0, 3000.0)
+                    handler_started = time.perf_counter()
+                    call()
+                    samples.append(time.perf_counter() - handler_started)
+                handlers[name] = latency_summary(samples)
+        finally:
+            upbit.restore(pyupbit, original)
+
+    return {
+        "rounds": len(round_times),
+        "round_latency": latency_summary(round_times),
+        "handlers": handlers,
+        "orders_submitted": upbit.submitted_orders,
+        "exchange_requests": market.requests,
+    }
+
+
+def bench_db_writes(trades=1000):
+    """
+    TradeRepository로 거래 기록(진입+분석)과 종료를 반복합니다
+
+    반환값:
+        dict: 거래당 지연 시간, 트랜잭션/초
+    """
+    with tempfile.TemporaryDirectory() as workdir:
+        repo = TradeRepository(os.path.join(workdir, "bench.db"))
+        with _quiet(False):
+            repo.setup_database()
+        analysis = {
+            "current_price": 60000.0,
+            "direction": "LONG",
+            "recommended_position_size": 0.2,
+            "recommended_leverage": 3,
+            "stop_loss_percentage": 0.005,
+            "take_profit_percentage": 0.01,
+            "reasoning": "benchmark",
+        }
+        samples = []
+        started = time.perf_counter()
+        for i in range(trades):
+            trade = {
+                "action": "long" if i % 2 else "short",
+                "entry_price": 60000.0,
+                "amount": 0.01,
+                "leverage": 3,
+                "sl_price": 59700.0,
+                "tp_price": 60600.0,
+                "sl_percentage": 0.005,
+                "tp_percentage": 0.01,
+                "position_size_percentage": 0.2,
+                "investment_amount": 600.0,
+                "entry_order_id": f"bench-{i}",
+            }
+            trade_started = time.perf_counter()
+            trade_id, _ = repo.record_trade_open(analysis, trade)
+            repo.close_trade(
+                trade_id,
+                exit_price=60300.0,
+                exit_timestamp="2024-01-01T00:00:00",
+                profit_loss=3.0,
+                profit_loss_percentage=0.5,
+            )
+            samples.append(time.perf_counter() - trade_started)
+        elapsed = time.perf_counter() - started
+        repo.close()
+
+    return {
+        "trades": trades,
+        "trade_latency": latency_summary(samples),
+        "transactions_per_s": trades * 2 / elapsed if elapsed else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="모의 거래소 오프라인 벤치마크")
+    parser.add_argument(
+        "--only",
+        choices=["trading", "auto_sell", "auto_sell_api", "db"],
+        action="append",
+        help="실행할 벤치마크 (여러 번 지정 가능, 기본 전체)",
+    )
+    parser.add_argument("--cycles", type=int, default=20, help="트레이딩 루프 횟수")
+    parser.add_argument("--rounds", type=int, default=50, help="자동 매도 라운드 수")
+    parser.add_argument("--trades", type=int, default=1000, help="DB 쓰기 거래 수")
+    parser.add_argument("--latency", type=float, default=0.0, help="거래소 요청 지연 (초)")
+    parser.add_argument(
+        "--llm-latency",
+        type=float,
+        default=0.0,
+        help="AI 응답 지연 (초, --replay-db 사용 시 원래 응답 시간 배율)",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="난수 시드")
+    parser.add_argument("--replay-db", help="AI 응답을 재생할 DB 파일 (llm_records)")
+    parser.add_argument("--verbose", action="store_true", help="트레이딩 봇 출력 표시")
+    args = parser.parse_args()
+
+    selected = args.only or ["trading", "auto_sell", "auto_sell_api", "db"]
+    results = {}
+    if "trading" in selected:
+        results["trading"] = bench_trading_loop(
+            args.cycles,
+            args.latency,
+            args.llm_latency,
+            args.seed,
+            args.verbose,
+            args.replay_db,
+        )
+    if "auto_sell" in selected:
+        results["auto_sell"] = bench_auto_sell(args.rounds, args.latency, args.seed)
+    if "auto_sell_api" in selected:
+        results["auto_sell_api"] = bench_auto_sell_api(
+            args.rounds, latency=args.latency, seed=args.seed
+        )
+    if "db" in selected:
+        results["db"] = bench_db_writes(args.trades)
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
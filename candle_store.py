@@ -0,0 +1,223 @@
+"""
+로컬 OHLCV 캔들 저장소
+--------------------------------------------------------
+기능:
+- (심볼, 타임프레임, 시작 시간) 키로 캔들을 SQLite에 영구 저장
+- 첫 조회 이후에는 마지막 저장 캔들 이후의 캔들만 거래소에 요청
+  - 오래 멈췄다가 다시 조회해도 구멍이 생기지 않도록 since로 현재까지 페이지 단위로 이어 받음
+- 요청한 구간은 로컬 데이터에서 DataFrame으로 제공
+- 트레이딩 봇과 대시보드가 같은 DB 파일을 공유
+--------------------------------------------------------
+"""
+
+import threading  # 연결 공유 시 동시 접근 보호
+import time  # 현재 시간 (밀리초)
+import pandas as pd  # 데이터 분석 및 조작
+from trade_repository import connect_database  # 공용 SQLite 연결 설정
+
+OHLCV_COLUMNS = ["timestamp", "open", "high", "low", "close", "volume"]
+
+FETCH_PAGE_LIMIT = 1000  # 거래소 OHLCV 요청 한 번의 최대 캔들 수
+
+CREATE_CANDLES_SQL = """
+CREATE TABLE IF NOT EXISTS candles (
+    symbol TEXT NOT NULL,        -- 거래소:마켓유형:심볼 (예: binance:future:BTC/USDT)
+    timeframe TEXT NOT NULL,     -- 15m, 1h, 4h, 1d ...
+    open_time INTEGER NOT NULL,  -- 캔들 시작 시간 (ms)
+    open REAL NOT NULL,
+    high REAL NOT NULL,
+    low REAL NOT NULL,
+    close REAL NOT NULL,
+    volume REAL NOT NULL,
+    PRIMARY KEY (symbol, timeframe, open_time)
+) WITHOUT ROWID
+"""
+
+# 같은 시작 시간의 캔들은 덮어씀 (진행 중이던 마지막 캔들 갱신)
+UPSERT_CANDLE_SQL = """
+INSERT OR REPLACE INTO candles (
+    symbol, timeframe, open_time, open, high, low, close, volume
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+SELECT_LAST_OPEN_TIME_SQL = """
+SELECT MAX(open_time) FROM candles WHERE symbol = ? AND timeframe = ?
+"""
+
+SELECT_WINDOW_SQL = """
+SELECT open_time, open, high, low, close, volume
+FROM candles
+WHERE symbol = ? AND timeframe = ?
+ORDER BY open_time DESC
+LIMIT ?
+"""
+
+SELECT_RANGE_SQL = """
+SELECT open_time, open, high, low, close, volume
+FROM candles
+WHERE symbol = ? AND timeframe = ? AND open_time >= ? AND open_time < ?
+ORDER BY open_time
+"""
+
+
+class CandleStore:
+    """
+    OHLCV 캔들 저장소
+
+    get_candles()는 저장된 마지막 캔들부터 현재까지의 차이분만 거래소에서 받아
+    저장한 뒤, 요청한 개수만큼의 최신 캔들을 로컬 데이터에서 반환합니다.
+    저장된 캔들은 마지막 저장 캔들까지 빈 구간 없이 이어지도록 유지됩니다.
+    """
+
+    def __init__(self, db_file):
+        """
+        매개변수:
+            db_file (str): 데이터베이스 파일 경로 (trades 테이블과 같은 파일 사용 가능)
+        """
+        self.db_file = db_file
+        self._lock = threading.RLock()
+        self.conn = connect_database(db_file)
+        self.conn.execute(CREATE_CANDLES_SQL)
+
+    def close(self):
+        """데이터베이스 연결을 닫습니다"""
+        with self._lock:
+            self.conn.close()
+
+    @staticmethod
+    def series_key(exchange, symbol):
+        """
+        저장 키로 사용할 심볼 문자열을 만듭니다
+
+        같은 "BTC/USDT"라도 현물과 선물 시세는 다르므로 거래소와 마켓 유형을 포함합니다.
+        """
+        market_type = exchange.options.get("defaultType", "spot")
+        return f"{exchange.id}:{market_type}:{symbol}"
+
+    def save_candles(self, key, timeframe, ohlcv):
+        """
+        거래소 OHLCV 리스트를 저장합니다
+
+        매개변수:
+            key (str): series_key()로 만든 저장 키
+            timeframe (str): 타임프레임
+            ohlcv (list): [[timestamp, open, high, low, close, volume], ...]
+        """
+        rows = [(key, timeframe, int(c[0]), c[1], c[2], c[3], c[4], c[5]) for c in ohlcv]
+        if not rows:
+            return
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.executemany(UPSERT_CANDLE_SQL, rows)
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            else:
+                self.conn.execute("COMMIT")
+
+    def load_window(self, key, timeframe, limit):
+        """
+        저장된 최신 캔들을 오래된 순서로 반환합니다
+
+        매개변수:
+            key (str): 저장 키
+            timeframe (str): 타임프레임
+            limit (int): 캔들 개수
+
+        반환값:
+            DataFrame: timestamp(datetime), open, high, low, close, volume
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                SELECT_WINDOW_SQL, (key, timeframe, limit)
+            ).fetchall()
+        df = pd.DataFrame(rows[::-1], columns=OHLCV_COLUMNS)
+        df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
+        return df
+
+    def load_range(self, key, timeframe, since=None, until=None):
+        """
+        저장된 캔들 중 지정한 기간의 캔들을 오래된 순서로 반환합니다 (백테스트용)
+
+        매개변수:
+            key (str): 저장 키
+            timeframe (str): 타임프레임
+            since (int, optional): 시작 시간 (ms, 포함, 없으면 처음부터)
+            until (int, optional): 끝 시간 (ms, 제외, 없으면 끝까지)
+
+        반환값:
+            DataFrame: timestamp(ms 정수), open, high, low, close, volume
+        """
+        since = 0 if since is None else since
+        until = 2**63 - 1 if until is None else until
+        with self._lock:
+            rows = self.conn.execute(
+                SELECT_RANGE_SQL, (key, timeframe, since, until)
+            ).fetchall()
+        return pd.DataFrame(rows, columns=OHLCV_COLUMNS)
+
+    def get_candles(self, exchange, symbol, timeframe, limit):
+        """
+        최신 캔들 구간을 가져옵니다 (필요한 차이분만 거래소에 요청)
+
+        매개변수:
+            exchange: ccxt 거래소 객체
+            symbol (str): 거래 페어
+            timeframe (str): 타임프레임
+            limit (int): 캔들 개수
+
+        반환값:
+            DataFrame: 오래된 순서의 OHLCV 데이터
+        """
+        key = self.series_key(exchange, symbol)
+
+        with self._lock:
+            last_open_time = self.conn.execute(
+                SELECT_LAST_OPEN_TIME_SQL, (key, timeframe)
+            ).fetchone()[0]
+
+        if last_open_time is None:
+            # 저장 데이터가 없음 → 최신 구간 받기
+            ohlcv = exchange.fetch_ohlcv(symbol, timeframe=timeframe, limit=limit)
+            self.save_candles(key, timeframe, ohlcv)
+        else:
+            # 마지막 저장 캔들(진행 중이었을 수 있음)부터 현재 캔들까지 이어 받기
+            self._fetch_since(exchange, key, symbol, timeframe, last_open_time)
+
+        df = self.load_window(key, timeframe, limit)
+        if len(df) < limit and last_open_time is not None:
+            # 처음 저장한 구간이 요청 개수보다 짧으면 최신 구간을 다시 받음
+            # (저장 구간은 현재까지 이어져 있으므로 합쳐도 빈 구간이 생기지 않음)
+            ohlcv = exchange.fetch_ohlcv(symbol, timeframe=timeframe, limit=limit)
+            self.save_candles(key, timeframe, ohlcv)
+            df = self.load_window(key, timeframe, limit)
+        return df
+
+    def _fetch_since(self, exchange, key, symbol, timeframe, since):
+        """
+        since부터 현재 캔들까지 페이지 단위로 받아 저장합니다
+
+        매개변수:
+            exchange: ccxt 거래소 객체
+            key (str): 저장 키
+            symbol (str): 거래 페어
+            timeframe (str): 타임프레임
+            since (int): 첫 요청 시작 시간 (ms, 포함)
+        """
+        timeframe_ms = exchange.parse_timeframe(timeframe) * 1000
+        while True:
+            now_ms = int(time.time() * 1000)
+            missing = (now_ms - since) // timeframe_ms + 1
+            page_limit = max(1, min(missing + 1, FETCH_PAGE_LIMIT))
+            ohlcv = exchange.fetch_ohlcv(
+                symbol, timeframe=timeframe, since=since, limit=page_limit
+            )
+            self.save_candles(key, timeframe, ohlcv)
+            if not ohlcv:
+                break  # 거래소에 더 받을 캔들이 없음
+            # 거래소가 요청보다 적게 줄 수 있으므로 받은 마지막 캔들 시간으로 판단
+            last_open_time = int(ohlcv[-1][0])
+            if last_open_time + timeframe_ms > now_ms or last_open_time < since:
+                break  # 현재 캔들까지 받음 (또는 더 진행되지 않음)
+            since = last_open_time + timeframe_ms
@@ -0,0 +1,365 @@
+"""
+대시보드 데이터 계층
+--------------------------------------------------------
+기능:
+- 선택한 기간(최근 N일)의 거래만 SQL에서 읽기 (timestamp 인덱스 범위 조회)
+  - 기간별로 메모리의 DataFrame을 유지하고 변경분만 읽기
+  - PRAGMA data_version(다른 연결의 커밋 횟수)이 그대로면 DB를 읽지 않음
+  - data_version이 바뀌어도 거래 표시값(최대 id, 성과 집계 갱신 시간)이 그대로면
+    거래를 다시 읽지 않음 (캔들/결정 캐시/LLM 기록 등 다른 테이블의 커밋)
+  - 마지막으로 본 id(high-water mark) 이후의 새 행과 열린 거래(OPEN)만 다시 읽기
+  - 기간이 지난 행은 메모리에서 제거 → 전체 기록 크기와 관계없이 메모리 일정
+  - 시간 문자열 변환은 새로 읽은 행에만 적용
+- 방향별 거래 수는 기간별 거래 DataFrame에서 집계 (거래가 바뀔 때만 다시 계산)
+- 현재 열린 거래, 최신 AI 분석은 SQL에서 조회
+- AI 분석 근거(reasoning)는 앞부분 미리보기만 읽고 전체 내용은 요청 시 조회
+- Streamlit 서버 프로세스에 하나만 만들어 모든 세션이 공유 (st.cache_resource)
+--------------------------------------------------------
+"""
+
+import threading  # 세션 스레드 간 공유 보호
+from contextlib import contextmanager  # 읽기 트랜잭션 범위
+from datetime import datetime, timedelta  # 기간 시작 시간
+import pandas as pd  # 데이터 분석 및 조작
+from trade_repository import connect_database  # 공용 SQLite 연결 설정
+
+REASONING_PREVIEW = 200  # 미리보기 글자 수
+
+TRADE_COLUMNS = [
+    "id",
+    "timestamp",
+    "action",
+    "entry_price",
+    "exit_price",
+    "amount",
+    "leverage",
+    "status",
+    "profit_loss",
+    "profit_loss_percentage",
+    "exit_timestamp",
+]
+
+# 기간 시작 이후의 거래 (idx_trades_timestamp 범위 조회)
+SELECT_TRADES_IN_WINDOW_SQL = f"""
+SELECT {", ".join(TRADE_COLUMNS)}
+FROM trades
+WHERE timestamp > ?
+"""
+
+SELECT_TRADES_SINCE_SQL = """
+SELECT {columns}
+FROM trades
+WHERE id > ? OR id IN ({open_ids})
+"""
+
+SELECT_MAX_TRADE_ID_SQL = "SELECT COALESCE(MAX(id), 0) FROM trades"
+
+# 거래 변경 표시값: 새 거래는 최대 id, 거래 종료/가져오기는 성과 집계 갱신 시간을 바꿈
+SELECT_TRADE_MARKER_SQL = """
+SELECT
+    (SELECT COALESCE(MAX(id), 0) FROM trades),
+    (SELECT MAX(updated_at) FROM performance_stats)
+"""
+
+# 가장 최근의 열린 거래 (idx_trades_status_timestamp, 기간과 관계없음)
+SELECT_OPEN_TRADE_SQL = f"""
+SELECT {", ".join(TRADE_COLUMNS)}
+FROM trades
+WHERE status = 'OPEN'
+ORDER BY timestamp DESC
+LIMIT 1
+"""
+
+# 최신 AI 분석 (idx_ai_analysis_timestamp, reasoning은 미리보기만)
+SELECT_LATEST_ANALYSIS_SQL = f"""
+SELECT
+    id, timestamp, current_price, direction, recommended_leverage,
+    substr(reasoning, 1, {REASONING_PREVIEW}) AS reasoning_preview,
+    length(reasoning) AS reasoning_length,
+    trade_id
+FROM ai_analysis
+ORDER BY timestamp DESC
+LIMIT ?
+"""
+
+SELECT_REASONING_SQL = "SELECT reasoning FROM ai_analysis WHERE id = ?"
+
+# 조회 경로 점검 대상 (이름, SQL, 예시 파라미터)
+QUERY_PLAN_CHECKS = [
+    ("trades_in_window", SELECT_TRADES_IN_WINDOW_SQL, ("",)),
+    ("open_trade", SELECT_OPEN_TRADE_SQL, ()),
+    ("latest_analysis", SELECT_LATEST_ANALYSIS_SQL, (1,)),
+]
+
+
+def window_start(days):
+    """
+    기간 시작 시간 (trades.timestamp와 같은 현지 시간 ISO 문자열)
+
+    매개변수:
+        days (float): 최근 일수 (None이면 전체 기간)
+
+    반환값:
+        str: 시작 시간 (전체 기간이면 빈 문자열 → 모든 행이 더 큼)
+    """
+    if days is None:
+        return ""
+    return (datetime.now() - timedelta(days=days)).isoformat()
+
+
+def _parse_trade_times(df):
+    df["timestamp"] = pd.to_datetime(df["timestamp"])
+    df["exit_timestamp"] = pd.to_datetime(df["exit_timestamp"])
+    return df
+
+
+def _merge(cached, fetched, replaced_ids=()):
+    """
+    새로 읽은 행을 캐시된 DataFrame에 합칩니다 (같은 id는 새 값으로 교체)
+
+    결과는 timestamp 내림차순이며, 새 행이 모두 기존 행보다 최신이면 정렬하지 않습니다.
+    """
+    if len(replaced_ids):
+        cached = cached[~cached["id"].isin(replaced_ids)]
+    fetched = fetched.sort_values("timestamp", ascending=False, kind="stable")
+    if cached.empty:
+        return fetched.reset_index(drop=True)
+    merged = pd.concat([fetched, cached], ignore_index=True)
+    if len(replaced_ids) or fetched["timestamp"].min() < cached["timestamp"].max():
+        merged = merged.sort_values("timestamp", ascending=False, kind="stable")
+    return merged.reset_index(drop=True)
+
+
+class _TradeWindow:
+    """한 기간의 거래 DataFrame과 증분 조회 위치"""
+
+    def __init__(self, days):
+        self.days = days
+        self.frame = None  # 처음 조회 전에는 None
+        self.hwm = 0  # 마지막으로 본 거래 id
+        self.version = None  # 마지막으로 반영한 거래 버전
+        self.direction_counts = None  # (집계한 frame, 방향별 거래 수)
+
+
+class DashboardData:
+    """
+    기간별로 증분 갱신되는 대시보드 데이터
+
+    반환한 DataFrame은 여러 세션이 공유하므로 호출한 쪽에서 수정하지 않아야
+    합니다 (필터링/copy() 후 사용).
+
+    거래 행은 새로 추가되거나 열린 상태에서 종료될 때만 바뀐다고 가정합니다
+    (TradeRepository의 쓰기 경로와 같음). 종료(close_trade)와 가져오기(import_trades)는
+    성과 집계(performance_stats)를 같은 커밋에서 갱신하므로 거래 표시값으로 확인할 수 있습니다.
+    """
+
+    def __init__(self, db_file):
+        """
+        매개변수:
+            db_file (str): 데이터베이스 파일 경로
+        """
+        self.db_file = db_file
+        self._lock = threading.RLock()
+        self.conn = connect_database(db_file)
+        self.version = 0  # 거래가 바뀔 때마다 증가 (거래 기반 계산 결과 캐시 키)
+        self.reads = 0  # 거래 변경분을 읽은 횟수
+        self.skipped = 0  # 변경이 없어 거래를 읽지 않은 횟수
+        self._data_version = None
+        self._trade_marker = None
+        self._windows = {}  # 일수(None은 전체) → _TradeWindow
+        self._memo = {}  # 같은 data_version 동안 재사용할 조회 결과
+        self._trade_memo = {}  # 같은 거래 버전 동안 재사용할 거래 조회 결과
+
+    def close(self):
+        """데이터베이스 연결을 닫습니다"""
+        with self._lock:
+            self.conn.close()
+
+    def _check_version(self):
+        """
+        DB 변경 여부를 확인하고 바뀐 범위의 조회 결과 캐시를 비웁니다
+
+        data_version은 어느 테이블의 커밋에도 바뀌므로, 바뀐 경우 거래 표시값을 읽어
+        거래가 실제로 바뀌었을 때만 거래 버전을 올리고 거래 캐시를 비웁니다.
+
+        반환값:
+            int: 거래 버전
+        """
+        data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self._data_version:
+            self._data_version = data_version
+            self._memo.clear()
+            marker = self.conn.execute(SELECT_TRADE_MARKER_SQL).fetchone()
+            if marker != self._trade_marker:
+                self._trade_marker = marker
+                self._trade_memo.clear()
+                self.version += 1
+        return self.version
+
+    @contextmanager
+    def _snapshot(self):
+        """여러 조회를 같은 시점의 데이터로 읽기 위한 읽기 트랜잭션"""
+        self.conn.execute("BEGIN")
+        try:
+            yield
+        finally:
+            self.conn.execute("COMMIT")
+
+    def _memoized(self, key, load, trades=False):
+        with self._lock, self._snapshot():
+            self._check_version()
+            memo = self._trade_memo if trades else self._memo
+            if key not in memo:
+                memo[key] = load()
+            return memo[key]
+
+    def get_trades(self, days=None):
+        """
+        기간 안의 거래 (timestamp 내림차순)
+
+        처음 조회할 때는 기간 안의 행만 읽고, 이후에는 새 행과 열린 거래만 읽습니다.
+
+        매개변수:
+            days (float, optional): 최근 일수 (None이면 전체 기간)
+
+        반환값:
+            DataFrame: TRADE_COLUMNS 컬럼
+        """
+        start = window_start(days)
+        with self._lock, self._snapshot():
+            version = self._check_version()
+            window = self._windows.setdefault(days, _TradeWindow(days))
+            if window.version == version:
+                self.skipped += 1
+            elif window.frame is None:
+                self.reads += 1
+                window.hwm = self.conn.execute(SELECT_MAX_TRADE_ID_SQL).fetchone()[0]
+                window.frame = _merge(
+                    pd.DataFrame(columns=TRADE_COLUMNS),
+                    _parse_trade_times(
+                        pd.read_sql_query(
+                            SELECT_TRADES_IN_WINDOW_SQL, self.conn, params=[start]
+                        )
+                    ),
+                )
+            else:
+                self.reads += 1
+                frame = window.frame
+                open_ids = [int(i) for i in frame.loc[frame["status"] == "OPEN", "id"]]
+                fetched = pd.read_sql_query(
+                    SELECT_TRADES_SINCE_SQL.format(
+                        columns=", ".join(TRADE_COLUMNS),
+                        open_ids=", ".join("?" * len(open_ids)),
+                    ),
+                    self.conn,
+                    params=[window.hwm, *open_ids],
+                )
+                if not fetched.empty:
+                    window.frame = _merge(frame, _parse_trade_times(fetched), open_ids)
+                    window.hwm = max(window.hwm, int(fetched["id"].max()))
+            window.version = version
+
+            # 시간이 지나 기간 밖으로 나간 행 제거
+            frame = window.frame
+            if days is not None and not frame.empty:
+                cutoff = pd.Timestamp(start)
+                if frame["timestamp"].iloc[-1] <= cutoff:
+                    window.frame = frame[frame["timestamp"] > cutoff].reset_index(drop=True)
+            return window.frame
+
+    def get_open_trade(self):
+        """
+        가장 최근의 열린 거래 (선택한 기간과 관계없음)
+
+        반환값:
+            Series: 거래 행 (없으면 None)
+        """
+
+        def load():
+            df = pd.read_sql_query(SELECT_OPEN_TRADE_SQL, self.conn)
+            return None if df.empty else _parse_trade_times(df).iloc[0]
+
+        return self._memoized("open_trade", load, trades=True)
+
+    def get_direction_counts(self, days=None):
+        """
+        기간 안의 방향별 거래 수
+
+        get_trades()의 기간 DataFrame에서 집계하며, DataFrame이 바뀌지 않았으면
+        이전 결과를 그대로 반환합니다.
+
+        매개변수:
+            days (float, optional): 최근 일수 (None이면 전체 기간)
+
+        반환값:
+            DataFrame: Direction, Count 컬럼
+        """
+        with self._lock:
+            frame = self.get_trades(days)
+            window = self._windows[days]
+            cached = window.direction_counts
+            if cached is None or cached[0] is not frame:
+                counts = (
+                    frame.groupby("action")
+                    .size()
+                    .reset_index(name="Count")
+                    .rename(columns={"action": "Direction"})
+                )
+                window.direction_counts = (frame, counts)
+            return window.direction_counts[1]
+
+    def get_ai_analysis(self, limit=1):
+        """
+        최신 AI 분석 (timestamp 내림차순, reasoning은 미리보기만 포함)
+
+        매개변수:
+            limit (int): 가져올 분석 수
+
+        반환값:
+            DataFrame: id, timestamp, current_price, direction, recommended_leverage,
+                reasoning_preview, reasoning_length, trade_id
+        """
+
+        def load():
+            df = pd.read_sql_query(SELECT_LATEST_ANALYSIS_SQL, self.conn, params=[limit])
+            df["timestamp"] = pd.to_datetime(df["timestamp"])
+            return df
+
+        return self._memoized(("analysis", limit), load)
+
+    def get_reasoning(self, analysis_id):
+        """
+        AI 분석 근거 전체 내용을 조회합니다
+
+        매개변수:
+            analysis_id (int): ai_analysis ID
+
+        반환값:
+            str: 분석 근거 (없으면 빈 문자열)
+        """
+        with self._lock:
+            row = self.conn.execute(SELECT_REASONING_SQL, (int(analysis_id),)).fetchone()
+        return row[0] if row else ""
+
+    def find_full_scans(self):
+        """
+        인덱스 없이 테이블 전체를 읽거나 정렬에 임시 B-tree가 필요한 대시보드 쿼리를 찾습니다
+
+        반환값:
+            dict: 문제가 있는 쿼리 이름별 해당 실행 계획 단계 목록 (없으면 빈 dict)
+        """
+        regressions = {}
+        with self._lock:
+            for name, sql, params in QUERY_PLAN_CHECKS:
+                details = [
+                    row[3] for row in self.conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+                ]
+                bad_steps = [
+                    detail
+                    for detail in details
+                    if (detail.startswith("SCAN") and "INDEX" not in detail)
+                    or "TEMP B-TREE FOR ORDER BY" in detail
+                ]
+                if bad_steps:
+                    regressions[name] = bad_steps
+        return regressions
@@ -0,0 +1,219 @@
+"""
+AI 트레이딩 결정 캐시
+--------------------------------------------------------
+기능:
+- 시장 상태를 양자화한 지문(fingerprint)을 키로 AI 결정을 저장
+  - 가격 구간, 타임프레임별 주요 지표 구간, 포지션 상태, 최근 거래 ID
+- 같은 지문이면 LLM 호출(10~60초, API 비용) 없이 저장된 결정을 재사용
+- 유효 시간(TTL)과 최대 개수(LRU) 제한
+- ai_analysis와 같은 DB 파일의 decision_cache 테이블에 저장
+- 적중/미스 통계 제공
+--------------------------------------------------------
+"""
+
+import hashlib  # 지문 해시
+import json  # 결정 직렬화
+import math  # 로그 가격 구간
+import threading  # 연결 공유 시 동시 접근 보호
+import time  # 저장/사용 시각
+from trade_repository import connect_database  # 공용 SQLite 연결 설정
+
+PRICE_BUCKET = 0.001  # 가격 구간 폭 (0.1%, 로그 간격)
+RECENT_TRADES = 5  # 지문에 포함할 최근 거래 수
+
+# 지문에 포함할 지표와 구간 폭 (None이면 부호만 사용)
+INDICATOR_BUCKETS = {
+    "rsi": 5,
+    "atr_pct": 0.05,
+    "realized_vol_pct": 0.05,
+    "ema_fast_slope_pct": 0.05,
+    "sma_slope_pct": 0.05,
+    "price_vs_ema_slow_pct": 0.25,
+    "bb_width_pct": 0.25,
+    "volume_ratio": 0.5,
+    "macd_hist": None,
+}
+
+CREATE_DECISION_CACHE_SQL = """
+CREATE TABLE IF NOT EXISTS decision_cache (
+    fingerprint TEXT PRIMARY KEY,   -- 양자화한 시장 상태 해시
+    decision TEXT NOT NULL,         -- AI 결정 JSON
+    created_at REAL NOT NULL,       -- 저장 시각 (epoch 초, TTL 기준)
+    last_used_at REAL NOT NULL,     -- 마지막 사용 시각 (LRU 기준)
+    hits INTEGER NOT NULL DEFAULT 0 -- 재사용 횟수
+) WITHOUT ROWID
+"""
+
+CREATE_DECISION_CACHE_LRU_INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS idx_decision_cache_last_used
+ON decision_cache (last_used_at)
+"""
+
+SELECT_DECISION_SQL = """
+SELECT decision, created_at FROM decision_cache WHERE fingerprint = ?
+"""
+
+TOUCH_DECISION_SQL = """
+UPDATE decision_cache SET last_used_at = ?, hits = hits + 1 WHERE fingerprint = ?
+"""
+
+UPSERT_DECISION_SQL = """
+INSERT INTO decision_cache (fingerprint, decision, created_at, last_used_at)
+VALUES (?, ?, ?, ?)
+ON CONFLICT (fingerprint) DO UPDATE SET
+    decision = excluded.decision,
+    created_at = excluded.created_at,
+    last_used_at = excluded.last_used_at,
+    hits = 0
+"""
+
+DELETE_DECISION_SQL = "DELETE FROM decision_cache WHERE fingerprint = ?"
+
+DELETE_EXPIRED_SQL = "DELETE FROM decision_cache WHERE created_at < ?"
+
+# 최근 사용 순으로 max_entries개를 남기고 삭제
+EVICT_LRU_SQL = """
+DELETE FROM decision_cache
+WHERE fingerprint IN (
+    SELECT fingerprint FROM decision_cache
+    ORDER BY last_used_at DESC
+    LIMIT -1 OFFSET ?
+)
+"""
+
+
+def _bucket(value, step):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if step is None:
+        return (value > 0) - (value < 0)
+    return math.floor(value / step)
+
+
+def make_fingerprint(current_price, indicators, position_state, recent_trade_ids):
+    """
+    시장 상태를 양자화한 지문을 만듭니다
+
+    매개변수:
+        current_price (float): 현재가
+        indicators (dict): 타임프레임별 특징 dict (IndicatorEngine 결과)
+        position_state (str): 포지션 상태 (예: "flat", "long", "short")
+        recent_trade_ids (list): 최근 종료 거래 ID (최신 순)
+
+    반환값:
+        str: SHA-256 해시 문자열
+    """
+    quantized = {
+        "price": math.floor(math.log(current_price) / math.log1p(PRICE_BUCKET)),
+        "indicators": {
+            tf_name: {
+                name: _bucket(tf_features.get(name), step)
+                for name, step in INDICATOR_BUCKETS.items()
+            }
+            for tf_name, tf_features in sorted(indicators.items())
+        },
+        "position": position_state,
+        "trades": list(recent_trade_ids)[:RECENT_TRADES],
+    }
+    encoded = json.dumps(quantized, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class DecisionCache:
+    """
+    AI 결정 캐시 (SQLite, TTL + LRU)
+
+    get()은 유효 시간이 지나지 않은 결정만 반환하고 마지막 사용 시각을 갱신합니다.
+    put()은 결정을 저장한 뒤 만료 항목과 max_entries를 넘는 오래된 항목을 지웁니다.
+    """
+
+    def __init__(self, db_file, ttl_seconds=900, max_entries=256):
+        """
+        매개변수:
+            db_file (str): 데이터베이스 파일 경로 (ai_analysis와 같은 파일)
+            ttl_seconds (float): 결정 유효 시간 (초)
+            max_entries (int): 보관할 최대 결정 수
+        """
+        self.db_file = db_file
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self._lock = threading.RLock()
+        self.conn = connect_database(db_file)
+        self.conn.execute(CREATE_DECISION_CACHE_SQL)
+        self.conn.execute(CREATE_DECISION_CACHE_LRU_INDEX_SQL)
+
+    def close(self):
+        """데이터베이스 연결을 닫습니다"""
+        with self._lock:
+            self.conn.close()
+
+    def get(self, fingerprint):
+        """
+        저장된 결정을 가져옵니다
+
+        매개변수:
+            fingerprint (str): make_fingerprint() 결과
+
+        반환값:
+            dict: AI 결정 (없거나 만료되었으면 None)
+        """
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute(SELECT_DECISION_SQL, (fingerprint,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            decision, created_at = row
+            if now - created_at > self.ttl_seconds:
+                self.conn.execute(DELETE_DECISION_SQL, (fingerprint,))
+                self.expired += 1
+                self.misses += 1
+                return None
+            self.conn.execute(TOUCH_DECISION_SQL, (now, fingerprint))
+            self.hits += 1
+        return json.loads(decision)
+
+    def put(self, fingerprint, decision):
+        """
+        결정을 저장하고 만료/초과 항목을 정리합니다
+
+        매개변수:
+            fingerprint (str): make_fingerprint() 결과
+            decision (dict): AI 결정
+        """
+        now = time.time()
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.execute(
+                    UPSERT_DECISION_SQL,
+                    (fingerprint, json.dumps(decision, ensure_ascii=False), now, now),
+                )
+                self.conn.execute(DELETE_EXPIRED_SQL, (now - self.ttl_seconds,))
+                self.conn.execute(EVICT_LRU_SQL, (self.max_entries,))
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            else:
+                self.conn.execute("COMMIT")
+
+    def stats(self):
+        """
+        캐시 적중 통계를 반환합니다
+
+        반환값:
+            dict: hits, misses, expired, hit_rate(%), entries
+        """
+        with self._lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM decision_cache").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "hit_rate": self.hits / lookups * 100 if lookups else 0.0,
+            "entries": entries,
+        }
@@ -0,0 +1,184 @@
+"""
+AI 트레이딩 결정 파싱 및 검증
+--------------------------------------------------------
+기능:
+- 스트리밍 응답 조각을 받으면서 JSON 객체의 필드를 완성되는 대로 추출
+- 6개 필수 필드의 타입/범위 검증
+- 흔한 형식 오류(코드 블록, 앞뒤 설명 문장, 끝 쉼표) 자동 복구
+--------------------------------------------------------
+"""
+
+import json  # JSON 값 해석
+import re  # 끝 쉼표 제거
+
+DIRECTIONS = ("LONG", "SHORT", "NO_POSITION")
+
+# reasoning을 제외한 주문 결정에 필요한 필드
+DECISION_FIELDS = (
+    "direction",
+    "recommended_position_size",
+    "recommended_leverage",
+    "stop_loss_percentage",
+    "take_profit_percentage",
+)
+REQUIRED_FIELDS = DECISION_FIELDS + ("reasoning",)
+
+_decoder = json.JSONDecoder()
+
+
+class DecisionError(ValueError):
+    """AI 응답이 올바른 트레이딩 결정이 아닐 때 발생"""
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def validate_decision(fields, require_reasoning=True):
+    """
+    결정 필드를 검증하고 정규화한 dict를 반환합니다
+
+    LONG/SHORT일 때만 크기, 레버리지, SL/TP 범위를 확인합니다.
+
+    매개변수:
+        fields (dict): 파싱한 필드
+        require_reasoning (bool): reasoning 필드 필수 여부
+
+    반환값:
+        dict: direction은 대문자, 레버리지는 정수로 정규화한 결정
+
+    예외:
+        DecisionError: 누락되었거나 잘못된 필드가 있을 때 (모든 문제를 한 번에 보고)
+    """
+    required = REQUIRED_FIELDS if require_reasoning else DECISION_FIELDS
+    errors = [f"missing '{name}'" for name in required if name not in fields]
+    if errors:
+        raise DecisionError("; ".join(errors))
+
+    decision = {name: fields[name] for name in REQUIRED_FIELDS if name in fields}
+    direction = str(decision["direction"]).upper()
+    if direction not in DIRECTIONS:
+        errors.append(f"direction must be one of {'/'.join(DIRECTIONS)}")
+    decision["direction"] = direction
+
+    for name in DECISION_FIELDS[1:]:
+        if not _is_number(decision[name]):
+            errors.append(f"'{name}' must be a number")
+    if require_reasoning and not isinstance(decision["reasoning"], str):
+        errors.append("'reasoning' must be a string")
+    if errors:
+        raise DecisionError("; ".join(errors))
+
+    leverage = decision["recommended_leverage"]
+    if leverage != int(leverage):
+        errors.append("'recommended_leverage' must be an integer")
+    decision["recommended_leverage"] = int(leverage)
+
+    if direction != "NO_POSITION":
+        if not 0 < decision["recommended_position_size"] <= 1:
+            errors.append("'recommended_position_size' must be in (0, 1]")
+        if not 1 <= decision["recommended_leverage"] <= 20:
+            errors.append("'recommended_leverage' must be between 1 and 20")
+        for name in ("stop_loss_percentage", "take_profit_percentage"):
+            if not 0 < decision[name] < 1:
+                errors.append(f"'{name}' must be a decimal in (0, 1)")
+    if errors:
+        raise DecisionError("; ".join(errors))
+    return decision
+
+
+def repair_json(text):
+    """
+    AI 응답에서 JSON 객체를 추출해 파싱합니다
+
+    코드 블록 표시, 객체 앞뒤의 설명 문장, 닫는 괄호 앞의 쉼표를 제거합니다.
+
+    예외:
+        DecisionError: 복구 후에도 JSON 객체가 아닐 때
+    """
+    start = text.find("{")
+    end = text.rfind("}")
+    if start < 0 or end < start:
+        raise DecisionError("no JSON object found")
+    candidate = re.sub(r",\s*([}\]])", r"\1", text[start : end + 1])
+    try:
+        value = json.loads(candidate)
+    except json.JSONDecodeError as e:
+        raise DecisionError(f"invalid JSON: {e}") from e
+    if not isinstance(value, dict):
+        raise DecisionError("response is not a JSON object")
+    return value
+
+
+def parse_decision(text):
+    """응답 전체를 복구/파싱/검증합니다 (repair_json + validate_decision)"""
+    return validate_decision(repair_json(text))
+
+
+class IncrementalDecisionParser:
+    """
+    스트리밍 JSON 객체 파서
+
+    feed()로 응답 조각을 넣으면 최상위 객체에서 값이 끝난(뒤에 , 또는 }가 온)
+    필드를 fields에 추가합니다. 숫자는 다음 조각에서 자릿수가 이어질 수 있으므로
+    구분 문자가 도착한 뒤에만 확정합니다. 형식 오류는 여기서 판단하지 않고
+    전체 응답을 parse_decision()으로 처리할 때 확인합니다.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.fields = {}
+        self.complete = False  # 닫는 } 도착 여부
+        self._pos = None  # 다음 필드를 읽을 위치 (여는 { 이후)
+
+    def feed(self, chunk):
+        """
+        응답 조각을 추가합니다
+
+        반환값:
+            dict: 지금까지 완성된 필드
+        """
+        self.text += chunk
+        if self._pos is None:
+            start = self.text.find("{")
+            if start < 0:
+                return self.fields
+            self._pos = start + 1
+        while not self.complete and self._read_member():
+            pass
+        return self.fields
+
+    def has_fields(self, names):
+        return all(name in self.fields for name in names)
+
+    def _skip_whitespace(self, pos):
+        while pos < len(self.text) and self.text[pos].isspace():
+            pos += 1
+        return pos
+
+    def _read_member(self):
+        """필드 하나를 읽으면 True, 더 많은 입력이 필요하면 False"""
+        text = self.text
+        pos = self._skip_whitespace(self._pos)
+        if pos < len(text) and text[pos] == ",":
+            pos = self._skip_whitespace(pos + 1)
+        if pos >= len(text):
+            return False
+        if text[pos] == "}":
+            self.complete = True
+            self._pos = pos + 1
+            return True
+        try:
+            key, pos = _decoder.raw_decode(text, pos)
+            pos = self._skip_whitespace(pos)
+            if pos >= len(text) or text[pos] != ":":
+                return False
+            value, pos = _decoder.raw_decode(text, self._skip_whitespace(pos + 1))
+        except json.JSONDecodeError:
+            return False  # 아직 끝나지 않은 문자열/값
+        pos = self._skip_whitespace(pos)
+        if pos >= len(text) or text[pos] not in ",}":
+            return False
+        self.fields[key] = value
+        self._pos = pos
+        return True
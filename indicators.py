@@ -0,0 +1,502 @@
+"""
+기술적 지표 계산 엔진
+--------------------------------------------------------
+기능:
+- 타임프레임별 OHLCV DataFrame에 대해 pandas/NumPy 벡터 연산으로 지표 계산
+  - ATR, 실현 변동성, EMA/SMA 및 기울기, RSI, MACD, 볼린저 밴드 폭
+  - 피벗 지지/저항, 스윙 고점/저점, 거래량 비율
+- 마지막 캔들 기준 요약 값(특징 벡터)만 AI 프롬프트에 전달
+- 증분 모드: 완성된 캔들마다 O(1)로 지표 상태 갱신 (EMA, Wilder RSI/ATR,
+  Welford 구간 평균/분산, 단조 deque 구간 최대/최소), 상태는 JSON으로 저장
+--------------------------------------------------------
+"""
+
+import json  # 증분 지표 상태 저장
+import os  # 상태 파일 교체
+from collections import deque  # 구간 값 / 단조 큐
+import numpy as np  # 벡터 연산
+import pandas as pd  # 데이터 분석 및 조작
+from ohlcv_resample import timeframe_to_ms  # 타임프레임 길이 (ms)
+
+# 지표 기간 설정 (ta 라이브러리 기본값과 동일)
+ATR_PERIOD = 14
+RSI_PERIOD = 14
+EMA_FAST = 20
+EMA_SLOW = 50
+SMA_PERIOD = 20
+MACD_FAST = 12
+MACD_SLOW = 26
+MACD_SIGNAL = 9
+BB_PERIOD = 20
+BB_STD = 2
+VOL_PERIOD = 20  # 실현 변동성 / 거래량 평균 기간
+SLOPE_BARS = 5  # 기울기 계산 구간 (캔들 수)
+SWING_BARS = 20  # 스윙 고점/저점 구간
+
+
+def compute_indicators(df):
+    """
+    OHLCV DataFrame에 지표 컬럼을 추가한 새 DataFrame을 반환합니다
+
+    RSI와 ATR은 Wilder 평활(alpha=1/기간)을 사용합니다.
+
+    매개변수:
+        df (DataFrame): 오래된 순서의 timestamp, open, high, low, close, volume
+
+    반환값:
+        DataFrame: 원본 컬럼 + 지표 컬럼
+    """
+    out = df.copy()
+    high = out["high"]
+    low = out["low"]
+    close = out["close"]
+    prev_close = close.shift(1)
+
+    # ATR (Average True Range)
+    true_range = pd.concat(
+        [high - low, (high - prev_close).abs(), (low - prev_close).abs()], axis=1
+    ).max(axis=1)
+    out["atr"] = true_range.ewm(alpha=1 / ATR_PERIOD, adjust=False).mean()
+
+    # 실현 변동성 (로그 수익률 표준편차)
+    log_returns = np.log(close / prev_close)
+    out["realized_vol"] = log_returns.rolling(VOL_PERIOD, min_periods=2).std()
+
+    # 이동평균
+    out["ema_fast"] = close.ewm(span=EMA_FAST, adjust=False).mean()
+    out["ema_slow"] = close.ewm(span=EMA_SLOW, adjust=False).mean()
+    out["sma"] = close.rolling(SMA_PERIOD, min_periods=1).mean()
+
+    # RSI (Wilder)
+    delta = close.diff()
+    gain = delta.clip(lower=0).ewm(alpha=1 / RSI_PERIOD, adjust=False).mean()
+    loss = (-delta.clip(upper=0)).ewm(alpha=1 / RSI_PERIOD, adjust=False).mean()
+    rs = gain / loss.replace(0, np.nan)
+    out["rsi"] = (100 - 100 / (1 + rs)).fillna(100).where(loss.notna())
+
+    # MACD
+    macd = (
+        close.ewm(span=MACD_FAST, adjust=False).mean()
+        - close.ewm(span=MACD_SLOW, adjust=False).mean()
+    )
+    out["macd"] = macd
+    out["macd_signal"] = macd.ewm(span=MACD_SIGNAL, adjust=False).mean()
+    out["macd_hist"] = out["macd"] - out["macd_signal"]
+
+    # 볼린저 밴드 폭 (상단-하단) / 중심선
+    bb_mid = close.rolling(BB_PERIOD, min_periods=2).mean()
+    bb_std = close.rolling(BB_PERIOD, min_periods=2).std(ddof=0)
+    out["bb_width"] = (2 * BB_STD * bb_std) / bb_mid
+
+    # 거래량 비율 (현재 / 평균)
+    out["volume_ratio"] = out["volume"] / out["volume"].rolling(
+        VOL_PERIOD, min_periods=1
+    ).mean()
+    return out
+
+
+def _pct(value, base):
+    return float(value / base * 100) if base else 0.0
+
+
+def summarize_features(ind_df):
+    """
+    지표 DataFrame의 마지막 캔들 기준 특징 값을 추출합니다
+
+    피벗은 직전에 완성된 캔들(마지막에서 두 번째)로 계산합니다.
+    window_change_pct와 스윙 고점/저점은 최근 SWING_BARS개 캔들 기준입니다.
+
+    매개변수:
+        ind_df (DataFrame): compute_indicators() 결과
+
+    반환값:
+        dict: 특징 이름별 값 (가격은 그대로, 비율은 %)
+    """
+    last = ind_df.iloc[-1]
+    close = float(last["close"])
+    slope_base = ind_df.iloc[-1 - SLOPE_BARS] if len(ind_df) > SLOPE_BARS else ind_df.iloc[0]
+    completed = ind_df.iloc[-2] if len(ind_df) > 1 else last
+    swing = ind_df.tail(SWING_BARS)
+
+    # 클래식 피벗 포인트
+    pivot = (completed["high"] + completed["low"] + completed["close"]) / 3
+    bar_range = completed["high"] - completed["low"]
+
+    return {
+        "close": close,
+        "window_change_pct": _pct(close - swing.iloc[0]["open"], swing.iloc[0]["open"]),
+        "atr": float(last["atr"]),
+        "atr_pct": _pct(last["atr"], close),
+        "realized_vol_pct": float(last["realized_vol"] * 100),
+        "ema_fast": float(last["ema_fast"]),
+        "ema_slow": float(last["ema_slow"]),
+        "ema_fast_slope_pct": _pct(
+            last["ema_fast"] - slope_base["ema_fast"], slope_base["ema_fast"]
+        ),
+        "sma": float(last["sma"]),
+        "sma_slope_pct": _pct(last["sma"] - slope_base["sma"], slope_base["sma"]),
+        "price_vs_ema_slow_pct": _pct(close - last["ema_slow"], last["ema_slow"]),
+        "rsi": float(last["rsi"]),
+        "macd": float(last["macd"]),
+        "macd_signal": float(last["macd_signal"]),
+        "macd_hist": float(last["macd_hist"]),
+        "bb_width_pct": float(last["bb_width"] * 100),
+        "volume_ratio": float(last["volume_ratio"]),
+        "pivot": float(pivot),
+        "resistance_1": float(2 * pivot - completed["low"]),
+        "support_1": float(2 * pivot - completed["high"]),
+        "resistance_2": float(pivot + bar_range),
+        "support_2": float(pivot - bar_range),
+        "swing_high": float(swing["high"].max()),
+        "swing_low": float(swing["low"].min()),
+    }
+
+
+class _Ema:
+    """지수 이동평균 (첫 값으로 시작, pandas ewm(adjust=False)와 같은 결과)"""
+
+    def __init__(self, alpha, value=None):
+        self.alpha = alpha
+        self.value = value
+
+    def update(self, x):
+        if self.value is None:
+            self.value = x
+        else:
+            self.value += self.alpha * (x - self.value)
+        return self.value
+
+
+class _RollingStats:
+    """고정 구간 평균/분산 (Welford 추가/제거)"""
+
+    def __init__(self, window, values=None):
+        self.window = window
+        self.values = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+        for x in values or []:
+            self.update(x)
+
+    def update(self, x):
+        if len(self.values) == self.window:
+            old = self.values.popleft()
+            count = len(self.values)
+            if count == 0:
+                self.mean, self.m2 = 0.0, 0.0
+            else:
+                delta = old - self.mean
+                self.mean -= delta / count
+                self.m2 -= delta * (old - self.mean)
+        self.values.append(x)
+        delta = x - self.mean
+        self.mean += delta / len(self.values)
+        self.m2 += delta * (x - self.mean)
+        self.m2 = max(self.m2, 0.0)  # 부동소수점 오차로 음수가 되는 것 방지
+
+    def std(self, ddof=0):
+        count = len(self.values)
+        if count - ddof <= 0:
+            return float("nan")
+        return float(np.sqrt(self.m2 / (count - ddof)))
+
+
+class _RollingExtreme:
+    """고정 구간 최대/최소 (단조 deque, 항목: [캔들 번호, 값])"""
+
+    def __init__(self, window, is_max, items=None):
+        self.window = window
+        self.is_max = is_max
+        self.items = deque(tuple(item) for item in items or [])
+
+    def update(self, index, x):
+        items = self.items
+        while items and (items[-1][1] <= x if self.is_max else items[-1][1] >= x):
+            items.pop()
+        items.append((index, x))
+        while items[0][0] <= index - self.window:
+            items.popleft()
+
+    @property
+    def value(self):
+        return self.items[0][1]
+
+
+class StreamingIndicators:
+    """
+    한 타임프레임의 증분 지표 상태
+
+    완성된 캔들 하나마다 update()로 O(1) 갱신하며, compute_indicators()와 같은
+    기간/공식을 사용합니다. to_dict()/from_dict()로 JSON 저장이 가능하므로
+    재시작 후에도 과거 캔들을 다시 계산하지 않고 이어서 갱신할 수 있습니다.
+    """
+
+    def __init__(self):
+        self.count = 0  # 반영한 캔들 수 (극값 구간 인덱스)
+        self.last_open_time = None  # 마지막으로 반영한 캔들 시작 시간 (ms)
+        self.last_candle = None  # [open, high, low, close, volume]
+        self.prev_close = None
+        self.atr = _Ema(1 / ATR_PERIOD)
+        self.avg_gain = _Ema(1 / RSI_PERIOD)
+        self.avg_loss = _Ema(1 / RSI_PERIOD)
+        self.ema_fast = _Ema(2 / (EMA_FAST + 1))
+        self.ema_slow = _Ema(2 / (EMA_SLOW + 1))
+        self.macd_fast = _Ema(2 / (MACD_FAST + 1))
+        self.macd_slow = _Ema(2 / (MACD_SLOW + 1))
+        self.macd_signal = _Ema(2 / (MACD_SIGNAL + 1))
+        self.closes = _RollingStats(BB_PERIOD)  # SMA와 볼린저 밴드 (같은 기간)
+        self.log_returns = _RollingStats(VOL_PERIOD)
+        self.volumes = _RollingStats(VOL_PERIOD)
+        self.swing_high = _RollingExtreme(SWING_BARS, is_max=True)
+        self.swing_low = _RollingExtreme(SWING_BARS, is_max=False)
+        self.swing_opens = deque(maxlen=SWING_BARS)
+        self.ema_fast_history = deque(maxlen=SLOPE_BARS + 1)
+        self.sma_history = deque(maxlen=SLOPE_BARS + 1)
+
+    def update(self, open_time, open_, high, low, close, volume):
+        """
+        완성된 캔들 하나를 반영합니다
+
+        이미 반영한 시간 이전의 캔들은 무시합니다.
+
+        반환값:
+            bool: 반영 여부
+        """
+        if self.last_open_time is not None and open_time <= self.last_open_time:
+            return False
+
+        prev_close = self.prev_close
+        if prev_close is None:
+            true_range = high - low
+        else:
+            true_range = max(high - low, abs(high - prev_close), abs(low - prev_close))
+            delta = close - prev_close
+            self.avg_gain.update(max(delta, 0.0))
+            self.avg_loss.update(max(-delta, 0.0))
+            self.log_returns.update(float(np.log(close / prev_close)))
+        self.atr.update(true_range)
+
+        self.ema_fast.update(close)
+        self.ema_slow.update(close)
+        self.macd_signal.update(self.macd_fast.update(close) - self.macd_slow.update(close))
+        self.closes.update(close)
+        self.volumes.update(volume)
+        self.swing_high.update(self.count, high)
+        self.swing_low.update(self.count, low)
+        self.swing_opens.append(open_)
+        self.ema_fast_history.append(self.ema_fast.value)
+        self.sma_history.append(self.closes.mean)
+
+        self.count += 1
+        self.last_open_time = int(open_time)
+        self.last_candle = [open_, high, low, close, volume]
+        self.prev_close = close
+        return True
+
+    def features(self, current_price=None):
+        """
+        현재 상태의 특징 값을 summarize_features()와 같은 키로 반환합니다
+
+        지표는 마지막 완성 캔들 기준이며, current_price를 주면 close와
+        가격 대비 비율(atr_pct, price_vs_ema_slow_pct, window_change_pct)에만 사용합니다.
+
+        매개변수:
+            current_price (float, optional): 진행 중인 캔들의 현재가
+
+        반환값:
+            dict: 특징 이름별 값
+        """
+        open_, high, low, last_close, volume = self.last_candle
+        close = float(current_price if current_price is not None else last_close)
+        avg_loss = self.avg_loss.value
+        if avg_loss is None:
+            rsi = float("nan")
+        elif avg_loss == 0:
+            rsi = 100.0
+        else:
+            rsi = 100 - 100 / (1 + self.avg_gain.value / avg_loss)
+        macd = self.macd_fast.value - self.macd_slow.value
+        sma = self.closes.mean
+        bb_width = (
+            2 * BB_STD * self.closes.std(ddof=0) / sma
+            if len(self.closes.values) >= 2
+            else float("nan")
+        )
+        pivot = (high + low + last_close) / 3
+        bar_range = high - low
+        ema_base = self.ema_fast_history[0]
+        sma_base = self.sma_history[0]
+        swing_open = self.swing_opens[0]
+
+        return {
+            "close": close,
+            "window_change_pct": _pct(close - swing_open, swing_open),
+            "atr": float(self.atr.value),
+            "atr_pct": _pct(self.atr.value, close),
+            "realized_vol_pct": self.log_returns.std(ddof=1) * 100,
+            "ema_fast": float(self.ema_fast.value),
+            "ema_slow": float(self.ema_slow.value),
+            "ema_fast_slope_pct": _pct(self.ema_fast.value - ema_base, ema_base),
+            "sma": float(sma),
+            "sma_slope_pct": _pct(sma - sma_base, sma_base),
+            "price_vs_ema_slow_pct": _pct(close - self.ema_slow.value, self.ema_slow.value),
+            "rsi": float(rsi),
+            "macd": float(macd),
+            "macd_signal": float(self.macd_signal.value),
+            "macd_hist": float(macd - self.macd_signal.value),
+            "bb_width_pct": float(bb_width * 100),
+            "volume_ratio": float(volume / self.volumes.mean) if self.volumes.mean else 0.0,
+            "pivot": float(pivot),
+            "resistance_1": float(2 * pivot - low),
+            "support_1": float(2 * pivot - high),
+            "resistance_2": float(pivot + bar_range),
+            "support_2": float(pivot - bar_range),
+            "swing_high": float(self.swing_high.value),
+            "swing_low": float(self.swing_low.value),
+        }
+
+    def to_dict(self):
+        """JSON으로 저장할 수 있는 상태 dict를 반환합니다"""
+        return {
+            "count": self.count,
+            "last_open_time": self.last_open_time,
+            "last_candle": self.last_candle,
+            "prev_close": self.prev_close,
+            "ema": {
+                name: getattr(self, name).value
+                for name in [
+                    "atr", "avg_gain", "avg_loss", "ema_fast", "ema_slow",
+                    "macd_fast", "macd_slow", "macd_signal",
+                ]
+            },
+            "closes": list(self.closes.values),
+            "log_returns": list(self.log_returns.values),
+            "volumes": list(self.volumes.values),
+            "swing_high": [list(item) for item in self.swing_high.items],
+            "swing_low": [list(item) for item in self.swing_low.items],
+            "swing_opens": list(self.swing_opens),
+            "ema_fast_history": list(self.ema_fast_history),
+            "sma_history": list(self.sma_history),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """to_dict() 결과로 상태를 복원합니다"""
+        state = cls()
+        state.count = data["count"]
+        state.last_open_time = data["last_open_time"]
+        state.last_candle = data["last_candle"]
+        state.prev_close = data["prev_close"]
+        for name, value in data["ema"].items():
+            getattr(state, name).value = value
+        # 구간 평균/분산은 저장된 값으로 다시 누적 (구간 길이만큼이라 O(구간))
+        state.closes = _RollingStats(BB_PERIOD, data["closes"])
+        state.log_returns = _RollingStats(VOL_PERIOD, data["log_returns"])
+        state.volumes = _RollingStats(VOL_PERIOD, data["volumes"])
+        state.swing_high = _RollingExtreme(SWING_BARS, True, data["swing_high"])
+        state.swing_low = _RollingExtreme(SWING_BARS, False, data["swing_low"])
+        state.swing_opens.extend(data["swing_opens"])
+        state.ema_fast_history.extend(data["ema_fast_history"])
+        state.sma_history.extend(data["sma_history"])
+        return state
+
+
+class StreamingIndicatorEngine:
+    """
+    타임프레임별 증분 지표 엔진
+
+    compute_features()는 타임프레임별 OHLCV DataFrame을 받아 summarize_features()와 같은
+    특징 값을 반환하며, 매번 전체 구간을 다시 계산하지 않고 새로 완성된 캔들만 상태에
+    반영합니다. 진행 중인 마지막 캔들은 상태에 넣지 않고 현재가로만 사용합니다.
+
+    state_file을 주면 갱신 후 상태를 JSON으로 저장하고 시작할 때 불러옵니다.
+    저장된 상태와 받은 캔들 사이에 빈 구간이 있으면 받은 캔들로 상태를 새로 만듭니다.
+    """
+
+    def __init__(self, state_file=None):
+        self.state_file = state_file
+        self.states = {}  # {타임프레임: StreamingIndicators}
+        self.updates = 0  # 반영한 캔들 수
+        self.rebuilds = 0  # 상태를 새로 만든 횟수
+        if state_file and os.path.exists(state_file):
+            try:
+                with open(state_file, "r", encoding="utf-8") as f:
+                    saved = json.load(f)
+                self.states = {
+                    tf_name: StreamingIndicators.from_dict(data)
+                    for tf_name, data in saved.items()
+                }
+            except (OSError, ValueError, KeyError) as e:
+                print(f"지표 상태 불러오기 실패, 새로 계산합니다: {e}")
+                self.states = {}
+
+    def save(self):
+        """현재 상태를 state_file에 저장합니다"""
+        if not self.state_file:
+            return
+        tmp_file = f"{self.state_file}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(
+                {tf_name: state.to_dict() for tf_name, state in self.states.items()}, f
+            )
+        os.replace(tmp_file, self.state_file)
+
+    def update_candle(self, tf_name, open_time, open_, high, low, close, volume):
+        """
+        스트림 등에서 받은 완성 캔들 하나를 반영합니다
+
+        반환값:
+            bool: 반영 여부
+        """
+        state = self.states.setdefault(tf_name, StreamingIndicators())
+        updated = state.update(open_time, open_, high, low, close, volume)
+        self.updates += updated
+        return updated
+
+    def _sync(self, tf_name, df):
+        """DataFrame의 완성 캔들 중 아직 반영하지 않은 것만 상태에 넣습니다"""
+        closed = df.iloc[:-1]
+        if closed.empty:
+            return False
+        open_times = closed["timestamp"].to_numpy(dtype="datetime64[ms]").astype(np.int64)
+        state = self.states.get(tf_name)
+        if state is not None and state.last_open_time is not None:
+            # 저장된 마지막 캔들이 받은 구간 밖이면 중간 캔들이 빠진 것
+            if state.last_open_time < open_times[0] - timeframe_to_ms(tf_name):
+                state = None
+        if state is None:
+            state = self.states[tf_name] = StreamingIndicators()
+            self.rebuilds += 1
+
+        start = np.searchsorted(open_times, (state.last_open_time or -1), side="right")
+        if start >= len(open_times):
+            return False
+        values = closed[["open", "high", "low", "close", "volume"]].to_numpy(dtype=float)
+        for open_time, row in zip(open_times[start:], values[start:]):
+            state.update(int(open_time), *row.tolist())
+        self.updates += len(open_times) - start
+        return True
+
+    def compute_features(self, multi_tf_data):
+        """
+        모든 타임프레임의 특징 값을 계산합니다
+
+        매개변수:
+            multi_tf_data (dict): 타임프레임별 OHLCV DataFrame (마지막 캔들은 진행 중)
+
+        반환값:
+            dict: 타임프레임별 특징 dict
+        """
+        features = {}
+        changed = False
+        for tf_name, df in multi_tf_data.items():
+            if df.empty:
+                continue
+            changed |= self._sync(tf_name, df)
+            state = self.states.get(tf_name)
+            if state is None or state.last_candle is None:
+                continue
+            features[tf_name] = state.features(float(df.iloc[-1]["close"]))
+        if changed:
+            self.save()
+        return features
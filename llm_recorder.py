@@ -0,0 +1,252 @@
+"""
+AI 요청/응답 기록 및 재생
+--------------------------------------------------------
+기능:
+- OpenAI chat.completions 호출을 감싸 요청(모델, 메시지)과 응답 원문을 저장
+  - 요청 해시(SHA-256)를 키로 zlib 압축하여 llm_records 테이블에 저장
+  - 스트리밍 응답은 끝까지 받은 경우에만 저장
+- 재생 모드: 네트워크 호출 없이 저장된 응답을 스트리밍/일반 응답 형태로 반환
+  - hash: 같은 요청의 응답만 재생 (회귀 테스트)
+  - sequence: 요청과 관계없이 기록 순서대로 재생 (모의 거래소 벤치마크)
+- 백테스트에서 기록된 응답을 시간순으로 읽을 수 있도록 records() 제공
+--------------------------------------------------------
+"""
+
+import asyncio  # 재생 지연
+import hashlib  # 요청 해시
+import json  # 메시지 직렬화
+import threading  # 연결 공유 시 동시 접근 보호
+import time  # 기록 시각 / 응답 시간
+import zlib  # 요청/응답 압축
+from types import SimpleNamespace  # OpenAI 응답 형태
+from trade_repository import connect_database  # 공용 SQLite 연결 설정
+
+MODES = ("record", "replay")
+MATCH_MODES = ("hash", "sequence")
+REPLAY_CHUNK = 64  # 재생 스트리밍 조각 크기 (글자 수)
+
+CREATE_LLM_RECORDS_SQL = """
+CREATE TABLE IF NOT EXISTS llm_records (
+    id INTEGER PRIMARY KEY,             -- 기록 순서
+    request_hash TEXT NOT NULL UNIQUE,  -- 모델 + 메시지 해시
+    model TEXT NOT NULL,                -- 모델 이름
+    request BLOB NOT NULL,              -- 메시지 JSON (zlib)
+    response BLOB NOT NULL,             -- 응답 원문 (zlib)
+    created_at REAL NOT NULL,           -- 응답 완료 시각 (epoch 초)
+    latency_ms REAL NOT NULL            -- 원래 응답 시간
+)
+"""
+
+UPSERT_LLM_RECORD_SQL = """
+INSERT INTO llm_records (request_hash, model, request, response, created_at, latency_ms)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (request_hash) DO UPDATE SET
+    response = excluded.response,
+    created_at = excluded.created_at,
+    latency_ms = excluded.latency_ms
+"""
+
+SELECT_BY_HASH_SQL = """
+SELECT id, response, latency_ms FROM llm_records WHERE request_hash = ?
+"""
+
+SELECT_NEXT_SQL = """
+SELECT id, response, latency_ms FROM llm_records WHERE id > ? ORDER BY id LIMIT 1
+"""
+
+SELECT_RECORDS_SQL = """
+SELECT created_at, model, request, response FROM llm_records ORDER BY id
+"""
+
+
+class ReplayMissError(LookupError):
+    """재생 모드에서 요청에 해당하는 기록이 없을 때 발생"""
+
+
+def request_key(model, messages):
+    """
+    요청 해시를 만듭니다
+
+    매개변수:
+        model (str): 모델 이름
+        messages (list): chat 메시지 목록
+
+    반환값:
+        str: SHA-256 해시 문자열
+    """
+    encoded = json.dumps(
+        {"model": model, "messages": messages},
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _pack(text):
+    return zlib.compress(text.encode("utf-8"))
+
+
+def _unpack(blob):
+    return zlib.decompress(blob).decode("utf-8")
+
+
+class LLMRecorder:
+    """
+    AI 요청/응답 저장소 (SQLite)
+
+    같은 요청을 다시 기록하면 마지막 응답으로 덮어씁니다.
+    """
+
+    def __init__(self, db_file, mode="record", match="hash", latency_scale=0.0):
+        """
+        매개변수:
+            db_file (str): 데이터베이스 파일 경로 (ai_analysis와 같은 파일 사용 가능)
+            mode (str): "record"(실제 호출 후 저장) 또는 "replay"(저장된 응답만 사용)
+            match (str): 재생 시 기록 선택 방식 "hash" 또는 "sequence"
+            latency_scale (float): 재생 시 원래 응답 시간에 곱할 배율 (0이면 즉시)
+        """
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}")
+        if match not in MATCH_MODES:
+            raise ValueError(f"match must be one of {MATCH_MODES}")
+        self.db_file = db_file
+        self.mode = mode
+        self.match = match
+        self.latency_scale = latency_scale
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+        self._cursor = 0  # sequence 재생 위치 (마지막으로 재생한 id)
+        self._lock = threading.RLock()
+        self.conn = connect_database(db_file)
+        self.conn.execute(CREATE_LLM_RECORDS_SQL)
+
+    def close(self):
+        """데이터베이스 연결을 닫습니다"""
+        with self._lock:
+            self.conn.close()
+
+    def put(self, model, messages, response_text, latency_ms):
+        """요청과 응답 원문을 저장합니다"""
+        with self._lock:
+            self.conn.execute(
+                UPSERT_LLM_RECORD_SQL,
+                (
+                    request_key(model, messages),
+                    model,
+                    _pack(json.dumps(messages, ensure_ascii=False)),
+                    _pack(response_text),
+                    time.time(),
+                    latency_ms,
+                ),
+            )
+            self.recorded += 1
+
+    def lookup(self, model, messages):
+        """
+        재생할 응답을 찾습니다
+
+        반환값:
+            tuple: (응답 원문, 원래 응답 시간 ms)
+
+        예외:
+            ReplayMissError: 해당하는 기록이 없을 때
+        """
+        with self._lock:
+            if self.match == "hash":
+                key = request_key(model, messages)
+                row = self.conn.execute(SELECT_BY_HASH_SQL, (key,)).fetchone()
+            else:
+                key = f"after id {self._cursor}"
+                row = self.conn.execute(SELECT_NEXT_SQL, (self._cursor,)).fetchone()
+            if row is None:
+                self.misses += 1
+                raise ReplayMissError(f"no recorded response ({key})")
+            record_id, response, latency_ms = row
+            self._cursor = record_id
+            self.replayed += 1
+        return _unpack(response), latency_ms
+
+    def records(self):
+        """
+        저장된 기록을 기록 순서대로 반환합니다
+
+        반환값:
+            list: (응답 완료 시각, 모델, 메시지 목록, 응답 원문) 튜플 목록
+        """
+        with self._lock:
+            rows = self.conn.execute(SELECT_RECORDS_SQL).fetchall()
+        return [
+            (created_at, model, json.loads(_unpack(request)), _unpack(response))
+            for created_at, model, request, response in rows
+        ]
+
+    def stats(self):
+        """기록/재생/미스 횟수"""
+        return {"recorded": self.recorded, "replayed": self.replayed, "misses": self.misses}
+
+
+class RecordingChatClient:
+    """
+    AsyncOpenAI와 같은 chat.completions.create()를 가진 기록/재생 클라이언트
+
+    record 모드에서는 감싼 클라이언트로 실제 요청하고 응답을 저장합니다.
+    replay 모드에서는 감싼 클라이언트가 없어도 되며 네트워크 호출을 하지 않습니다.
+    """
+
+    def __init__(self, recorder, client=None):
+        """
+        매개변수:
+            recorder (LLMRecorder): 요청/응답 저장소
+            client: 실제 AsyncOpenAI 클라이언트 (record 모드에서 필요)
+        """
+        self.recorder = recorder
+        self.client = client
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, model=None, messages=None, stream=False, **kwargs):
+        if self.recorder.mode == "replay":
+            text, latency_ms = self.recorder.lookup(model, messages)
+            delay = latency_ms / 1000 * self.recorder.latency_scale
+            if stream:
+                return self._replay_stream(text, delay)
+            await asyncio.sleep(delay)
+            return SimpleNamespace(
+                choices=[SimpleNamespace(message=SimpleNamespace(content=text))]
+            )
+
+        started = time.perf_counter()
+        response = await self.client.chat.completions.create(
+            model=model, messages=messages, stream=stream, **kwargs
+        )
+        if stream:
+            return self._record_stream(response, model, messages, started)
+        self.recorder.put(
+            model,
+            messages,
+            response.choices[0].message.content or "",
+            (time.perf_counter() - started) * 1000,
+        )
+        return response
+
+    async def _record_stream(self, stream, model, messages, started):
+        parts = []
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+            yield chunk
+        # 끝까지 받은 응답만 저장 (중간에 취소되면 저장하지 않음)
+        self.recorder.put(
+            model, messages, "".join(parts), (time.perf_counter() - started) * 1000
+        )
+
+    @staticmethod
+    async def _replay_stream(text, delay):
+        chunks = [text[i : i + REPLAY_CHUNK] for i in range(0, len(text), REPLAY_CHUNK)]
+        for chunk in chunks:
+            if delay:
+                await asyncio.sleep(delay / len(chunks))
+            yield SimpleNamespace(
+                choices=[SimpleNamespace(delta=SimpleNamespace(content=chunk))]
+            )
@@ -0,0 +1,432 @@
+"""
+실시간 시장 데이터 스트림
+--------------------------------------------------------
+기능:
+- 거래소 웹소켓으로 최신가/마크가격/포지션/미체결 주문 상태를 메모리에 유지
+- 바이낸스 선물: ccxt.pro (watch_ticker, watch_mark_price, watch_positions, watch_orders)
+- 업비트: pyupbit.WebSocketManager (ticker)
+- 테스트용 로컬 재생(Replay) 스트림
+- 스트림이 끊기거나 오래된 경우 호출 측이 REST로 대체할 수 있도록 상태 유효성 제공
+--------------------------------------------------------
+"""
+
+import asyncio  # ccxt.pro 비동기 스트림 실행
+import json  # 재생 파일 읽기
+import queue  # 체결 이벤트 전달
+import threading  # 백그라운드 스트림 스레드
+import time  # 수신 시각 기록
+
+
+class MarketState:
+    """
+    스트림으로 수신한 시장/계좌 상태 (스레드 안전)
+
+    - prices: 심볼별 최신 체결가
+    - mark_prices: 심볼별 마크 가격
+    - positions: 심볼별 (방향, 수량)
+    - open_orders: 주문 ID별 미체결 주문
+    - live: 채널별 연결 상태 (ticker, mark_price, positions, orders)
+    - fills: 스탑로스/테이크프로핏 주문 체결 이벤트 큐
+    """
+
+    # 포지션 보호 주문 유형 (체결 시 포지션 종료)
+    PROTECTIVE_ORDER_TYPES = ("STOP_MARKET", "TAKE_PROFIT_MARKET")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)  # 포지션 변경 알림
+        self.prices = {}  # {심볼: (가격, 수신 시각)}
+        self.mark_prices = {}  # {심볼: (가격, 수신 시각)}
+        self.positions = {}  # {심볼: {"side": long/short/None, "amount": float}}
+        self.open_orders = {}  # {주문 ID: 주문 dict}
+        self.live = {}  # {채널: bool}
+        self.fills = queue.Queue()  # 보호 주문 체결 이벤트
+
+    def set_live(self, channel, is_live):
+        """채널의 연결 상태를 기록합니다 (끊긴 채널의 상태는 신뢰하지 않음)"""
+        with self._lock:
+            self.live[channel] = is_live
+
+    def is_live(self, channel):
+        with self._lock:
+            return self.live.get(channel, False)
+
+    def update_price(self, symbol, price):
+        with self._lock:
+            self.prices[symbol] = (price, time.time())
+
+    def update_mark_price(self, symbol, price):
+        with self._lock:
+            self.mark_prices[symbol] = (price, time.time())
+
+    def update_position(self, symbol, side, amount):
+        with self._lock:
+            self.positions[symbol] = {"side": side if amount else None, "amount": amount}
+            self._changed.notify_all()
+
+    def update_order(self, order):
+        """주문 상태 반영 (체결/취소된 주문은 미체결 목록에서 제거)"""
+        with self._lock:
+            if order.get("status") == "open":
+                self.open_orders[order["id"]] = order
+            else:
+                self.open_orders.pop(order["id"], None)
+
+        # 스탑로스/테이크프로핏 체결 시 실제 체결가와 시간을 이벤트로 전달
+        order_type = (order.get("type") or "").upper()
+        if order.get("status") == "closed" and order_type in self.PROTECTIVE_ORDER_TYPES:
+            self.fills.put(
+                {
+                    "order_id": order["id"],
+                    "type": order_type,
+                    "side": order.get("side"),
+                    "price": order.get("average") or order.get("price"),
+                    "amount": order.get("filled") or order.get("amount"),
+                    "timestamp": order.get("lastTradeTimestamp")
+                    or order.get("timestamp")
+                    or int(time.time() * 1000),
+                }
+            )
+
+    def reset_orders(self, orders):
+        """REST 스냅샷으로 미체결 주문 목록을 초기화합니다"""
+        with self._lock:
+            self.open_orders = {order["id"]: order for order in orders}
+
+    def wait_for_fill(self, timeout):
+        """
+        보호 주문 체결 이벤트를 기다립니다
+
+        매개변수:
+            timeout (float): 최대 대기 시간(초)
+
+        반환값:
+            dict: 체결 이벤트 (order_id, type, side, price, amount, timestamp(ms))
+                또는 None (시간 초과)
+        """
+        try:
+            return self.fills.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def clear_fills(self):
+        """이전 포지션의 처리되지 않은 체결 이벤트를 비웁니다"""
+        while True:
+            try:
+                self.fills.get_nowait()
+            except queue.Empty:
+                return
+
+    def wait_for_flat(self, symbol, timeout):
+        """
+        포지션이 청산된 상태로 갱신될 때까지 기다립니다
+
+        반환값:
+            bool: 시간 안에 청산 상태가 확인되면 True
+        """
+        with self._changed:
+            return self._changed.wait_for(
+                lambda: not self.positions.get(symbol, {}).get("side"), timeout
+            )
+
+    def get_price(self, symbol, max_age=5):
+        """
+        최신 체결가를 반환합니다
+
+        매개변수:
+            symbol (str): 심볼
+            max_age (float): 허용할 최대 경과 시간(초)
+
+        반환값:
+            float: 가격 또는 None (수신 전이거나 오래된 경우)
+        """
+        with self._lock:
+            entry = self.prices.get(symbol)
+        if entry and time.time() - entry[1] <= max_age:
+            return entry[0]
+        return None
+
+    def get_mark_price(self, symbol, max_age=5):
+        with self._lock:
+            entry = self.mark_prices.get(symbol)
+        if entry and time.time() - entry[1] <= max_age:
+            return entry[0]
+        return None
+
+    def get_position(self, symbol):
+        """
+        포지션을 반환합니다
+
+        반환값:
+            dict: {"side", "amount"} 또는 None (포지션 채널이 연결되지 않은 경우)
+        """
+        with self._lock:
+            if not self.live.get("positions"):
+                return None
+            return dict(self.positions.get(symbol, {"side": None, "amount": 0}))
+
+    def get_open_orders(self, symbol=None):
+        """
+        미체결 주문 목록을 반환합니다
+
+        매개변수:
+            symbol (str, optional): 이 심볼의 주문만 반환 (없으면 전체)
+
+        반환값:
+            list: 주문 목록 또는 None (주문 채널이 연결되지 않은 경우)
+        """
+        with self._lock:
+            if not self.live.get("orders"):
+                return None
+            return [
+                order
+                for order in self.open_orders.values()
+                if symbol is None or order.get("symbol") == symbol
+            ]
+
+
+class BinanceFuturesStream:
+    """
+    바이낸스 선물 웹소켓 스트림 (ccxt.pro)
+
+    별도 스레드에서 asyncio 이벤트 루프를 돌리며 채널별로 watch_* 를 반복 호출합니다.
+    오류가 나면 해당 채널을 끊김으로 표시하고 잠시 후 다시 연결합니다.
+    """
+
+    def __init__(self, state, api_key, secret, symbol, reconnect_delay=1):
+        """
+        매개변수:
+            state (MarketState): 갱신할 상태 객체
+            api_key (str): 바이낸스 API 키
+            secret (str): 바이낸스 시크릿 키
+            symbol (str): 거래 페어 (예: "BTC/USDT")
+            reconnect_delay (float): 재연결 대기 시간(초)
+        """
+        self.state = state
+        self.api_key = api_key
+        self.secret = secret
+        self.symbol = symbol
+        self.reconnect_delay = reconnect_delay
+        self._loop = None
+        self._thread = None
+        self._main_task = None
+
+    def start(self):
+        """백그라운드 스레드에서 스트림을 시작합니다"""
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """스트림을 중지합니다"""
+        if self._loop and self._main_task:
+            self._loop.call_soon_threadsafe(self._main_task.cancel)
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._main_task = self._loop.create_task(self._main())
+        try:
+            self._loop.run_until_complete(self._main_task)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._loop.close()
+
+    async def _main(self):
+        import ccxt.pro as ccxtpro  # 웹소켓 지원 ccxt
+
+        exchange = ccxtpro.binance(
+            {
+                "apiKey": self.api_key,
+                "secret": self.secret,
+                "enableRateLimit": True,
+                "options": {
+                    "defaultType": "future",
+                    "adjustForTimeDifference": True,
+                },
+            }
+        )
+        try:
+            await asyncio.gather(
+                self._watch("ticker", self._watch_ticker, exchange),
+                self._watch("mark_price", self._watch_mark_price, exchange),
+                self._watch("positions", self._watch_positions, exchange),
+                self._watch("orders", self._watch_orders, exchange),
+            )
+        finally:
+            await exchange.close()
+
+    async def _watch(self, channel, watcher, exchange):
+        """채널 watcher를 실행하고 오류 시 재연결합니다"""
+        while True:
+            try:
+                await watcher(exchange)
+                return  # watcher가 정상 종료됨 (지원하지 않는 채널)
+            except asyncio.CancelledError:
+                self.state.set_live(channel, False)
+                raise
+            except Exception as e:
+                self.state.set_live(channel, False)
+                print(f"Stream {channel} error: {e}")
+                await asyncio.sleep(self.reconnect_delay)
+
+    async def _watch_ticker(self, exchange):
+        while True:
+            ticker = await exchange.watch_ticker(self.symbol)
+            self.state.update_price(self.symbol, ticker["last"])
+            self.state.set_live("ticker", True)
+
+    async def _watch_mark_price(self, exchange):
+        if not exchange.has.get("watchMarkPrice"):
+            return  # 지원하지 않는 ccxt 버전
+        while True:
+            ticker = await exchange.watch_mark_price(self.symbol)
+            self.state.update_mark_price(self.symbol, ticker.get("markPrice"))
+            self.state.set_live("mark_price", True)
+
+    async def _watch_positions(self, exchange):
+        # 첫 수신 시 ccxt가 REST 스냅샷을 함께 불러옴
+        while True:
+            positions = await exchange.watch_positions([self.symbol])
+            for position in positions:
+                amount = float(position.get("contracts") or 0)
+                self.state.update_position(
+                    position["symbol"], position.get("side"), amount
+                )
+            self.state.set_live("positions", True)
+
+    async def _watch_orders(self, exchange):
+        # 스트림 시작 전에 있던 주문은 REST 스냅샷으로 채움
+        self.state.reset_orders(await exchange.fetch_open_orders(self.symbol))
+        self.state.set_live("orders", True)
+        while True:
+            orders = await exchange.watch_orders(self.symbol)
+            for order in orders:
+                self.state.update_order(order)
+
+
+class UpbitTickerStream:
+    """
+    업비트 현재가 웹소켓 스트림 (pyupbit.WebSocketManager)
+
+    구독한 마켓의 최신 체결가를 MarketState.prices에 반영합니다.
+    """
+
+    def __init__(self, state, market_codes):
+        """
+        매개변수:
+            state (MarketState): 갱신할 상태 객체
+            market_codes (list): 마켓 코드 목록 (예: ["KRW-BTC", "KRW-XRP"])
+        """
+        self.state = state
+        self.market_codes = market_codes
+        self._running = False
+        self._manager = None
+
+    def start(self):
+        """백그라운드 스레드에서 스트림을 시작합니다"""
+        self._running = True
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def stop(self):
+        self._running = False
+        if self._manager:
+            self._manager.terminate()
+
+    def _run(self):
+        import pyupbit  # 업비트 API
+
+        while self._running:
+            try:
+                self._manager = pyupbit.WebSocketManager("ticker", self.market_codes)
+                self.state.set_live("ticker", True)
+                while self._running:
+                    data = self._manager.get()
+                    self.state.update_price(data["code"], data["trade_price"])
+            except Exception as e:
+                print(f"Upbit stream error: {e}")
+            finally:
+                self.state.set_live("ticker", False)
+                if self._manager:
+                    self._manager.terminate()
+            time.sleep(1)
+
+
+class ReplayMarketStream:
+    """
+    테스트용 로컬 재생 스트림
+
+    기록된 이벤트를 순서대로 MarketState에 적용합니다. 이벤트 형식:
+    - {"type": "ticker", "symbol": ..., "last": ...}
+    - {"type": "mark_price", "symbol": ..., "mark_price": ...}
+    - {"type": "position", "symbol": ..., "side": ..., "amount": ...}
+    - {"type": "order", "order": {...}}
+    선택적으로 "delay"(초)를 주면 적용 전에 대기합니다 (start() 사용 시).
+    push()로 모의 거래소(sim_exchange) 같은 이벤트 소스를 실시간으로 연결할 수 있습니다.
+    """
+
+    def __init__(self, state, events):
+        """
+        매개변수:
+            state (MarketState): 갱신할 상태 객체
+            events (list | str): 이벤트 목록 또는 JSON Lines 파일 경로
+        """
+        self.state = state
+        if isinstance(events, str):
+            with open(events, encoding="utf-8") as f:
+                events = [json.loads(line) for line in f if line.strip()]
+        self.events = list(events)
+        self.position = 0
+        self._lock = threading.RLock()  # 재생 스레드와 push()의 동시 적용 방지
+        for channel in ("ticker", "mark_price", "positions", "orders"):
+            self.state.set_live(channel, True)
+
+    def step(self):
+        """
+        다음 이벤트 하나를 적용합니다
+
+        반환값:
+            dict: 적용한 이벤트 또는 None (모두 재생한 경우)
+        """
+        with self._lock:
+            if self.position >= len(self.events):
+                return None
+            event = self.events[self.position]
+            self.position += 1
+            event_type = event["type"]
+            if event_type == "ticker":
+                self.state.update_price(event["symbol"], event["last"])
+            elif event_type == "mark_price":
+                self.state.update_mark_price(event["symbol"], event["mark_price"])
+            elif event_type == "position":
+                self.state.update_position(event["symbol"], event["side"], event["amount"])
+            elif event_type == "order":
+                self.state.update_order(event["order"])
+            return event
+
+    def push(self, event):
+        """
+        이벤트를 추가하고 밀린 이벤트까지 바로 적용합니다
+
+        매개변수:
+            event (dict): 재생 이벤트 (형식은 클래스 설명 참고)
+        """
+        with self._lock:
+            self.events.append(event)
+            while self.step() is not None:
+                pass
+
+    def start(self):
+        """백그라운드 스레드에서 delay에 맞춰 모든 이벤트를 재생합니다"""
+
+        def run():
+            while self.position < len(self.events):
+                time.sleep(self.events[self.position].get("delay", 0))
+                self.step()
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def stop(self):
+        self.position = len(self.events)
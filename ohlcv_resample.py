@@ -0,0 +1,153 @@
+"""
+OHLCV 리샘플링
+--------------------------------------------------------
+기능:
+- 가장 작은 타임프레임(예: 15분) 캔들로 상위 타임프레임(1시간, 4시간 등) 캔들 생성
+- 거래소와 같은 UTC 구간 경계(epoch 기준)에 맞춰 집계
+- 거래소가 제공하는 캔들과 비교 검증
+--------------------------------------------------------
+"""
+
+import numpy as np  # 벡터 연산
+import pandas as pd  # 데이터 분석 및 조작
+import ccxt  # 타임프레임 문자열 해석
+
+OHLCV_COLUMNS = ["timestamp", "open", "high", "low", "close", "volume"]
+
+
+def timeframe_to_ms(timeframe):
+    """타임프레임 문자열(15m, 1h, 4h, 1d ...)을 밀리초로 변환합니다"""
+    return ccxt.Exchange.parse_timeframe(timeframe) * 1000
+
+
+def required_base_candles(base_timeframe, targets):
+    """
+    상위 타임프레임 캔들을 만들기 위해 필요한 기준 캔들 개수를 계산합니다
+
+    매개변수:
+        base_timeframe (str): 기준 타임프레임 (예: "15m")
+        targets (dict): {타임프레임: 필요한 캔들 개수}
+
+    반환값:
+        int: 기준 캔들 개수 (가장 오래된 구간을 채우기 위한 여유분 포함)
+    """
+    base_ms = timeframe_to_ms(base_timeframe)
+    needed = 0
+    for timeframe, limit in targets.items():
+        ratio = timeframe_to_ms(timeframe) // base_ms
+        needed = max(needed, (limit + 1) * ratio)
+    return needed
+
+
+def resample_ohlcv(base_df, base_timeframe, timeframe, limit=None):
+    """
+    기준 캔들을 상위 타임프레임 캔들로 집계합니다
+
+    각 기준 캔들의 시작 시간을 상위 타임프레임 길이로 내림하여 구간을 정하고
+    시가=첫 시가, 고가=최대, 저가=최소, 종가=마지막 종가, 거래량=합계로 계산합니다.
+    구간 경계는 epoch(UTC 00:00) 기준이므로 바이낸스 캔들과 같습니다.
+    기준 캔들이 모자라는 구간(가장 오래된 구간, 중간에 캔들이 빠진 구간)은 버리고,
+    진행 중인 마지막 구간은 거래소와 마찬가지로 유지합니다.
+
+    매개변수:
+        base_df (DataFrame): 오래된 순서의 기준 OHLCV (timestamp는 datetime)
+        base_timeframe (str): 기준 타임프레임
+        timeframe (str): 만들 타임프레임
+        limit (int, optional): 반환할 최신 캔들 개수
+
+    반환값:
+        DataFrame: 상위 타임프레임 OHLCV (기준 데이터와 같은 컬럼)
+    """
+    base_ms = timeframe_to_ms(base_timeframe)
+    target_ms = timeframe_to_ms(timeframe)
+    ratio = target_ms // base_ms
+
+    if base_df.empty:
+        return pd.DataFrame(columns=OHLCV_COLUMNS)
+
+    open_ms = base_df["timestamp"].to_numpy(dtype="datetime64[ms]").astype(np.int64)
+    buckets = open_ms // target_ms * target_ms
+
+    # 정렬된 구간 값의 경계 위치로 구간별 첫/마지막 인덱스 계산
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(buckets)]
+    counts = ends - starts
+
+    opens = base_df["open"].to_numpy()
+    highs = base_df["high"].to_numpy()
+    lows = base_df["low"].to_numpy()
+    closes = base_df["close"].to_numpy()
+    volumes = base_df["volume"].to_numpy()
+
+    result = pd.DataFrame(
+        {
+            "timestamp": pd.to_datetime(buckets[starts], unit="ms"),
+            "open": opens[starts],
+            "high": np.maximum.reduceat(highs, starts),
+            "low": np.minimum.reduceat(lows, starts),
+            "close": closes[ends - 1],
+            "volume": np.add.reduceat(volumes, starts),
+        }
+    )
+
+    # 완성되지 않은 구간 제거 (마지막 진행 중 구간은 유지)
+    complete = counts == ratio
+    complete[-1] = True
+    result = result[complete].reset_index(drop=True)
+
+    if limit is not None:
+        result = result.tail(limit).reset_index(drop=True)
+    return result
+
+
+def compare_with_exchange_bars(resampled_df, exchange_df):
+    """
+    리샘플링한 캔들과 거래소 캔들을 비교합니다
+
+    진행 중인 마지막 캔들은 두 요청 시점 차이로 값이 다를 수 있으므로 제외합니다.
+
+    매개변수:
+        resampled_df (DataFrame): resample_ohlcv() 결과
+        exchange_df (DataFrame): 같은 타임프레임의 거래소 캔들
+
+    반환값:
+        dict: 비교한 캔들 수와 컬럼별 최대 절대 오차
+    """
+    merged = resampled_df.iloc[:-1].merge(
+        exchange_df.iloc[:-1], on="timestamp", suffixes=("_resampled", "_exchange")
+    )
+    report = {"compared_candles": len(merged)}
+    for column in ["open", "high", "low", "close", "volume"]:
+        diff = (merged[f"{column}_resampled"] - merged[f"{column}_exchange"]).abs()
+        report[f"max_{column}_diff"] = float(diff.max()) if len(diff) else 0.0
+    return report
+
+
+def verify_against_exchange(exchange, symbol, base_timeframe, timeframe, limit):
+    """
+    거래소에서 기준 캔들과 상위 캔들을 직접 받아 리샘플링 결과를 검증합니다
+
+    매개변수:
+        exchange: ccxt 거래소 객체
+        symbol (str): 거래 페어
+        base_timeframe (str): 기준 타임프레임 (예: "15m")
+        timeframe (str): 검증할 타임프레임 (예: "4h")
+        limit (int): 검증할 캔들 개수
+
+    반환값:
+        dict: compare_with_exchange_bars() 결과
+    """
+    base_limit = required_base_candles(base_timeframe, {timeframe: limit})
+    base_df = pd.DataFrame(
+        exchange.fetch_ohlcv(symbol, timeframe=base_timeframe, limit=base_limit),
+        columns=OHLCV_COLUMNS,
+    )
+    base_df["timestamp"] = pd.to_datetime(base_df["timestamp"], unit="ms")
+    exchange_df = pd.DataFrame(
+        exchange.fetch_ohlcv(symbol, timeframe=timeframe, limit=limit),
+        columns=OHLCV_COLUMNS,
+    )
+    exchange_df["timestamp"] = pd.to_datetime(exchange_df["timestamp"], unit="ms")
+
+    resampled_df = resample_ohlcv(base_df, base_timeframe, timeframe, limit)
+    return compare_with_exchange_bars(resampled_df, exchange_df)
@@ -0,0 +1,238 @@
+"""
+브래킷 주문 실행
+--------------------------------------------------------
+기능:
+- 진입(시장가) + 스탑로스 + 테이크프로핏 주문을 한 번의 배치 요청으로 제출
+  (바이낸스 선물 POST /fapi/v1/batchOrders, ccxt create_orders)
+- 배치를 지원하지 않는 거래소는 진입 후 SL/TP를 동시에 제출
+- 하나라도 거부되면 롤백: 접수된 SL/TP 취소, 체결된 진입은 reduceOnly 시장가로 청산
+- 요청 자체가 실패(시간 초과, 네트워크 오류)하면 미체결 주문/포지션을 조회해
+  실제로 접수된 주문을 찾은 뒤 같은 방식으로 롤백
+- ccxt 비동기 거래소와 같은 메서드를 가진 모의 거래소로도 실행 가능
+--------------------------------------------------------
+"""
+
+import asyncio  # 동시 제출 및 롤백
+
+LEG_NAMES = ("entry", "stop_loss", "take_profit")
+
+# 보호 주문 유형 → 브래킷 주문 이름
+PROTECTIVE_LEGS = {"STOP_MARKET": "stop_loss", "TAKE_PROFIT_MARKET": "take_profit"}
+
+RECONCILE_ATTEMPTS = 3  # 요청 실패 후 거래소 상태 조회 시도 횟수
+RECONCILE_RETRY_DELAY = 1.0  # 조회 재시도 간격 (초)
+
+
+class BracketOrderError(Exception):
+    """브래킷 주문 일부가 거부되어 롤백했을 때 발생"""
+
+    def __init__(self, message, legs, rollback_errors=None):
+        super().__init__(message)
+        self.legs = legs  # {주문 이름: 주문 결과 또는 예외}
+        self.rollback_errors = rollback_errors or []  # 롤백 중 발생한 예외
+
+
+def build_bracket_orders(symbol, side, amount, sl_price, tp_price):
+    """
+    브래킷 주문 목록을 만듭니다 (ccxt create_orders 형식)
+
+    매개변수:
+        symbol (str): 거래 페어
+        side (str): 진입 방향 "buy"(롱) 또는 "sell"(숏)
+        amount (float): 주문 수량
+        sl_price (float): 스탑로스 가격
+        tp_price (float): 테이크프로핏 가격
+
+    반환값:
+        list: entry, stop_loss, take_profit 순서의 주문 dict
+    """
+    exit_side = "sell" if side == "buy" else "buy"
+    return [
+        {"symbol": symbol, "type": "market", "side": side, "amount": amount},
+        {
+            "symbol": symbol,
+            "type": "STOP_MARKET",
+            "side": exit_side,
+            "amount": amount,
+            "price": None,
+            "params": {"stopPrice": sl_price},
+        },
+        {
+            "symbol": symbol,
+            "type": "TAKE_PROFIT_MARKET",
+            "side": exit_side,
+            "amount": amount,
+            "price": None,
+            "params": {"stopPrice": tp_price},
+        },
+    ]
+
+
+def is_rejected(result):
+    """주문 결과가 거부(예외, rejected 상태, 주문 ID 없음)인지 확인합니다"""
+    if result is None or isinstance(result, BaseException):
+        return True
+    return result.get("status") == "rejected" or not result.get("id")
+
+
+async def _create_order(exchange, order):
+    return await exchange.create_order(
+        order["symbol"],
+        order["type"],
+        order["side"],
+        order["amount"],
+        order.get("price"),
+        order.get("params", {}),
+    )
+
+
+async def rollback_bracket(exchange, symbol, side, amount, legs, entry_filled=None):
+    """
+    접수된 브래킷 주문을 되돌립니다
+
+    접수된 SL/TP 주문은 취소하고, 체결된 진입 주문은 반대 방향 reduceOnly
+    시장가 주문으로 청산합니다. 모든 작업을 동시에 실행합니다.
+
+    매개변수:
+        entry_filled (bool, optional): 진입 체결 여부 (None이면 legs["entry"]로 판단)
+
+    반환값:
+        list: 롤백 중 발생한 예외 목록 (없으면 빈 리스트)
+    """
+    exit_side = "sell" if side == "buy" else "buy"
+    if entry_filled is None:
+        entry_filled = not is_rejected(legs.get("entry"))
+    actions = [
+        exchange.cancel_order(legs[name]["id"], symbol)
+        for name in ("stop_loss", "take_profit")
+        if not is_rejected(legs.get(name))
+    ]
+    if entry_filled:
+        actions.append(
+            exchange.create_order(
+                symbol, "market", exit_side, amount, None, {"reduceOnly": True}
+            )
+        )
+    results = await asyncio.gather(*actions, return_exceptions=True)
+    return [result for result in results if isinstance(result, BaseException)]
+
+
+async def reconcile_bracket(exchange, symbol, side):
+    """
+    응답을 받지 못한 브래킷 주문이 거래소에 실제로 접수되었는지 확인합니다
+
+    미체결 주문 중 청산 방향의 SL/TP 주문과, 진입 방향으로 열린 포지션을 찾습니다.
+    브래킷은 포지션이 없을 때만 제출하므로 찾은 주문/포지션은 이번 브래킷의 것으로 봅니다.
+
+    반환값:
+        tuple: (찾은 SL/TP 주문 dict, 진입 체결 여부)
+
+    예외:
+        거래소 조회 오류 (상태를 알 수 없음)
+    """
+    exit_side = "sell" if side == "buy" else "buy"
+    position_side = "long" if side == "buy" else "short"
+    open_orders, positions = await asyncio.gather(
+        exchange.fetch_open_orders(symbol), exchange.fetch_positions([symbol])
+    )
+    legs = {}
+    for order in open_orders:
+        order_type = str(order.get("type") or order.get("info", {}).get("type", ""))
+        name = PROTECTIVE_LEGS.get(order_type.upper())
+        if name and order.get("side") == exit_side and name not in legs:
+            legs[name] = order
+    entry_filled = any(
+        float(position.get("contracts") or 0) > 0
+        and position.get("side") == position_side
+        for position in positions
+    )
+    return legs, entry_filled
+
+
+async def _reconcile_and_rollback(exchange, symbol, side, amount, message, error):
+    """요청 실패 후 거래소 상태로 접수된 주문을 찾아 롤백하고 BracketOrderError를 만듭니다"""
+    for attempt in range(RECONCILE_ATTEMPTS):
+        try:
+            legs, entry_filled = await reconcile_bracket(exchange, symbol, side)
+            break
+        except Exception as reconcile_error:
+            if attempt + 1 == RECONCILE_ATTEMPTS:
+                # 상태를 확인하지 못함: 포지션/보호 주문이 남아 있을 수 있음
+                return BracketOrderError(
+                    f"{message}: {error} (reconciliation failed, state unknown)",
+                    {},
+                    [reconcile_error],
+                )
+            await asyncio.sleep(RECONCILE_RETRY_DELAY)
+    rollback_errors = await rollback_bracket(
+        exchange, symbol, side, amount, legs, entry_filled
+    )
+    found = [name for name in LEG_NAMES if legs.get(name)]
+    if entry_filled:
+        found.insert(0, "entry")
+    return BracketOrderError(
+        f"{message}: {error} (reconciled: {', '.join(found) or 'nothing accepted'}"
+        f"{', rolled back' if found else ''}"
+        f"{' with errors' if rollback_errors else ''})",
+        legs,
+        rollback_errors,
+    )
+
+
+async def submit_bracket(exchange, symbol, side, amount, sl_price, tp_price):
+    """
+    브래킷 주문을 제출합니다
+
+    거래소가 create_orders를 지원하면 세 주문을 한 번의 요청으로 보내고,
+    아니면 진입 주문 체결 후 SL/TP를 동시에 보냅니다.
+
+    매개변수:
+        exchange: ccxt 비동기 거래소 객체 (또는 같은 메서드의 모의 거래소)
+        symbol (str): 거래 페어
+        side (str): 진입 방향 "buy" 또는 "sell"
+        amount (float): 주문 수량
+        sl_price (float): 스탑로스 가격
+        tp_price (float): 테이크프로핏 가격
+
+    반환값:
+        dict: entry, stop_loss, take_profit 주문 결과
+
+    예외:
+        BracketOrderError: 하나라도 거부되었거나 요청이 실패하여 롤백한 경우
+            (rollback_errors가 있으면 포지션/보호 주문이 남아 있을 수 있음)
+    """
+    orders = build_bracket_orders(symbol, side, amount, sl_price, tp_price)
+
+    if exchange.has.get("createOrders"):
+        try:
+            results = await exchange.create_orders(orders)
+        except Exception as e:
+            # 요청 전체 실패: 거래소에 접수된 주문이 있을 수 있으므로 조회 후 롤백
+            raise await _reconcile_and_rollback(
+                exchange, symbol, side, amount, "batch order request failed", e
+            ) from e
+        legs = dict(zip(LEG_NAMES, results))
+    else:
+        try:
+            entry = await _create_order(exchange, orders[0])
+        except Exception as e:
+            # 응답 없이 실패해도 체결되었을 수 있으므로 포지션 확인 후 롤백
+            raise await _reconcile_and_rollback(
+                exchange, symbol, side, amount, "entry order failed", e
+            ) from e
+        protective = await asyncio.gather(
+            *(_create_order(exchange, order) for order in orders[1:]),
+            return_exceptions=True,
+        )
+        legs = dict(zip(LEG_NAMES, [entry, *protective]))
+
+    rejected = [name for name in LEG_NAMES if is_rejected(legs.get(name))]
+    if rejected:
+        rollback_errors = await rollback_bracket(exchange, symbol, side, amount, legs)
+        raise BracketOrderError(
+            f"rejected legs: {', '.join(rejected)} (rolled back"
+            f"{', with errors' if rollback_errors else ''})",
+            legs,
+            rollback_errors,
+        )
+    return legs
@@ -0,0 +1,150 @@
+"""
+AI 프롬프트 인코딩
+--------------------------------------------------------
+기능:
+- 시장 분석 데이터를 토큰 수가 적고 항상 같은 결과를 내는 텍스트로 변환
+  - 기술적 지표: 타임프레임별 한 줄 JSON
+  - 캔들(선택): 타임프레임별 CSV 블록 (고정 소수점, 분 단위 UTC 시간)
+  - 과거 거래/성과 지표: 반올림한 한 줄 JSON
+- 인코딩 결과의 토큰 수 보고 (tiktoken이 있으면 정확히, 없으면 추정)
+--------------------------------------------------------
+"""
+
+import json  # 한 줄 JSON 변환
+
+try:
+    import tiktoken  # 선택 사항: 정확한 토큰 수 계산
+except ImportError:
+    tiktoken = None
+
+PRICE_DECIMALS = 1  # 캔들 가격 소수점 자릿수
+VOLUME_DECIMALS = 3  # 캔들 거래량 소수점 자릿수
+VALUE_DECIMALS = 4  # 거래 기록/지표 소수점 자릿수
+
+
+def _round_values(value):
+    """dict/list 안의 실수를 VALUE_DECIMALS 자리로 반올림합니다"""
+    if isinstance(value, float):
+        return round(value, VALUE_DECIMALS)
+    if isinstance(value, dict):
+        return {key: _round_values(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_round_values(item) for item in value]
+    return value
+
+
+def _compact_json(value):
+    return json.dumps(
+        _round_values(value), ensure_ascii=False, separators=(",", ":"), default=str
+    )
+
+
+def encode_candles(df):
+    """
+    캔들 DataFrame을 CSV 블록으로 변환합니다
+
+    매개변수:
+        df (DataFrame): timestamp(datetime), open, high, low, close, volume
+
+    반환값:
+        str: "time,open,high,low,close,volume" 헤더가 있는 CSV
+    """
+    rounded = df[["timestamp", "open", "high", "low", "close", "volume"]].round(
+        {
+            "open": PRICE_DECIMALS,
+            "high": PRICE_DECIMALS,
+            "low": PRICE_DECIMALS,
+            "close": PRICE_DECIMALS,
+            "volume": VOLUME_DECIMALS,
+        }
+    )
+    rounded = rounded.rename(columns={"timestamp": "time"})
+    return rounded.to_csv(
+        index=False, date_format="%Y-%m-%d %H:%M", lineterminator="\n"
+    ).strip()
+
+
+def encode_market_analysis(market_analysis):
+    """
+    AI에 보낼 시장 분석 데이터를 압축 텍스트로 변환합니다
+
+    매개변수:
+        market_analysis (dict): timestamp, current_price, indicators(타임프레임별 특징 dict),
+            timeframes(선택, 타임프레임별 DataFrame), recent_news,
+            historical_trading_data, performance_metrics
+
+    반환값:
+        str: 사용자 메시지 본문
+    """
+    lines = [
+        f"timestamp: {market_analysis['timestamp']}",
+        f"current_price: {market_analysis['current_price']}",
+    ]
+
+    for tf_name, tf_features in (market_analysis.get("indicators") or {}).items():
+        lines.append("")
+        lines.append(f"## indicators {tf_name}")
+        lines.append(_compact_json(tf_features))
+
+    for tf_name, df in (market_analysis.get("timeframes") or {}).items():
+        lines.append("")
+        lines.append(f"## candles {tf_name} (UTC, oldest first)")
+        lines.append(encode_candles(df))
+
+    if market_analysis.get("performance_metrics"):
+        lines.append("")
+        lines.append("## performance_metrics")
+        lines.append(_compact_json(market_analysis["performance_metrics"]))
+
+    lines.append("")
+    lines.append("## historical_trading_data (newest first, one JSON per line)")
+    for row in market_analysis.get("historical_trading_data") or []:
+        lines.append(_compact_json(row))
+
+    if market_analysis.get("recent_news"):
+        lines.append("")
+        lines.append("## recent_news")
+        lines.append(str(market_analysis["recent_news"]).strip())
+
+    return "\n".join(lines)
+
+
+def count_tokens(text, model="o3-mini"):
+    """
+    텍스트의 토큰 수를 계산합니다
+
+    tiktoken이 설치되어 있지 않으면 4글자당 1토큰으로 추정합니다.
+
+    반환값:
+        tuple: (토큰 수, 정확한 값 여부)
+    """
+    if tiktoken is not None:
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("o200k_base")
+        return len(encoding.encode(text)), True
+    return (len(text) + 3) // 4, False
+
+
+def token_report(encoded_text, baseline_text=None, model="o3-mini"):
+    """
+    인코딩 결과의 토큰 수 보고서를 만듭니다
+
+    매개변수:
+        encoded_text (str): 압축 인코딩 결과
+        baseline_text (str, optional): 비교할 기존 인코딩 (예: str(dict))
+        model (str): 토큰화 기준 모델
+
+    반환값:
+        dict: chars, tokens, exact, (baseline_tokens, reduction_percentage)
+    """
+    tokens, exact = count_tokens(encoded_text, model)
+    report = {"chars": len(encoded_text), "tokens": tokens, "exact": exact}
+    if baseline_text is not None:
+        baseline_tokens, _ = count_tokens(baseline_text, model)
+        report["baseline_tokens"] = baseline_tokens
+        report["reduction_percentage"] = (
+            (1 - tokens / baseline_tokens) * 100 if baseline_tokens else 0
+        )
+    return report
@@ -0,0 +1,825 @@
+"""
+모의 거래소 (로컬 매칭 엔진)
+--------------------------------------------------------
+기능:
+- 실제 API 키 없이 트레이딩 코드를 실행하기 위한 프로세스 내 거래소
+  - 바이낸스 선물: ccxt와 같은 메서드 (동기/비동기)
+  - 업비트 현물: pyupbit와 같은 함수/Upbit 클래스
+- 1분 봉 단위의 가격 경로 (랜덤 워크 또는 저장된 캔들 재생)와 가상 시계
+- 시장가/지정가/STOP_MARKET/TAKE_PROFIT_MARKET 주문 매칭, 포지션, 잔고
+- 요청별 지연 시간(고정 + 무작위)과 시장가 슬리피지 설정
+--------------------------------------------------------
+"""
+
+import asyncio  # 비동기 ccxt 메서드의 지연 시간
+import itertools  # 주문 ID 생성
+import math  # 랜덤 워크
+import random  # 가격 경로 / 지연 시간 난수
+import threading  # 여러 스레드에서의 동시 접근 보호
+import time  # 실제 지연 시간, 시작 시각
+import uuid  # 업비트 주문 UUID
+
+BAR_SECONDS = 60  # 가격 경로 단위 (1분 봉)
+
+_TIMEFRAME_UNITS = {"m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+class SimulatedExchangeError(Exception):
+    """모의 거래소가 주문/요청을 거부할 때 발생"""
+
+
+def parse_timeframe(timeframe):
+    """타임프레임 문자열(1m, 15m, 1h, 4h, 1d ...)을 초로 변환합니다"""
+    return int(timeframe[:-1]) * _TIMEFRAME_UNITS[timeframe[-1]]
+
+
+class _PricePath:
+    """한 심볼의 1분 봉 목록 (오래된 순서)"""
+
+    def __init__(self, price, volatility, candles=None):
+        self.volatility = volatility
+        self.bars = []  # [open_time(ms), open, high, low, close, volume]
+        self.replay = list(candles or [])  # 재생할 남은 캔들
+        self.price = price
+
+    def next_bar(self, open_time, rng):
+        if self.replay:
+            _, open_, high, low, close, volume = self.replay.pop(0)
+        else:
+            # 로그 정규 랜덤 워크 (봉 안의 고가/저가는 변동성 범위 안에서 생성)
+            open_ = self.price
+            close = open_ * math.exp(rng.gauss(0, self.volatility))
+            wick = abs(rng.gauss(0, self.volatility / 2))
+            high = max(open_, close) * (1 + wick)
+            low = min(open_, close) * (1 - wick)
+            volume = rng.uniform(0.5, 1.5)
+        bar = [open_time, open_, high, low, close, volume]
+        self.bars.append(bar)
+        self.price = close
+        return bar
+
+
+class SimulatedMarket:
+    """
+    모든 모의 계좌가 공유하는 가격 경로, 가상 시계, 지연 시간 설정
+
+    advance()로 가상 시간을 진행하면 1분 봉이 생성되고, 봉마다 등록된 계좌의
+    미체결 주문을 봉의 고가/저가로 매칭합니다.
+    """
+
+    def __init__(
+        self,
+        latency=0.0,
+        latency_jitter=0.0,
+        slippage_bps=1.0,
+        seed=0,
+        start_time=None,
+        warmup_bars=0,
+    ):
+        """
+        매개변수:
+            latency (float): 요청별 고정 지연 시간 (초, 실제 대기)
+            latency_jitter (float): 추가 무작위 지연 시간 최대값 (초)
+            slippage_bps (float): 시장가/스탑 주문 슬리피지 (bp)
+            seed (int): 난수 시드 (같은 시드면 같은 가격 경로)
+            start_time (float, optional): 가상 시계 시작 시각 (epoch 초, 기본 현재)
+            warmup_bars (int): add_symbol() 시 미리 만들어 둘 과거 1분 봉 수
+        """
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.slippage_bps = slippage_bps
+        self.warmup_bars = warmup_bars
+        self.rng = random.Random(seed)
+        start = start_time if start_time is not None else time.time()
+        self.now = start // BAR_SECONDS * BAR_SECONDS  # 가상 시계 (초)
+        self.paths = {}  # {심볼: _PricePath}
+        self.accounts = []  # 봉마다 매칭할 계좌
+        self.requests = 0  # 처리한 API 요청 수
+        self._elapsed = 0.0  # 다음 봉까지 누적된 시간
+        self._lock = threading.RLock()
+
+    # ===== 가격 경로 =====
+    def add_symbol(self, symbol, price, volatility=0.001, candles=None):
+        """
+        심볼을 추가하고 warmup_bars개의 과거 봉을 만듭니다
+
+        매개변수:
+            symbol (str): 심볼 (예: "BTC/USDT", "KRW-XRP")
+            price (float): 시작 가격
+            volatility (float): 1분 봉 로그 수익률 표준편차
+            candles (list, optional): 재생할 OHLCV 목록 (랜덤 워크 대신 사용)
+        """
+        with self._lock:
+            path = _PricePath(price, volatility, candles)
+            self.paths[symbol] = path
+            first = self.now - self.warmup_bars * BAR_SECONDS
+            for i in range(self.warmup_bars):
+                path.next_bar(int((first + i * BAR_SECONDS) * 1000), self.rng)
+
+    def price(self, symbol):
+        with self._lock:
+            return self.paths[symbol].price
+
+    def advance(self, seconds):
+        """가상 시간을 진행하고 지난 봉마다 주문을 매칭합니다"""
+        with self._lock:
+            self._elapsed += seconds
+            while self._elapsed >= BAR_SECONDS:
+                self._elapsed -= BAR_SECONDS
+                open_time = int(self.now * 1000)
+                self.now += BAR_SECONDS
+                for symbol, path in self.paths.items():
+                    bar = path.next_bar(open_time, self.rng)
+                    for account in self.accounts:
+                        account.on_bar(symbol, bar)
+
+    def run_until(self, predicate, timeout, step=BAR_SECONDS):
+        """
+        조건이 참이 되거나 timeout(가상 초)이 지날 때까지 시간을 진행합니다
+
+        반환값:
+            bool: 조건 충족 여부
+        """
+        waited = 0
+        while not predicate():
+            if waited >= timeout:
+                return False
+            self.advance(step)
+            waited += step
+        return True
+
+    def ohlcv(self, symbol, timeframe, since=None, limit=None):
+        """
+        1분 봉을 타임프레임 캔들로 묶어 반환합니다 (마지막 진행 중 캔들 포함)
+
+        반환값:
+            list: [[open_time(ms), open, high, low, close, volume], ...]
+        """
+        tf_ms = parse_timeframe(timeframe) * 1000
+        with self._lock:
+            bars = list(self.paths[symbol].bars)
+            price = self.paths[symbol].price
+            now_ms = int(self.now * 1000)
+        candles = []
+        for open_time, open_, high, low, close, volume in bars:
+            bucket = open_time // tf_ms * tf_ms
+            if candles and candles[-1][0] == bucket:
+                candle = candles[-1]
+                candle[2] = max(candle[2], high)
+                candle[3] = min(candle[3], low)
+                candle[4] = close
+                candle[5] += volume
+            else:
+                candles.append([bucket, open_, high, low, close, volume])
+        # 현재 시각의 캔들이 아직 없으면 현재가로 시작
+        current = now_ms // tf_ms * tf_ms
+        if not candles or candles[-1][0] < current:
+            candles.append([current, price, price, price, price, 0.0])
+        if since is not None:
+            candles = [c for c in candles if c[0] >= since]
+            return candles[:limit] if limit else candles
+        return candles[-limit:] if limit else candles
+
+    # ===== 요청 처리 =====
+    def next_latency(self):
+        with self._lock:
+            self.requests += 1
+            return self.latency + self.rng.uniform(0, self.latency_jitter)
+
+    def delay(self):
+        """요청 하나의 지연 시간만큼 실제로 대기합니다"""
+        latency = self.next_latency()
+        if latency > 0:
+            time.sleep(latency)
+
+    def slipped(self, price, side):
+        """시장가 체결가 (매수는 높게, 매도는 낮게)"""
+        slip = self.slippage_bps / 10000
+        return price * (1 + slip) if side in ("buy", "bid") else price * (1 - slip)
+
+
+class VirtualTime:
+    """
+    time 모듈 대체 객체 (sleep은 가상 시간 진행, time은 가상 시계)
+
+    트레이딩 모듈의 time 속성을 이 객체로 바꾸면 대기 시간만큼 시장이 진행되고
+    실제로는 기다리지 않습니다. 나머지 함수는 실제 time 모듈을 사용합니다.
+    """
+
+    def __init__(self, market, on_sleep=None):
+        self.market = market
+        self.on_sleep = on_sleep  # sleep(초) 호출 시 추가로 실행할 콜백
+        self.slept = 0.0  # 누적 가상 대기 시간
+
+    def sleep(self, seconds):
+        self.slept += seconds
+        self.market.advance(seconds)
+        if self.on_sleep:
+            self.on_sleep(seconds)
+
+    def time(self):
+        return self.market.now + self.market._elapsed
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+
+# ===== 바이낸스 선물 (ccxt 호환) =====
+class SimulatedFuturesAccount:
+    """
+    선물 계좌와 주문 매칭 엔진 (단방향 포지션 모드)
+
+    on_order / on_position / on_mark_price 콜백으로 웹소켓 스트림처럼
+    주문/포지션/마크 가격 변경을 MarketState 등에 전달할 수 있습니다.
+    stream_events()는 같은 변경을 ReplayMarketStream 이벤트 형식으로 전달합니다.
+    """
+
+    PROTECTIVE_TYPES = ("STOP_MARKET", "TAKE_PROFIT_MARKET")
+
+    def __init__(self, market, balance=10000.0, fee_rate=0.0004, quote="USDT"):
+        """
+        매개변수:
+            market (SimulatedMarket): 공유 시장
+            balance (float): 시작 지갑 잔고 (quote 통화)
+            fee_rate (float): 체결 수수료율 (테이커)
+            quote (str): 증거금 통화
+        """
+        self.market = market
+        self.wallet = balance
+        self.fee_rate = fee_rate
+        self.quote = quote
+        self.positions = {}  # {심볼: {"amount": 부호 있는 수량, "entry_price": float}}
+        self.leverage = {}  # {심볼: 레버리지}
+        self.orders = {}  # {주문 ID: 주문 dict}
+        self.reject_types = set()  # 장애 주입: 이 유형의 주문은 거부
+        self.submitted_orders = 0
+        self.filled_orders = 0
+        self.on_order = []  # 주문 변경 콜백 (order)
+        self.on_position = []  # 포지션 변경 콜백 (심볼, 방향, 수량)
+        self.on_mark_price = []  # 봉마다의 마크 가격 콜백 (심볼, 가격)
+        self._ids = itertools.count(1)
+        market.accounts.append(self)
+
+    def _base(self, symbol):
+        return symbol.split(":")[0]
+
+    def unified(self, symbol):
+        """선물 통합 심볼 (BTC/USDT → BTC/USDT:USDT)"""
+        return symbol if ":" in symbol else f"{symbol}:{self.quote}"
+
+    # ===== 조회 =====
+    def fetch_ticker(self, symbol):
+        price = self.market.price(self._base(symbol))
+        return {
+            "symbol": symbol,
+            "last": price,
+            "close": price,
+            "bid": price,
+            "ask": price,
+            "timestamp": int(self.market.now * 1000),
+        }
+
+    def fetch_ohlcv(self, symbol, timeframe="1m", since=None, limit=None, params=None):
+        return self.market.ohlcv(self._base(symbol), timeframe, since, limit)
+
+    def _used_margin(self):
+        return sum(
+            abs(p["amount"]) * p["entry_price"] / self.leverage.get(s, 1)
+            for s, p in self.positions.items()
+        )
+
+    def fetch_balance(self, params=None):
+        used = self._used_margin()
+        free = self.wallet - used
+        entry = {"free": free, "used": used, "total": self.wallet}
+        return {
+            self.quote: entry,
+            "free": {self.quote: free},
+            "used": {self.quote: used},
+            "total": {self.quote: self.wallet},
+        }
+
+    def fetch_positions(self, symbols=None, params=None):
+        result = []
+        for base, position in self.positions.items():
+            symbol = self.unified(base)
+            amount = position["amount"]
+            result.append(
+                {
+                    "symbol": symbol,
+                    "contracts": abs(amount),
+                    "side": "long" if amount > 0 else "short",
+                    "entryPrice": position["entry_price"],
+                    "leverage": self.leverage.get(base, 1),
+                    "info": {"positionAmt": str(amount)},
+                }
+            )
+        return result
+
+    def fetch_open_orders(self, symbol=None, since=None, limit=None, params=None):
+        return [
+            dict(order)
+            for order in self.orders.values()
+            if order["status"] == "open"
+            and (symbol is None or order["symbol"] == self.unified(symbol))
+        ]
+
+    def load_markets(self, reload=False, params=None):
+        return {self.unified(s): {"symbol": self.unified(s)} for s in self.market.paths}
+
+    def set_leverage(self, leverage, symbol=None, params=None):
+        if not 1 <= leverage <= 125:
+            raise SimulatedExchangeError(f"invalid leverage {leverage}")
+        self.leverage[self._base(symbol)] = leverage
+        return {"leverage": leverage, "symbol": symbol}
+
+    # ===== 주문 =====
+    def create_order(self, symbol, type, side, amount, price=None, params=None):
+        params = params or {}
+        self.submitted_orders += 1
+        order_type = type.upper() if type.upper() in self.PROTECTIVE_TYPES else type.lower()
+        if type in self.reject_types or order_type in self.reject_types:
+            raise SimulatedExchangeError(f"{type} order rejected (injected)")
+        if amount <= 0:
+            raise SimulatedExchangeError("amount must be positive")
+
+        base = self._base(symbol)
+        order = {
+            "id": str(next(self._ids)),
+            "clientOrderId": params.get("clientOrderId"),
+            "symbol": self.unified(symbol),
+            "type": order_type,
+            "side": side,
+            "amount": amount,
+            "price": price,
+            "stopPrice": params.get("stopPrice"),
+            "reduceOnly": bool(params.get("reduceOnly")),
+            "status": "open",
+            "filled": 0.0,
+            "average": None,
+            "timestamp": int(self.market.now * 1000),
+            "lastTradeTimestamp": None,
+            "info": {},
+        }
+
+        if order_type == "market":
+            market_price = self.market.price(base)
+            if not order["reduceOnly"]:
+                margin = amount * market_price / self.leverage.get(base, 1)
+                if margin > self.wallet - self._used_margin():
+                    raise SimulatedExchangeError("insufficient margin")
+            self._fill(order, self.market.slipped(market_price, side))
+        else:
+            if order_type in self.PROTECTIVE_TYPES and order["stopPrice"] is None:
+                raise SimulatedExchangeError("stopPrice required")
+            if order_type == "limit" and price is None:
+                raise SimulatedExchangeError("price required for limit order")
+            self.orders[order["id"]] = order
+            self._notify_order(order)
+        return dict(order)
+
+    def create_market_buy_order(self, symbol, amount, params=None):
+        return self.create_order(symbol, "market", "buy", amount, None, params)
+
+    def create_market_sell_order(self, symbol, amount, params=None):
+        return self.create_order(symbol, "market", "sell", amount, None, params)
+
+    def create_orders(self, orders, params=None):
+        """배치 주문 (바이낸스와 같이 주문별로 접수/거부)"""
+        if len(orders) > 5:
+            raise SimulatedExchangeError("batch order limit is 5")
+        results = []
+        for order in orders:
+            try:
+                results.append(
+                    self.create_order(
+                        order["symbol"],
+                        order["type"],
+                        order["side"],
+                        order["amount"],
+                        order.get("price"),
+                        order.get("params"),
+                    )
+                )
+            except SimulatedExchangeError as e:
+                results.append({"id": None, "status": "rejected", "info": {"msg": str(e)}})
+        return results
+
+    def cancel_order(self, id, symbol=None, params=None):
+        order = self.orders.get(id)
+        if order is None or order["status"] != "open":
+            raise SimulatedExchangeError(f"unknown order {id}")
+        order["status"] = "canceled"
+        self._notify_order(order)
+        return dict(order)
+
+    def close(self):
+        pass
+
+    def stream_events(self, callback):
+        """
+        주문/포지션/마크 가격 변경을 재생 스트림 이벤트로 전달합니다
+
+        매개변수:
+            callback (callable): 이벤트 dict를 받는 함수 (예: ReplayMarketStream.push)
+        """
+        self.on_order.append(lambda order: callback({"type": "order", "order": order}))
+        self.on_position.append(
+            lambda symbol, side, amount: callback(
+                {"type": "position", "symbol": symbol, "side": side, "amount": amount}
+            )
+        )
+        self.on_mark_price.append(
+            lambda symbol, price: callback(
+                {"type": "mark_price", "symbol": symbol, "mark_price": price}
+            )
+        )
+
+    # ===== 매칭 =====
+    def on_bar(self, symbol, bar):
+        """새 봉의 고가/저가로 미체결 주문을 체결합니다 (스탑로스 우선)"""
+        _, open_, high, low, _, _ = bar
+        open_orders = [
+            order
+            for order in self.orders.values()
+            if order["status"] == "open" and self._base(order["symbol"]) == symbol
+        ]
+        open_orders.sort(key=lambda order: order["type"] != "STOP_MARKET")
+        for order in open_orders:
+            if order["status"] != "open":
+                continue  # 같은 봉에서 먼저 체결된 주문으로 취소된 경우
+            fill_price = self._trigger_price(order, open_, high, low)
+            if fill_price is not None:
+                self._fill(order, fill_price)
+        for callback in self.on_mark_price:
+            callback(self.unified(symbol), bar[4])  # 모의 시장은 마크 가격 = 종가
+
+    def _trigger_price(self, order, open_, high, low):
+        side, order_type = order["side"], order["type"]
+        if order_type == "limit":
+            # 시가가 이미 지정가보다 유리하면 시가에 체결
+            if side == "buy" and low <= order["price"]:
+                return min(order["price"], open_)
+            if side == "sell" and high >= order["price"]:
+                return max(order["price"], open_)
+            return None
+        stop = order["stopPrice"]
+        # 매도 스탑로스/매수 테이크프로핏은 하락 시, 그 반대는 상승 시 발동
+        falling = (order_type == "STOP_MARKET") == (side == "sell")
+        if falling and low <= stop:
+            return self.market.slipped(stop, side)
+        if not falling and high >= stop:
+            return self.market.slipped(stop, side)
+        return None
+
+    def _fill(self, order, fill_price):
+        base = self._base(order["symbol"])
+        signed = order["amount"] if order["side"] == "buy" else -order["amount"]
+        position = self.positions.get(base, {"amount": 0.0, "entry_price": 0.0})
+        current = position["amount"]
+
+        if order["reduceOnly"]:
+            if current == 0 or (current > 0) == (signed > 0):
+                order["status"] = "rejected"
+                self._notify_order(order)
+                return
+            signed = max(-abs(current), min(abs(current), signed))
+
+        # 반대 방향 체결분은 실현 손익, 같은 방향은 평균 진입가 갱신
+        if current and (current > 0) != (signed > 0):
+            closed = min(abs(current), abs(signed))
+            direction = 1 if current > 0 else -1
+            self.wallet += (fill_price - position["entry_price"]) * closed * direction
+        new_amount = round(current + signed, 12)
+        if new_amount == 0:
+            self.positions.pop(base, None)
+        else:
+            if current == 0 or (current > 0) != (new_amount > 0):
+                entry_price = fill_price
+            elif abs(new_amount) > abs(current):
+                entry_price = (
+                    position["entry_price"] * abs(current) + fill_price * abs(signed)
+                ) / abs(new_amount)
+            else:
+                entry_price = position["entry_price"]
+            self.positions[base] = {"amount": new_amount, "entry_price": entry_price}
+        self.wallet -= abs(signed) * fill_price * self.fee_rate
+
+        order.update(
+            status="closed",
+            filled=abs(signed),
+            average=fill_price,
+            lastTradeTimestamp=int(self.market.now * 1000),
+        )
+        self.filled_orders += 1
+        self._notify_order(order)
+        for callback in self.on_position:
+            side = None if new_amount == 0 else ("long" if new_amount > 0 else "short")
+            callback(self.unified(base), side, abs(new_amount))
+
+    def _notify_order(self, order):
+        for callback in self.on_order:
+            callback(dict(order))
+
+
+_FUTURES_METHODS = (
+    "fetch_ticker",
+    "fetch_ohlcv",
+    "fetch_balance",
+    "fetch_positions",
+    "fetch_open_orders",
+    "load_markets",
+    "set_leverage",
+    "create_order",
+    "create_market_buy_order",
+    "create_market_sell_order",
+    "create_orders",
+    "cancel_order",
+)
+
+
+class SimulatedBinanceFutures:
+    """
+    ccxt.binance(defaultType=future)와 같은 동기 메서드를 가진 모의 거래소
+
+    모든 메서드는 요청 지연 시간만큼 실제로 대기한 뒤 계좌에 위임합니다.
+    """
+
+    id = "binance"
+    rateLimit = 0
+    has = {"createOrders": True}
+    options = {"defaultType": "future"}
+
+    def __init__(self, account):
+        self.account = account
+        self.market = account.market
+
+    @staticmethod
+    def parse_timeframe(timeframe):
+        return parse_timeframe(timeframe)
+
+    def close(self):
+        pass
+
+    def __getattr__(self, name):
+        if name not in _FUTURES_METHODS:
+            raise AttributeError(name)
+        method = getattr(self.account, name)
+
+        def call(*args, **kwargs):
+            self.market.delay()
+            return method(*args, **kwargs)
+
+        return call
+
+
+class AsyncSimulatedBinanceFutures(SimulatedBinanceFutures):
+    """ccxt.async_support.binance와 같은 비동기 메서드를 가진 모의 거래소"""
+
+    async def close(self):
+        pass
+
+    def __getattr__(self, name):
+        if name not in _FUTURES_METHODS:
+            raise AttributeError(name)
+        method = getattr(self.account, name)
+
+        async def call(*args, **kwargs):
+            latency = self.market.next_latency()
+            if latency > 0:
+                await asyncio.sleep(latency)
+            return method(*args, **kwargs)
+
+        return call
+
+
+# ===== 업비트 현물 (pyupbit 호환) =====
+def upbit_tick_size(price):
+    """업비트 원화 마켓 호가 단위 (근사값)"""
+    for threshold, tick in (
+        (2_000_000, 1000),
+        (1_000_000, 500),
+        (500_000, 100),
+        (100_000, 50),
+        (10_000, 10),
+        (1_000, 1),
+        (100, 0.1),
+        (10, 0.01),
+        (1, 0.001),
+    ):
+        if price >= threshold:
+            return tick
+    return 0.0001
+
+
+class SimulatedUpbit:
+    """
+    업비트 현물 계좌와 지정가 주문 매칭
+
+    pyupbit 모듈 함수(get_current_price, get_orderbook, get_tickers)와
+    pyupbit.Upbit 메서드(get_balances, buy_limit_order, sell_market_order,
+    get_order, cancel_order)를 제공합니다. install()로 pyupbit 모듈에 연결합니다.
+    """
+
+    def __init__(self, market, krw=1_000_000.0, fee_rate=0.0005):
+        """
+        매개변수:
+            market (SimulatedMarket): 공유 시장 (심볼은 "KRW-BTC" 형식)
+            krw (float): 시작 원화 잔고
+            fee_rate (float): 체결 수수료율
+        """
+        self.market = market
+        self.fee_rate = fee_rate
+        self.balances = {"KRW": {"balance": krw, "locked": 0.0, "avg_buy_price": 0.0}}
+        self.orders = {}  # {uuid: 주문 dict}
+        self.submitted_orders = 0
+        self.filled_orders = 0
+        market.accounts.append(self)
+
+    def deposit(self, currency, amount, avg_buy_price=0.0):
+        """보유 자산을 추가합니다 (시작 포지션 설정용)"""
+        entry = self._balance(currency)
+        total = entry["balance"] + amount
+        entry["avg_buy_price"] = (
+            entry["avg_buy_price"] * entry["balance"] + avg_buy_price * amount
+        ) / total
+        entry["balance"] = total
+
+    # ===== pyupbit 모듈 함수 =====
+    def get_tickers(self, fiat="KRW", *args, **kwargs):
+        self.market.delay()
+        return [s for s in self.market.paths if s.startswith(f"{fiat}-")]
+
+    def get_current_price(self, ticker="KRW-BTC", *args, **kwargs):
+        self.market.delay()
+        if isinstance(ticker, (list, tuple)):
+            return {t: self.market.price(t) for t in ticker}
+        return self.market.price(ticker)
+
+    def get_orderbook(self, ticker="KRW-BTC", *args, **kwargs):
+        self.market.delay()
+        price = self.market.price(ticker)
+        tick = upbit_tick_size(price)
+        best_bid = math.floor(price / tick) * tick
+        units = [
+            {
+                "ask_price": best_bid + tick * (i + 1),
+                "bid_price": best_bid - tick * i,
+                "ask_size": 1.0,
+                "bid_size": 1.0,
+            }
+            for i in range(15)
+        ]
+        return {"market": ticker, "timestamp": int(self.market.now * 1000), "orderbook_units": units}
+
+    # ===== pyupbit.Upbit 메서드 =====
+    def _balance(self, currency):
+        return self.balances.setdefault(
+            currency, {"balance": 0.0, "locked": 0.0, "avg_buy_price": 0.0}
+        )
+
+    def get_balances(self, *args, **kwargs):
+        self.market.delay()
+        return [
+            {
+                "currency": currency,
+                "balance": str(entry["balance"]),
+                "locked": str(entry["locked"]),
+                "avg_buy_price": str(entry["avg_buy_price"]),
+                "avg_buy_price_modified": False,
+                "unit_currency": "KRW",
+            }
+            for currency, entry in self.balances.items()
+            if entry["balance"] or entry["locked"] or currency == "KRW"
+        ]
+
+    def buy_limit_order(self, ticker, price, volume, *args, **kwargs):
+        self.market.delay()
+        self.submitted_orders += 1
+        cost = price * volume * (1 + self.fee_rate)
+        krw = self._balance("KRW")
+        if volume <= 0 or cost > krw["balance"]:
+            return {"error": {"name": "insufficient_funds_bid", "message": "잔고 부족"}}
+        krw["balance"] -= cost
+        krw["locked"] += cost
+        order = {
+            "uuid": str(uuid.uuid4()),
+            "side": "bid",
+            "ord_type": "limit",
+            "price": str(price),
+            "state": "wait",
+            "market": ticker,
+            "volume": str(volume),
+            "remaining_volume": str(volume),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(self.market.now)),
+        }
+        self.orders[order["uuid"]] = order
+        return dict(order)
+
+    def sell_market_order(self, ticker, volume, *args, **kwargs):
+        self.market.delay()
+        self.submitted_orders += 1
+        currency = ticker.split("-")[1]
+        entry = self._balance(currency)
+        if volume <= 0 or volume > entry["balance"] + 1e-12:
+            return {"error": {"name": "insufficient_funds_ask", "message": "잔고 부족"}}
+        fill_price = self.market.slipped(self.market.price(ticker), "sell")
+        entry["balance"] -= volume
+        if entry["balance"] <= 1e-12:
+            entry.update(balance=0.0, avg_buy_price=0.0)
+        self._balance("KRW")["balance"] += fill_price * volume * (1 - self.fee_rate)
+        self.filled_orders += 1
+        return {
+            "uuid": str(uuid.uuid4()),
+            "side": "ask",
+            "ord_type": "market",
+            "state": "done",
+            "market": ticker,
+            "volume": str(volume),
+        }
+
+    def get_order(self, ticker_or_uuid, state="wait", *args, **kwargs):
+        self.market.delay()
+        if ticker_or_uuid in self.orders:
+            return dict(self.orders[ticker_or_uuid])
+        return [
+            dict(order)
+            for order in self.orders.values()
+            if order["market"] == ticker_or_uuid and order["state"] == state
+        ]
+
+    def cancel_order(self, uuid, *args, **kwargs):
+        self.market.delay()
+        order = self.orders.get(uuid)
+        if order is None or order["state"] != "wait":
+            return {"error": {"name": "order_not_found", "message": "주문 없음"}}
+        self._cancel(order)
+        return dict(order)
+
+    def cancel_all(self, market_code):
+        """업비트 일괄 취소 (DELETE /v1/orders/open) 대응"""
+        self.market.delay()
+        for order in list(self.orders.values()):
+            if order["market"] == market_code and order["state"] == "wait":
+                self._cancel(order)
+
+    def _cancel(self, order):
+        remaining = float(order["remaining_volume"])
+        refund = float(order["price"]) * remaining * (1 + self.fee_rate)
+        krw = self._balance("KRW")
+        krw["locked"] -= refund
+        krw["balance"] += refund
+        order["state"] = "cancel"
+
+    # ===== 매칭 =====
+    def on_bar(self, symbol, bar):
+        open_, low = bar[1], bar[3]
+        for order in list(self.orders.values()):
+            if order["market"] != symbol or order["state"] != "wait":
+                continue
+            price = float(order["price"])
+            if low > price:
+                continue
+            volume = float(order["remaining_volume"])
+            cost = price * volume * (1 + self.fee_rate)
+            krw = self._balance("KRW")
+            krw["locked"] -= cost
+            # 시가가 지정가보다 낮으면 시가에 체결하고 차액은 돌려줌
+            fill_price = min(price, open_)
+            krw["balance"] += (price - fill_price) * volume * (1 + self.fee_rate)
+            price = fill_price
+            entry = self._balance(symbol.split("-")[1])
+            total = entry["balance"] + volume
+            entry["avg_buy_price"] = (
+                entry["avg_buy_price"] * entry["balance"] + price * volume
+            ) / total
+            entry["balance"] = total
+            order.update(state="done", remaining_volume="0")
+            self.filled_orders += 1
+
+    def install(self, pyupbit_module):
+        """
+        pyupbit 모듈의 함수와 Upbit 클래스를 이 모의 계좌로 바꿉니다
+
+        모듈을 임포트하기 전에 호출하면 모듈 수준에서 만드는 Upbit 객체도
+        모의 계좌를 사용합니다.
+
+        반환값:
+            dict: 원래 속성 (restore()에 전달)
+        """
+        account = self
+        replaced = {
+            "get_tickers": self.get_tickers,
+            "get_current_price": self.get_current_price,
+            "get_orderbook": self.get_orderbook,
+            "Upbit": lambda *args, **kwargs: account,
+        }
+        original = {name: getattr(pyupbit_module, name, None) for name in replaced}
+        for name, value in replaced.items():
+            setattr(pyupbit_module, name, value)
+        return original
+
+    @staticmethod
+    def restore(pyupbit_module, original):
+        for name, value in original.items():
+            setattr(pyupbit_module, name, value)
@@ -0,0 +1,153 @@
+"""
+시장/계좌 스냅샷 캐시
+--------------------------------------------------------
+기능:
+- 잔고, 현재가 같은 조회 결과를 키별로 메모리에 저장하고 허용된 나이(max_age) 안이면 재사용
+  - 호출하는 쪽(엔드포인트)마다 다른 허용 나이(오래된 정도의 상한)를 지정
+- 단일 실행(single-flight): 같은 키를 동시에 조회하면 거래소 호출은 한 번만 하고
+  나머지는 그 결과를 기다려 함께 사용
+- 주문 직후 invalidate()로 잔고 스냅샷을 버려 주문 전 값을 재사용하지 않음
+  - 무효화 이전에 시작된 조회 결과는 저장하지 않음
+- 엔드포인트별 요청/캐시 적중/공유/거래소 호출/오류 횟수와 실제로 제공한 최대 나이 집계
+--------------------------------------------------------
+"""
+
+import threading  # 동시 조회 보호 / 대기
+import time  # 스냅샷 나이 (monotonic)
+
+
+class _Flight:
+    """진행 중인 거래소 조회 (같은 키를 기다리는 요청이 결과를 공유)"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SnapshotCache:
+    """
+    TTL과 단일 실행을 지원하는 스냅샷 캐시 (스레드 안전)
+
+    조회 함수가 None을 반환하면 실패로 보고 저장하지 않습니다.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        """
+        매개변수:
+            clock (callable): 현재 시각 함수 (초)
+        """
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = {}  # 키 → (값, 조회 시작 시각)
+        self._flights = {}  # 키 → 진행 중인 _Flight
+        self._generations = {}  # 키 → 무효화 횟수
+        self._stats = {}  # 엔드포인트 → 집계
+
+    def _endpoint_stats(self, endpoint, max_age):
+        stats = self._stats.get(endpoint)
+        if stats is None:
+            stats = self._stats[endpoint] = {
+                "max_age": max_age,  # 허용 나이 (초)
+                "requests": 0,
+                "hits": 0,  # 저장된 스냅샷 사용
+                "shared": 0,  # 다른 요청의 진행 중인 조회 결과 사용
+                "fetches": 0,  # 거래소 호출
+                "errors": 0,
+                "max_served_age": 0.0,  # 실제로 제공한 스냅샷의 최대 나이 (초)
+            }
+        return stats
+
+    def get(self, key, loader, max_age, endpoint="default"):
+        """
+        스냅샷을 반환합니다 (없거나 max_age보다 오래되었으면 조회)
+
+        매개변수:
+            key: 스냅샷 키 (예: "balances", ("price", "KRW-XRP"))
+            loader (callable): 거래소 조회 함수 (인자 없음)
+            max_age (float): 허용 나이 (초)
+            endpoint (str): 집계에 사용할 호출 위치 이름
+
+        반환값:
+            조회 결과 (조회 실패 시 None)
+
+        예외:
+            loader가 발생시킨 예외 (같은 조회를 기다린 요청에도 전달)
+        """
+        with self._lock:
+            stats = self._endpoint_stats(endpoint, max_age)
+            stats["requests"] += 1
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = self._clock() - entry[1]
+                if age <= max_age:
+                    stats["hits"] += 1
+                    stats["max_served_age"] = max(stats["max_served_age"], age)
+                    return entry[0]
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                stats["fetches"] += 1
+                generation = self._generations.get(key, 0)
+                started = self._clock()
+
+        if not leader:
+            flight.done.wait()
+            with self._lock:
+                if flight.error is not None:
+                    stats["errors"] += 1
+                else:
+                    stats["shared"] += 1
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = loader()
+        except Exception as e:
+            flight.error = e
+            with self._lock:
+                stats["errors"] += 1
+            raise
+        finally:
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                if (
+                    flight.error is None
+                    and flight.value is not None
+                    and self._generations.get(key, 0) == generation
+                ):
+                    self._entries[key] = (flight.value, started)
+            flight.done.set()
+        return flight.value
+
+    def invalidate(self, key):
+        """
+        스냅샷을 버립니다 (주문 등으로 값이 바뀐 직후)
+
+        진행 중인 조회는 결과를 저장하지 않고, 이후 요청은 새로 조회합니다.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+            self._flights.pop(key, None)
+            self._generations[key] = self._generations.get(key, 0) + 1
+
+    def stats(self):
+        """
+        엔드포인트별 집계
+
+        반환값:
+            dict: 엔드포인트 → requests, hits, shared, fetches, errors, hit_rate,
+                max_age, max_served_age
+        """
+        with self._lock:
+            result = {}
+            for endpoint, stats in self._stats.items():
+                reused = stats["hits"] + stats["shared"]
+                result[endpoint] = dict(
+                    stats,
+                    hit_rate=reused / stats["requests"] if stats["requests"] else 0.0,
+                )
+            return result
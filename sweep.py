@@ -0,0 +1,234 @@
+"""
+백테스트 파라미터 탐색
+--------------------------------------------------------
+기능:
+- 스탑로스/테이크프로핏 비율, 레버리지, 포지션 크기 조합을 그리드 또는 무작위로 생성
+- 프로세스 풀에서 조합별 백테스트를 병렬 실행
+  - 캔들 배열은 .npy 파일로 한 번 저장하고 작업 프로세스는 memmap(읽기 전용)으로 공유
+    (조합마다 DataFrame을 pickle로 전달하지 않음)
+  - 진입 신호(EMA 교차)는 작업 프로세스마다 한 번만 계산
+- 샤프 비율, 최대 낙폭, 손익비로 순위 (대시보드와 같은 계산, trading_metrics)
+
+실행 예:
+    python sweep.py --mode random --samples 2000 --workers 8 --top 20
+--------------------------------------------------------
+"""
+
+import argparse  # 명령행 인자
+import itertools  # 그리드 조합
+import os  # 작업 프로세스 수 / 파일 경로
+import tempfile  # 공유 배열 파일 디렉터리
+import time  # 실행 시간 측정
+from concurrent.futures import ProcessPoolExecutor  # 병렬 백테스트
+import numpy as np  # 배열 / 무작위 조합
+import pandas as pd  # 결과 정렬 및 출력
+from backtest import (  # 백테스트 엔진
+    BASE_TIMEFRAME,
+    FEE_RATE,
+    SERIES_KEY,
+    Backtester,
+    EmaCrossDecision,
+    date_to_ms,
+    load_candles,
+)
+from indicators import EMA_FAST, EMA_SLOW  # 기본 EMA 기간
+
+PRICE_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+# 그리드 탐색 기본값 (5 × 5 × 5 × 4 = 500 조합)
+DEFAULT_GRID = {
+    "stop_loss_percentage": [0.005, 0.01, 0.015, 0.02, 0.03],
+    "take_profit_percentage": [0.01, 0.02, 0.03, 0.04, 0.06],
+    "recommended_leverage": [1, 3, 5, 10, 20],
+    "recommended_position_size": [0.1, 0.2, 0.3, 0.5],
+}
+
+# 무작위 탐색 범위 (시스템 프롬프트의 허용 범위 안)
+RANDOM_SPACE = {
+    "stop_loss_percentage": (0.002, 0.05),
+    "take_profit_percentage": (0.002, 0.1),
+    "recommended_leverage": (1, 20),
+    "recommended_position_size": (0.05, 1.0),
+}
+
+# 순위 지표와 정렬 방향 (True면 작을수록 좋음)
+RANK_METRICS = {"sharpe_ratio": False, "max_drawdown": True, "profit_factor": False}
+
+
+def grid_configs(grid=DEFAULT_GRID):
+    """그리드의 모든 조합을 dict 목록으로 반환합니다"""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*grid.values())]
+
+
+def random_configs(samples, space=RANDOM_SPACE, seed=0):
+    """
+    탐색 범위에서 무작위 조합을 만듭니다 (레버리지는 정수, 비율은 소수점 4자리)
+
+    매개변수:
+        samples (int): 조합 개수
+        space (dict): {이름: (최소, 최대)}
+        seed (int): 난수 시드
+
+    반환값:
+        list: 조합 dict 목록
+    """
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for name, (low, high) in space.items():
+        if name == "recommended_leverage":
+            columns[name] = rng.integers(low, high, endpoint=True, size=samples)
+        else:
+            columns[name] = np.round(rng.uniform(low, high, size=samples), 4)
+    return [
+        {name: values[i].item() for name, values in columns.items()}
+        for i in range(samples)
+    ]
+
+
+class _FixedOrder:
+    """미리 계산한 교차 신호에 조합의 주문 값을 붙이는 결정 함수"""
+
+    def __init__(self, cross, order):
+        self.cross = cross
+        self.order = order
+
+    def __call__(self, i, candles):
+        if not self.cross[i]:
+            return None
+        return {"direction": "LONG" if self.cross[i] > 0 else "SHORT", **self.order}
+
+
+# ===== 작업 프로세스 상태 (초기화 함수에서 한 번 설정) =====
+_candles = None
+_cross = None
+_settings = None
+
+
+def _init_worker(directory, timeframe, fast, slow, settings):
+    global _candles, _cross, _settings
+    prices = np.load(os.path.join(directory, "prices.npy"), mmap_mode="r")
+    _candles = {"timestamp": np.load(os.path.join(directory, "timestamps.npy"), mmap_mode="r")}
+    _candles.update(zip(PRICE_COLUMNS, prices))
+    signal = EmaCrossDecision(fast, slow)
+    signal.prepare(_candles, timeframe)
+    _cross = signal.cross
+    _settings = dict(settings, timeframe=timeframe)
+
+
+def _run_config(config):
+    result = Backtester(_candles, _FixedOrder(_cross, config), **_settings).run()
+    summary = result.summary()
+    return {
+        **config,
+        **result.metrics(),
+        "return_pct": summary["return_pct"],
+        "skipped_entries": summary["skipped_entries"],
+    }
+
+
+def rank_results(results, min_trades=10):
+    """
+    조합별 결과를 지표별 순위의 평균으로 정렬합니다
+
+    매개변수:
+        results (DataFrame): 조합별 결과
+        min_trades (int): 순위에 포함할 최소 거래 수
+
+    반환값:
+        DataFrame: 지표별 순위(*_rank)와 평균 순위(score) 컬럼을 추가해 정렬한 결과
+    """
+    ranked = results[results["total_trades"] >= min_trades].copy()
+    for metric, ascending in RANK_METRICS.items():
+        ranked[f"{metric}_rank"] = ranked[metric].rank(ascending=ascending)
+    ranked["score"] = ranked[[f"{m}_rank" for m in RANK_METRICS]].mean(axis=1)
+    return ranked.sort_values(["score", "sharpe_ratio"], ascending=[True, False]).reset_index(
+        drop=True
+    )
+
+
+def run_sweep(
+    candles,
+    configs,
+    workers=None,
+    timeframe=BASE_TIMEFRAME,
+    fast=EMA_FAST,
+    slow=EMA_SLOW,
+    balance=10000.0,
+    fee_rate=FEE_RATE,
+    slippage_bps=0.0,
+):
+    """
+    조합별 백테스트를 프로세스 풀에서 실행합니다
+
+    매개변수:
+        candles (dict): load_candles() 결과
+        configs (list): 조합 dict 목록 (결정 dict의 주문 필드 이름)
+        workers (int, optional): 작업 프로세스 수 (기본 CPU 수)
+        timeframe (str): 캔들 타임프레임
+        fast, slow (int): 진입 신호 EMA 기간
+        balance, fee_rate, slippage_bps: Backtester 설정
+
+    반환값:
+        DataFrame: 조합별 설정과 성과 지표 (입력 순서)
+    """
+    workers = workers or os.cpu_count() or 1
+    settings = {"balance": balance, "fee_rate": fee_rate, "slippage_bps": slippage_bps}
+    with tempfile.TemporaryDirectory() as directory:
+        np.save(os.path.join(directory, "timestamps.npy"), candles["timestamp"])
+        np.save(
+            os.path.join(directory, "prices.npy"),
+            np.stack([candles[column] for column in PRICE_COLUMNS]),
+        )
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(directory, timeframe, fast, slow, settings),
+        ) as executor:
+            chunksize = max(1, len(configs) // (workers * 8))
+            results = list(executor.map(_run_config, configs, chunksize=chunksize))
+    return pd.DataFrame(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="백테스트 SL/TP/레버리지/포지션 크기 탐색")
+    parser.add_argument("--db", default="bitcoin_trading.db", help="캔들 DB 파일")
+    parser.add_argument("--key", default=SERIES_KEY, help="캔들 저장 키")
+    parser.add_argument("--timeframe", default=BASE_TIMEFRAME, help="캔들 타임프레임")
+    parser.add_argument("--since", help="시작 날짜 (UTC, 예: 2023-01-01)")
+    parser.add_argument("--until", help="끝 날짜 (UTC, 제외)")
+    parser.add_argument("--mode", choices=["grid", "random"], default="grid")
+    parser.add_argument("--samples", type=int, default=1000, help="무작위 조합 수")
+    parser.add_argument("--seed", type=int, default=0, help="난수 시드")
+    parser.add_argument("--workers", type=int, help="작업 프로세스 수 (기본 CPU 수)")
+    parser.add_argument("--min-trades", type=int, default=10, help="순위 포함 최소 거래 수")
+    parser.add_argument("--top", type=int, default=20, help="출력할 상위 조합 수")
+    parser.add_argument("--csv", help="전체 순위 결과를 저장할 CSV 파일")
+    args = parser.parse_args()
+
+    candles = load_candles(
+        args.db, args.key, args.timeframe, date_to_ms(args.since), date_to_ms(args.until)
+    )
+    if not len(candles["close"]):
+        print("저장된 캔들이 없습니다.")
+        return
+    if args.mode == "grid":
+        configs = grid_configs()
+    else:
+        configs = random_configs(args.samples, seed=args.seed)
+
+    started = time.perf_counter()
+    results = run_sweep(candles, configs, args.workers, args.timeframe)
+    elapsed = time.perf_counter() - started
+    ranked = rank_results(results, args.min_trades)
+
+    print(f"{len(configs)}개 조합, {len(candles['close'])}개 캔들: {elapsed:.1f}초")
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(ranked.head(args.top).to_string())
+    if args.csv:
+        ranked.to_csv(args.csv, index=False)
+        print(f"결과 저장: {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+"""
+테스트 공통 설정
+--------------------------------------------------------
+기능:
+- 저장소 루트를 import 경로에 추가 (tests/ 밖의 모듈을 바로 import)
+--------------------------------------------------------
+"""
+
+import os  # 경로 계산
+import sys  # import 경로
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
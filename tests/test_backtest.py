@@ -0,0 +1,26 @@
+"""
+백테스트 테스트
+--------------------------------------------------------
+기능:
+- 백테스트 거래 시간이 실거래 기록과 같은 로컬 시간 형식으로 저장되는지 확인
+--------------------------------------------------------
+"""
+
+from datetime import datetime  # 실거래 기록 형식
+
+import pytest  # 모듈 없으면 건너뛰기
+
+pytest.importorskip("numpy")
+pytest.importorskip("pandas")
+
+from backtest import _iso  # 테스트 대상
+
+
+def test_iso_matches_live_writer_convention():
+    ms = 1_704_067_200_000  # 2024-01-01 00:00 UTC
+    text = _iso(ms)
+
+    # 실거래 기록과 같이 시간대 표시 없는 로컬 시간 → 같은 방식으로 읽으면 원래 시간
+    assert text == datetime.fromtimestamp(ms / 1000).isoformat()
+    assert datetime.fromisoformat(text).tzinfo is None
+    assert datetime.fromisoformat(text).timestamp() * 1000 == ms
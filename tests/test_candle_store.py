@@ -0,0 +1,65 @@
+"""
+CandleStore 테스트
+--------------------------------------------------------
+기능:
+- 오래 멈췄다가 다시 조회해도 저장 캔들에 빈 구간이 생기지 않는지 확인
+--------------------------------------------------------
+"""
+
+import pytest  # 픽스처
+
+pytest.importorskip("pandas")
+
+import candle_store  # 테스트 대상 (현재 시간 교체)
+from candle_store import CandleStore  # 테스트 대상
+
+MINUTE_MS = 60_000
+
+
+class FakeExchange:
+    """1분봉을 최대 page_limit개씩 돌려주는 ccxt 형태의 거래소"""
+
+    id = "fake"
+    options = {"defaultType": "future"}
+
+    def __init__(self, now_ms, page_limit=50):
+        self.now_ms = now_ms
+        self.page_limit = page_limit
+        self.requests = []
+
+    def parse_timeframe(self, timeframe):
+        return 60
+
+    def fetch_ohlcv(self, symbol, timeframe="1m", since=None, limit=None):
+        self.requests.append((since, limit))
+        limit = min(limit or self.page_limit, self.page_limit)
+        current = self.now_ms - self.now_ms % MINUTE_MS
+        if since is None:
+            since = current - (limit - 1) * MINUTE_MS
+        start = since + (-since) % MINUTE_MS
+        end = min(current, start + (limit - 1) * MINUTE_MS)
+        times = range(start, end + 1, MINUTE_MS)
+        return [[t, 1.0, 1.0, 1.0, 1.0, 1.0] for t in times]
+
+
+def test_get_candles_pages_forward_after_long_pause(tmp_path, monkeypatch):
+    store = CandleStore(str(tmp_path / "candles.db"))
+    try:
+        now_ms = 1_700_000_000_000 - 1_700_000_000_000 % MINUTE_MS
+        exchange = FakeExchange(now_ms)
+        monkeypatch.setattr(candle_store.time, "time", lambda: exchange.now_ms / 1000)
+        store.get_candles(exchange, "BTC/USDT", "1m", 10)
+
+        # 요청 개수(10)와 페이지 크기(50)보다 훨씬 긴 200분 동안 멈춤
+        exchange.now_ms += 200 * MINUTE_MS
+        df = store.get_candles(exchange, "BTC/USDT", "1m", 10)
+
+        key = store.series_key(exchange, "BTC/USDT")
+        stored = store.load_range(key, "1m")["timestamp"]
+        assert stored.diff().dropna().eq(MINUTE_MS).all()
+        assert stored.iloc[-1] == exchange.now_ms
+        assert len(stored) == 210
+        assert len(df) == 10
+        assert len(exchange.requests) > 2  # 여러 페이지로 나눠 받음
+    finally:
+        store.close()
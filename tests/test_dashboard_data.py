@@ -0,0 +1,71 @@
+"""
+대시보드 데이터 계층 테스트
+--------------------------------------------------------
+기능:
+- 거래와 관계없는 테이블의 커밋으로는 거래를 다시 읽지 않는지 확인
+- 새 거래/거래 종료 시에는 거래 버전이 올라가고 변경분을 읽는지 확인
+- 방향별 거래 수가 기간 DataFrame이 바뀔 때만 다시 계산되는지 확인
+- 마이그레이션을 마친 DB에서 대시보드 쿼리가 인덱스를 사용하는지 확인
+--------------------------------------------------------
+"""
+
+import pytest  # 픽스처 / 모듈 없으면 건너뛰기
+
+pytest.importorskip("pandas")
+
+from dashboard_data import DashboardData  # 테스트 대상
+from trade_repository import TradeRepository  # 거래 기록 (봇 쪽 쓰기 연결)
+
+
+@pytest.fixture
+def repo(tmp_path):
+    repo = TradeRepository(str(tmp_path / "trades.db"))
+    repo.setup_database()
+    yield repo
+    repo.close()
+
+
+@pytest.fixture
+def data(repo):
+    data = DashboardData(repo.db_file)
+    yield data
+    data.close()
+
+
+def test_dashboard_queries_avoid_full_scans(data):
+    assert data.find_full_scans() == {}
+
+
+def counts_of(df):
+    return dict(zip(df["Direction"], df["Count"]))
+
+
+def test_other_table_commits_do_not_reload_trades(repo, data):
+    repo.save_trade({"action": "long"})
+    assert len(data.get_trades(7)) == 1
+    version, reads = data.version, data.reads
+
+    # 캔들/결정 캐시 등 다른 테이블의 커밋 (data_version만 바뀜)
+    with repo.transaction() as conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS other (value INTEGER)")
+        conn.execute("INSERT INTO other VALUES (1)")
+
+    assert len(data.get_trades(7)) == 1
+    assert (data.version, data.reads) == (version, reads)
+
+
+def test_trade_changes_reload_and_recount(repo, data):
+    trade_id = repo.save_trade({"action": "long"})
+    counts = data.get_direction_counts(7)
+    assert counts_of(counts) == {"long": 1}
+    assert data.get_direction_counts(7) is counts  # 바뀐 것이 없으면 다시 집계하지 않음
+
+    repo.save_trade({"action": "short"})
+    assert counts_of(data.get_direction_counts(7)) == {"long": 1, "short": 1}
+
+    version = data.version
+    repo.close_trade(trade_id, 1.0, "2024-01-01T00:00:00", 1.0, 1.0)
+    trades = data.get_trades(7)
+    assert data.version == version + 1
+    assert trades.loc[trades["id"] == trade_id, "status"].item() == "CLOSED"
+    assert data.get_open_trade()["action"] == "short"
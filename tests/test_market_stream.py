@@ -0,0 +1,63 @@
+"""
+재생 스트림 테스트
+--------------------------------------------------------
+기능:
+- 모의 계좌의 주문/포지션/마크 가격 변경이 ReplayMarketStream을 거쳐 MarketState에 반영되는지 확인
+- 기록된 이벤트 목록의 단계별 재생 확인
+--------------------------------------------------------
+"""
+
+from market_stream import MarketState, ReplayMarketStream  # 테스트 대상
+from sim_exchange import SimulatedFuturesAccount, SimulatedMarket  # 이벤트 소스
+
+SYMBOL = "BTC/USDT:USDT"
+
+
+def test_replay_stream_follows_simulated_account():
+    market = SimulatedMarket(seed=0)
+    market.add_symbol("BTC/USDT", 60000.0, 0.001)
+    account = SimulatedFuturesAccount(market)
+    state = MarketState()
+    stream = ReplayMarketStream(state, [])
+    account.stream_events(stream.push)
+
+    account.create_order("BTC/USDT", "market", "buy", 0.01)
+    assert state.get_position(SYMBOL) == {"side": "long", "amount": 0.01}
+
+    stop = account.create_order(
+        "BTC/USDT",
+        "STOP_MARKET",
+        "sell",
+        0.01,
+        params={"stopPrice": 1.0, "reduceOnly": True},
+    )
+    assert [order["id"] for order in state.get_open_orders(SYMBOL)] == [stop["id"]]
+
+    market.advance(60)
+    assert state.get_mark_price(SYMBOL) == market.price("BTC/USDT")
+
+    account.cancel_order(stop["id"])
+    account.create_order("BTC/USDT", "market", "sell", 0.01, params={"reduceOnly": True})
+    assert state.get_open_orders(SYMBOL) == []
+    assert state.get_position(SYMBOL) == {"side": None, "amount": 0}
+
+
+def test_replay_stream_steps_recorded_events():
+    state = MarketState()
+    stream = ReplayMarketStream(
+        state,
+        [
+            {"type": "ticker", "symbol": "BTC/USDT", "last": 100.0},
+            {"type": "mark_price", "symbol": SYMBOL, "mark_price": 101.0},
+            {"type": "position", "symbol": SYMBOL, "side": "short", "amount": 2.0},
+        ],
+    )
+    assert stream.step()["type"] == "ticker"
+    assert state.get_price("BTC/USDT") == 100.0
+    assert state.get_mark_price(SYMBOL) is None
+
+    stream.step()
+    stream.step()
+    assert stream.step() is None
+    assert state.get_mark_price(SYMBOL) == 101.0
+    assert state.get_position(SYMBOL) == {"side": "short", "amount": 2.0}
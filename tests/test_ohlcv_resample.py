@@ -0,0 +1,82 @@
+"""
+OHLCV 리샘플링 테스트
+--------------------------------------------------------
+기능:
+- 고정된 15분봉으로 만든 1시간/4시간봉이 손으로 계산한 캔들과 같은지 확인
+  - 기준 캔들이 모자라는 첫 구간과 중간 빈 구간(02:30 누락)은 버림
+  - 진행 중인 마지막 구간은 유지
+--------------------------------------------------------
+"""
+
+import pytest  # 모듈 없으면 건너뛰기
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("ccxt")
+
+from ohlcv_resample import OHLCV_COLUMNS, resample_ohlcv  # 테스트 대상
+
+
+def make_base_bars():
+    """
+    2024-01-01 00:15 ~ 08:15 15분봉 (02:30 누락)
+
+    i번째 봉: 시가 100+i, 고가 102+i, 저가 99+i, 종가 100.5+i, 거래량 1+i
+    """
+    start = pd.Timestamp("2024-01-01 00:15")
+    times = [
+        start + pd.Timedelta(minutes=15 * n)
+        for n in range(33)
+        if start + pd.Timedelta(minutes=15 * n) != pd.Timestamp("2024-01-01 02:30")
+    ]
+    return pd.DataFrame(
+        [
+            [timestamp, 100 + i, 102 + i, 99 + i, 100.5 + i, 1 + i]
+            for i, timestamp in enumerate(times)
+        ],
+        columns=OHLCV_COLUMNS,
+    )
+
+
+def expected_bars(rows):
+    df = pd.DataFrame(rows, columns=OHLCV_COLUMNS)
+    df["timestamp"] = pd.to_datetime(df["timestamp"])
+    return df
+
+
+def assert_bars_equal(actual, expected):
+    pd.testing.assert_frame_equal(
+        actual.reset_index(drop=True), expected, check_dtype=False
+    )
+
+
+def test_resample_to_1h():
+    expected = expected_bars(
+        [
+            # 00:00 (3개)과 02:00 (02:30 누락) 구간은 버림
+            ["2024-01-01 01:00", 103, 108, 102, 106.5, 22],
+            ["2024-01-01 03:00", 110, 115, 109, 113.5, 50],
+            ["2024-01-01 04:00", 114, 119, 113, 117.5, 66],
+            ["2024-01-01 05:00", 118, 123, 117, 121.5, 82],
+            ["2024-01-01 06:00", 122, 127, 121, 125.5, 98],
+            ["2024-01-01 07:00", 126, 131, 125, 129.5, 114],
+            # 진행 중인 마지막 구간 (08:00, 08:15 두 개)
+            ["2024-01-01 08:00", 130, 133, 129, 131.5, 63],
+        ]
+    )
+    assert_bars_equal(resample_ohlcv(make_base_bars(), "15m", "1h"), expected)
+
+
+def test_resample_to_4h():
+    expected = expected_bars(
+        [
+            # 00:00 구간은 첫 봉이 00:15부터이고 02:30도 빠져 버림
+            ["2024-01-01 04:00", 114, 131, 113, 129.5, 360],
+            ["2024-01-01 08:00", 130, 133, 129, 131.5, 63],
+        ]
+    )
+    assert_bars_equal(resample_ohlcv(make_base_bars(), "15m", "4h"), expected)
+
+
+def test_resample_limit_keeps_latest_bars():
+    result = resample_ohlcv(make_base_bars(), "15m", "1h", limit=2)
+    assert list(result["timestamp"].dt.hour) == [7, 8]
@@ -0,0 +1,193 @@
+"""
+브래킷 주문 실행 테스트
+--------------------------------------------------------
+기능:
+- 작은 가짜 비동기 거래소로 submit_bracket()의 제출/롤백/상태 확인 흐름 검증
+  - 세 주문 모두 접수
+  - 보호 주문 하나 거부 → 진입은 reduceOnly로 청산, 나머지 보호 주문 취소
+  - 진입 접수 후 배치 요청 실패 → 포지션/주문 조회로 찾아 롤백
+  - 상태 조회가 계속 실패 → 예외 대신 "state unknown" 오류 반환
+--------------------------------------------------------
+"""
+
+import asyncio  # 비동기 함수 실행
+
+import pytest  # 예외 확인 / monkeypatch
+
+import order_execution  # 재시도 간격 교체
+from order_execution import (  # 테스트 대상
+    BracketOrderError,
+    _reconcile_and_rollback,
+    submit_bracket,
+)
+
+SYMBOL = "BTC/USDT"
+
+
+class FakeExchange:
+    """
+    create_orders를 지원하는 ccxt 비동기 거래소 흉내
+
+    모든 요청은 calls에 (메서드, 인자) 형태로 기록됩니다.
+    """
+
+    has = {"createOrders": True}
+
+    def __init__(self, reject_types=(), batch_error=None, fetch_failures=0):
+        """
+        매개변수:
+            reject_types (tuple): 거부할 주문 유형
+            batch_error (Exception, optional): 주문을 접수한 뒤 create_orders가 발생시킬 예외
+            fetch_failures (int): 처음 몇 번의 미체결 주문 조회를 실패시킬지
+        """
+        self.reject_types = set(reject_types)
+        self.batch_error = batch_error
+        self.fetch_failures = fetch_failures
+        self.orders = {}  # 미체결 주문
+        self.position = 0.0  # 부호 있는 수량
+        self.calls = []
+        self._next_id = 1
+
+    async def create_order(self, symbol, type, side, amount, price=None, params=None):
+        params = params or {}
+        self.calls.append(("create_order", (type, side, amount, params)))
+        if type in self.reject_types:
+            return {"id": None, "status": "rejected"}
+        order = {
+            "id": str(self._next_id),
+            "symbol": symbol,
+            "type": type,
+            "side": side,
+            "amount": amount,
+            "status": "open",
+        }
+        self._next_id += 1
+        if type == "market":
+            signed = amount if side == "buy" else -amount
+            self.position += signed
+            order["status"] = "closed"
+        else:
+            self.orders[order["id"]] = order
+        return dict(order)
+
+    async def create_orders(self, orders):
+        self.calls.append(("create_orders", len(orders)))
+        results = [
+            await self.create_order(
+                order["symbol"],
+                order["type"],
+                order["side"],
+                order["amount"],
+                order.get("price"),
+                order.get("params"),
+            )
+            for order in orders
+        ]
+        if self.batch_error is not None:
+            raise self.batch_error  # 접수는 되었지만 응답을 받지 못함
+        return results
+
+    async def cancel_order(self, id, symbol=None):
+        self.calls.append(("cancel_order", id))
+        order = self.orders.pop(id)
+        return dict(order, status="canceled")
+
+    async def fetch_open_orders(self, symbol=None):
+        if self.fetch_failures > 0:
+            self.fetch_failures -= 1
+            raise ConnectionError("fetch failed")
+        return [dict(order) for order in self.orders.values()]
+
+    async def fetch_positions(self, symbols=None):
+        if not self.position:
+            return []
+        return [
+            {
+                "symbol": f"{SYMBOL}:USDT",
+                "contracts": abs(self.position),
+                "side": "long" if self.position > 0 else "short",
+            }
+        ]
+
+    def reduce_only_closes(self):
+        return [
+            args
+            for name, args in self.calls
+            if name == "create_order" and args[3].get("reduceOnly")
+        ]
+
+
+@pytest.fixture(autouse=True)
+def no_retry_delay(monkeypatch):
+    monkeypatch.setattr(order_execution, "RECONCILE_RETRY_DELAY", 0)
+
+
+def submit(exchange, side="buy"):
+    return asyncio.run(submit_bracket(exchange, SYMBOL, side, 0.01, 59000.0, 61000.0))
+
+
+def test_all_legs_accepted():
+    exchange = FakeExchange()
+    legs = submit(exchange)
+
+    assert [legs[name]["type"] for name in ("entry", "stop_loss", "take_profit")] == [
+        "market",
+        "STOP_MARKET",
+        "TAKE_PROFIT_MARKET",
+    ]
+    assert exchange.position == pytest.approx(0.01)
+    assert len(exchange.orders) == 2
+    assert exchange.calls[0] == ("create_orders", 3)
+    assert not exchange.reduce_only_closes()
+
+
+def test_rejected_protective_leg_rolls_back():
+    exchange = FakeExchange(reject_types={"TAKE_PROFIT_MARKET"})
+    with pytest.raises(BracketOrderError, match="take_profit") as excinfo:
+        submit(exchange)
+
+    assert excinfo.value.rollback_errors == []
+    # 진입은 반대 방향 reduceOnly 시장가로 청산, 접수된 스탑로스는 취소
+    assert exchange.reduce_only_closes() == [
+        ("market", "sell", 0.01, {"reduceOnly": True})
+    ]
+    assert ("cancel_order", excinfo.value.legs["stop_loss"]["id"]) in exchange.calls
+    assert exchange.position == pytest.approx(0)
+    assert exchange.orders == {}
+
+
+def test_failed_batch_request_reconciles_and_rolls_back():
+    exchange = FakeExchange(batch_error=TimeoutError("request timed out"))
+    with pytest.raises(BracketOrderError, match="reconciled: entry") as excinfo:
+        submit(exchange, side="sell")
+
+    assert isinstance(excinfo.value.__cause__, TimeoutError)
+    assert set(excinfo.value.legs) == {"stop_loss", "take_profit"}
+    assert exchange.reduce_only_closes() == [
+        ("market", "buy", 0.01, {"reduceOnly": True})
+    ]
+    assert exchange.position == pytest.approx(0)
+    assert exchange.orders == {}
+
+
+def test_reconcile_failures_return_state_unknown():
+    exchange = FakeExchange(fetch_failures=order_execution.RECONCILE_ATTEMPTS)
+    error = asyncio.run(
+        _reconcile_and_rollback(
+            exchange, SYMBOL, "buy", 0.01, "batch order request failed", TimeoutError()
+        )
+    )
+
+    assert isinstance(error, BracketOrderError)
+    assert "state unknown" in str(error)
+    assert isinstance(error.rollback_errors[0], ConnectionError)
+    # 상태를 모르므로 어떤 롤백 주문도 보내지 않음
+    assert exchange.calls == []
+
+    # submit_bracket은 조회 예외 대신 같은 BracketOrderError를 발생시킴
+    exchange = FakeExchange(
+        batch_error=TimeoutError(), fetch_failures=order_execution.RECONCILE_ATTEMPTS
+    )
+    with pytest.raises(BracketOrderError, match="state unknown"):
+        submit(exchange)
+    assert exchange.position == pytest.approx(0.01)  # 확인하지 못한 포지션은 그대로
@@ -0,0 +1,84 @@
+"""
+TradeRepository 테스트
+--------------------------------------------------------
+기능:
+- 빈 DB에 전체 마이그레이션 적용 후 주요 조회 쿼리가 인덱스를 사용하는지 확인
+- 손익률이 없는(NULL) 거래가 평균 손익률 계산에서 제외되는지 확인
+  (close_trade 누적 갱신과 import_trades 재계산이 같은 결과를 내는지 포함)
+--------------------------------------------------------
+"""
+
+import pytest  # 픽스처 / 근사 비교
+
+from trade_repository import MIGRATIONS, TradeRepository  # 테스트 대상
+
+# (방향, 손익, 손익률) - 두 번째 이익 거래는 손익률이 기록되지 않음
+CLOSED_TRADES = [
+    ("long", 10.0, 10.0),
+    ("long", 5.0, None),
+    ("short", -4.0, -4.0),
+]
+
+
+@pytest.fixture
+def repo(tmp_path):
+    repo = TradeRepository(str(tmp_path / "trades.db"))
+    repo.setup_database()
+    yield repo
+    repo.close()
+
+
+def assert_null_percentage_skipped(metrics):
+    overall = metrics["overall"]
+    assert overall["total_trades"] == 3
+    assert overall["winning_trades"] == 2
+    assert overall["total_profit_loss"] == pytest.approx(11.0)
+    # 손익률 평균은 손익률이 있는 거래만으로 계산 (SQL AVG와 동일)
+    assert overall["avg_profit_loss_percentage"] == pytest.approx(3.0)
+    assert overall["avg_win_percentage"] == pytest.approx(10.0)
+    assert overall["avg_loss_percentage"] == pytest.approx(-4.0)
+    directional = metrics["directional"]
+    assert directional["long"]["avg_profit_loss_percentage"] == pytest.approx(10.0)
+    assert directional["short"]["avg_profit_loss_percentage"] == pytest.approx(-4.0)
+
+
+def test_setup_database_avoids_full_scans(repo):
+    assert repo.get_schema_version() == MIGRATIONS[-1][0]
+    assert repo.find_full_scans() == {}
+
+
+def test_close_trade_skips_null_percentage(repo):
+    for action, profit_loss, percentage in CLOSED_TRADES:
+        trade_id = repo.save_trade({"action": action})
+        assert repo.close_trade(
+            trade_id, 1.0, "2024-01-01T01:00:00", profit_loss, percentage
+        )
+    assert_null_percentage_skipped(repo.get_performance_metrics())
+
+
+def test_import_trades_skips_null_percentage(repo):
+    repo.import_trades(
+        [
+            {
+                "timestamp": f"2024-01-0{i + 1}T00:00:00",
+                "action": action,
+                "entry_price": 1.0,
+                "amount": 1.0,
+                "leverage": 1,
+                "sl_price": 0.9,
+                "tp_price": 1.1,
+                "sl_percentage": 0.1,
+                "tp_percentage": 0.1,
+                "position_size_percentage": 0.1,
+                "investment_amount": 1.0,
+                "status": "CLOSED",
+                "exit_price": 1.0,
+                "exit_timestamp": f"2024-01-0{i + 1}T01:00:00",
+                "profit_loss": profit_loss,
+                "profit_loss_percentage": percentage,
+                "entry_order_id": None,
+            }
+            for i, (action, profit_loss, percentage) in enumerate(CLOSED_TRADES)
+        ]
+    )
+    assert_null_percentage_skipped(repo.get_performance_metrics())
@@ -0,0 +1,861 @@
+"""
+트레이딩 데이터베이스 저장소 (Repository) 계층
+--------------------------------------------------------
+기능:
+- 하나의 장기 SQLite 연결(WAL 모드)을 유지하여 매 호출마다 파일을 열고 닫지 않음
+- 거래(trades) / AI 분석(ai_analysis) 테이블 접근을 메서드로 제공
+- 명시적 트랜잭션 범위(BEGIN IMMEDIATE ~ COMMIT)로 쓰기 작업 묶기
+- PRAGMA user_version 기반의 버전별 스키마 마이그레이션
+--------------------------------------------------------
+"""
+
+import sqlite3  # 로컬 데이터베이스
+import threading  # 연결 공유 시 동시 접근 보호
+from contextlib import contextmanager  # 트랜잭션 범위 관리
+from datetime import datetime  # 날짜 및 시간 처리
+
+# ===== SQL 문 (연결의 statement cache에 의해 재사용됨) =====
+CREATE_TRADES_SQL = """
+CREATE TABLE IF NOT EXISTS trades (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,           -- 거래 시작 시간
+    action TEXT NOT NULL,              -- long 또는 short
+    entry_price REAL NOT NULL,         -- 진입 가격
+    amount REAL NOT NULL,              -- 거래량 (BTC)
+    leverage INTEGER NOT NULL,         -- 레버리지 배수
+    sl_price REAL NOT NULL,            -- 스탑로스 가격
+    tp_price REAL NOT NULL,            -- 테이크프로핏 가격
+    sl_percentage REAL NOT NULL,       -- 스탑로스 백분율
+    tp_percentage REAL NOT NULL,       -- 테이크프로핏 백분율
+    position_size_percentage REAL NOT NULL,  -- 자본 대비 포지션 크기
+    investment_amount REAL NOT NULL,   -- 투자 금액 (USDT)
+    status TEXT DEFAULT 'OPEN',        -- 거래 상태 (OPEN/CLOSED)
+    exit_price REAL,                   -- 청산 가격
+    exit_timestamp TEXT,               -- 청산 시간
+    profit_loss REAL,                  -- 손익 (USDT)
+    profit_loss_percentage REAL,       -- 손익 백분율
+    entry_order_id TEXT                -- 진입 주문 ID (중복 기록 방지 키)
+)
+"""
+
+CREATE_AI_ANALYSIS_SQL = """
+CREATE TABLE IF NOT EXISTS ai_analysis (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,               -- 분석 시간
+    current_price REAL NOT NULL,           -- 분석 시점 가격
+    direction TEXT NOT NULL,               -- 방향 추천 (LONG/SHORT/NO_POSITION)
+    recommended_position_size REAL NOT NULL,  -- 추천 포지션 크기
+    recommended_leverage INTEGER NOT NULL,    -- 추천 레버리지
+    stop_loss_percentage REAL NOT NULL,       -- 추천 스탑로스 비율
+    take_profit_percentage REAL NOT NULL,     -- 추천 테이크프로핏 비율
+    reasoning TEXT NOT NULL,                  -- 분석 근거 설명
+    trade_id INTEGER,                         -- 연결된 거래 ID
+    FOREIGN KEY (trade_id) REFERENCES trades (id)  -- 외래 키 설정
+)
+"""
+
+INSERT_AI_ANALYSIS_SQL = """
+INSERT INTO ai_analysis (
+    timestamp,
+    current_price,
+    direction,
+    recommended_position_size,
+    recommended_leverage,
+    stop_loss_percentage,
+    take_profit_percentage,
+    reasoning,
+    trade_id
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+INSERT_TRADE_SQL = """
+INSERT INTO trades (
+    timestamp,
+    action,
+    entry_price,
+    amount,
+    leverage,
+    sl_price,
+    tp_price,
+    sl_percentage,
+    tp_percentage,
+    position_size_percentage,
+    investment_amount,
+    entry_order_id
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# 진입/청산 시간과 결과를 이미 알고 있는 거래 기록 (백테스트 결과)
+INSERT_TRADE_HISTORY_SQL = """
+INSERT INTO trades (
+    timestamp,
+    action,
+    entry_price,
+    amount,
+    leverage,
+    sl_price,
+    tp_price,
+    sl_percentage,
+    tp_percentage,
+    position_size_percentage,
+    investment_amount,
+    status,
+    exit_price,
+    exit_timestamp,
+    profit_loss,
+    profit_loss_percentage,
+    entry_order_id
+) VALUES (
+    :timestamp,
+    :action,
+    :entry_price,
+    :amount,
+    :leverage,
+    :sl_price,
+    :tp_price,
+    :sl_percentage,
+    :tp_percentage,
+    :position_size_percentage,
+    :investment_amount,
+    :status,
+    :exit_price,
+    :exit_timestamp,
+    :profit_loss,
+    :profit_loss_percentage,
+    :entry_order_id
+)
+"""
+
+ADD_ENTRY_ORDER_ID_SQL = "ALTER TABLE trades ADD COLUMN entry_order_id TEXT"
+
+CREATE_ENTRY_ORDER_ID_INDEX_SQL = """
+CREATE UNIQUE INDEX IF NOT EXISTS idx_trades_entry_order_id
+ON trades (entry_order_id)
+WHERE entry_order_id IS NOT NULL
+"""
+
+SELECT_TRADE_BY_ENTRY_ORDER_SQL = """
+SELECT t.id, a.id
+FROM trades t
+LEFT JOIN ai_analysis a ON a.trade_id = t.id
+WHERE t.entry_order_id = ?
+LIMIT 1
+"""
+
+SELECT_LATEST_OPEN_TRADE_SQL = """
+SELECT id, action, entry_price, amount, leverage, sl_price, tp_price
+FROM trades
+WHERE status = 'OPEN'
+ORDER BY timestamp DESC  -- 가장 최근 거래 먼저
+LIMIT 1
+"""
+
+SELECT_TRADE_SUMMARY_SQL = """
+SELECT
+    COUNT(*) as total_trades,                            -- 총 거래 수
+    SUM(CASE WHEN profit_loss > 0 THEN 1 ELSE 0 END) as winning_trades,  -- 이익 거래 수
+    SUM(CASE WHEN profit_loss < 0 THEN 1 ELSE 0 END) as losing_trades,   -- 손실 거래 수
+    SUM(profit_loss) as total_profit_loss,               -- 총 손익
+    AVG(profit_loss_percentage) as avg_profit_loss_percentage  -- 평균 손익률
+FROM trades
+WHERE exit_timestamp IS NOT NULL  -- 청산된 거래만
+AND timestamp >= datetime('now', ?)  -- 지정된 일수 내 거래만
+"""
+
+SELECT_HISTORICAL_TRADING_SQL = """
+SELECT
+    t.id as trade_id,
+    t.timestamp as trade_timestamp,
+    t.action,
+    t.entry_price,
+    t.exit_price,
+    t.amount,
+    t.leverage,
+    t.sl_price,
+    t.tp_price,
+    t.sl_percentage,
+    t.tp_percentage,
+    t.position_size_percentage,
+    t.status,
+    t.profit_loss,
+    t.profit_loss_percentage,
+    a.id as analysis_id,
+    a.reasoning,
+    a.direction,
+    a.recommended_leverage,
+    a.recommended_position_size,
+    a.stop_loss_percentage,
+    a.take_profit_percentage
+FROM
+    trades t
+LEFT JOIN
+    ai_analysis a ON t.id = a.trade_id
+WHERE
+    t.status = 'CLOSED'  -- 완료된 거래만
+ORDER BY
+    t.timestamp DESC  -- 최신 거래 먼저
+LIMIT ?
+"""
+
+CREATE_PERFORMANCE_STATS_SQL = """
+CREATE TABLE IF NOT EXISTS performance_stats (
+    scope TEXT PRIMARY KEY,                    -- 'overall', 'long', 'short'
+    total_trades INTEGER NOT NULL DEFAULT 0,   -- 종료된 거래 수
+    winning_trades INTEGER NOT NULL DEFAULT 0, -- 이익 거래 수
+    losing_trades INTEGER NOT NULL DEFAULT 0,  -- 손실 거래 수
+    total_profit_loss REAL NOT NULL DEFAULT 0, -- 총 손익 (USDT)
+    sum_profit_loss_percentage REAL NOT NULL DEFAULT 0,  -- 손익률 합계
+    sum_win_percentage REAL NOT NULL DEFAULT 0,          -- 이익 거래 손익률 합계
+    sum_loss_percentage REAL NOT NULL DEFAULT 0,         -- 손실 거래 손익률 합계
+    pct_trades INTEGER NOT NULL DEFAULT 0,      -- 손익률이 기록된 거래 수
+    win_pct_trades INTEGER NOT NULL DEFAULT 0,  -- 손익률이 기록된 이익 거래 수
+    loss_pct_trades INTEGER NOT NULL DEFAULT 0, -- 손익률이 기록된 손실 거래 수
+    max_profit_percentage REAL,                -- 최대 손익률
+    max_loss_percentage REAL,                  -- 최소 손익률
+    updated_at TEXT                            -- 마지막 갱신 시간
+)
+"""
+
+# 마이그레이션 시 기존 종료 거래로 누적 집계를 한 번 채움
+BACKFILL_PERFORMANCE_STATS_SQL = """
+INSERT OR REPLACE INTO performance_stats
+SELECT
+    {scope} as scope,
+    COUNT(*),
+    SUM(CASE WHEN profit_loss > 0 THEN 1 ELSE 0 END),
+    SUM(CASE WHEN profit_loss < 0 THEN 1 ELSE 0 END),
+    COALESCE(SUM(profit_loss), 0),
+    COALESCE(SUM(profit_loss_percentage), 0),
+    COALESCE(SUM(CASE WHEN profit_loss > 0 THEN profit_loss_percentage END), 0),
+    COALESCE(SUM(CASE WHEN profit_loss < 0 THEN profit_loss_percentage END), 0),
+    COUNT(profit_loss_percentage),
+    COUNT(CASE WHEN profit_loss > 0 THEN profit_loss_percentage END),
+    COUNT(CASE WHEN profit_loss < 0 THEN profit_loss_percentage END),
+    MAX(profit_loss_percentage),
+    MIN(profit_loss_percentage),
+    datetime('now')
+FROM trades
+WHERE status = 'CLOSED'
+{group_by}
+HAVING COUNT(*) > 0
+"""
+
+SELECT_OPEN_TRADE_ACTION_SQL = "SELECT action FROM trades WHERE id = ? AND status = 'OPEN'"
+
+CLOSE_TRADE_SQL = """
+UPDATE trades
+SET status = 'CLOSED',
+    exit_price = ?,
+    exit_timestamp = ?,
+    profit_loss = ?,
+    profit_loss_percentage = ?
+WHERE id = ?
+"""
+
+# 거래 한 건 종료 시 해당 범위의 누적 집계를 O(1)로 갱신
+UPSERT_PERFORMANCE_STATS_SQL = """
+INSERT INTO performance_stats (
+    scope,
+    total_trades,
+    winning_trades,
+    losing_trades,
+    total_profit_loss,
+    sum_profit_loss_percentage,
+    sum_win_percentage,
+    sum_loss_percentage,
+    pct_trades,
+    win_pct_trades,
+    loss_pct_trades,
+    max_profit_percentage,
+    max_loss_percentage,
+    updated_at
+) VALUES (?, 1, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (scope) DO UPDATE SET
+    total_trades = total_trades + 1,
+    winning_trades = winning_trades + excluded.winning_trades,
+    losing_trades = losing_trades + excluded.losing_trades,
+    total_profit_loss = total_profit_loss + excluded.total_profit_loss,
+    sum_profit_loss_percentage = sum_profit_loss_percentage + excluded.sum_profit_loss_percentage,
+    sum_win_percentage = sum_win_percentage + excluded.sum_win_percentage,
+    sum_loss_percentage = sum_loss_percentage + excluded.sum_loss_percentage,
+    pct_trades = pct_trades + excluded.pct_trades,
+    win_pct_trades = win_pct_trades + excluded.win_pct_trades,
+    loss_pct_trades = loss_pct_trades + excluded.loss_pct_trades,
+    max_profit_percentage = MAX(
+        COALESCE(max_profit_percentage, excluded.max_profit_percentage),
+        COALESCE(excluded.max_profit_percentage, max_profit_percentage)
+    ),
+    max_loss_percentage = MIN(
+        COALESCE(max_loss_percentage, excluded.max_loss_percentage),
+        COALESCE(excluded.max_loss_percentage, max_loss_percentage)
+    ),
+    updated_at = excluded.updated_at
+"""
+
+SELECT_PERFORMANCE_STATS_SQL = """
+SELECT
+    scope,
+    total_trades,
+    winning_trades,
+    losing_trades,
+    total_profit_loss,
+    sum_profit_loss_percentage,
+    sum_win_percentage,
+    sum_loss_percentage,
+    max_profit_percentage,
+    max_loss_percentage,
+    pct_trades,
+    win_pct_trades,
+    loss_pct_trades
+FROM performance_stats
+"""
+
+# ===== 스키마 마이그레이션 =====
+# 각 마이그레이션은 (버전, 설명, 적용 함수) 형태이며 버전 순서대로 한 번씩만 실행됩니다.
+# 적용된 마지막 버전은 PRAGMA user_version에 기록됩니다.
+def _migrate_base_tables(conn):
+    """거래/AI 분석 기본 테이블 생성"""
+    conn.execute(CREATE_TRADES_SQL)
+    conn.execute(CREATE_AI_ANALYSIS_SQL)
+
+
+def _migrate_entry_order_id(conn):
+    """이전 버전 DB에 entry_order_id 컬럼 및 고유 인덱스 추가"""
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(trades)")]
+    if "entry_order_id" not in columns:
+        conn.execute(ADD_ENTRY_ORDER_ID_SQL)
+    conn.execute(CREATE_ENTRY_ORDER_ID_INDEX_SQL)
+
+
+def _migrate_access_path_indexes(conn):
+    """조회 경로별 보조 인덱스 추가"""
+    # 열린 거래 조회 / 완료 거래 최신순 조회 (status 필터 + timestamp 정렬)
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_trades_status_timestamp "
+        "ON trades (status, timestamp)"
+    )
+    # 기간별 거래 요약 및 대시보드 최신순 정렬 (요약 컬럼까지 포함하는 커버링 인덱스)
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_trades_timestamp "
+        "ON trades (timestamp, exit_timestamp, profit_loss, profit_loss_percentage)"
+    )
+    # 거래 - AI 분석 조인
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_ai_analysis_trade_id "
+        "ON ai_analysis (trade_id)"
+    )
+    # 대시보드 AI 분석 최신순 정렬
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_ai_analysis_timestamp "
+        "ON ai_analysis (timestamp)"
+    )
+
+
+def _migrate_performance_stats(conn):
+    """누적 성과 집계 테이블 생성 및 기존 종료 거래로 초기값 채우기"""
+    conn.execute(CREATE_PERFORMANCE_STATS_SQL)
+    conn.execute(BACKFILL_PERFORMANCE_STATS_SQL.format(scope="'overall'", group_by=""))
+    conn.execute(
+        BACKFILL_PERFORMANCE_STATS_SQL.format(scope="action", group_by="GROUP BY action")
+    )
+
+
+MIGRATIONS = [
+    (1, "기본 테이블 생성", _migrate_base_tables),
+    (2, "trades.entry_order_id 추가", _migrate_entry_order_id),
+    (3, "조회 경로 인덱스 추가", _migrate_access_path_indexes),
+    (4, "누적 성과 집계 테이블 추가", _migrate_performance_stats),
+]
+
+# 인덱스 회귀 점검 대상 쿼리 (이름, SQL, 예시 파라미터)
+QUERY_PLAN_CHECKS = [
+    ("latest_open_trade", SELECT_LATEST_OPEN_TRADE_SQL, ()),
+    ("trade_summary", SELECT_TRADE_SUMMARY_SQL, ("-7 days",)),
+    ("historical_trading", SELECT_HISTORICAL_TRADING_SQL, (10,)),
+    ("trade_by_entry_order", SELECT_TRADE_BY_ENTRY_ORDER_SQL, ("0",)),
+]
+
+
+def connect_database(db_file, cached_statements=64):
+    """
+    장기 사용용 SQLite 연결을 생성합니다
+
+    매개변수:
+        db_file (str): 데이터베이스 파일 경로
+        cached_statements (int): 재사용할 컴파일된 SQL 문 개수
+
+    반환값:
+        sqlite3.Connection: WAL 모드로 설정된 연결 (여러 스레드에서 공유 가능)
+    """
+    conn = sqlite3.connect(
+        db_file,
+        isolation_level=None,  # 자동 트랜잭션 비활성화 (명시적 BEGIN 사용)
+        check_same_thread=False,
+        cached_statements=cached_statements,
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")  # 다른 프로세스 잠금 시 5초 대기
+    return conn
+
+
+class TradeRepository:
+    """
+    트레이딩 데이터베이스 저장소
+
+    하나의 SQLite 연결을 프로그램 수명 동안 유지합니다.
+    - WAL 저널 모드: 대시보드가 같은 파일을 읽는 동안에도 쓰기가 막히지 않음
+    - synchronous=NORMAL: WAL 모드에서 커밋마다의 fsync 횟수 감소
+    - isolation_level=None: 트랜잭션은 transaction()으로만 명시적으로 시작
+    - statement cache: 고정된 SQL 문을 컴파일된 상태로 재사용
+    """
+
+    def __init__(self, db_file, cached_statements=64):
+        """
+        매개변수:
+            db_file (str): 데이터베이스 파일 경로
+            cached_statements (int): 재사용할 컴파일된 SQL 문 개수
+        """
+        self.db_file = db_file
+        self._lock = threading.RLock()  # 여러 스레드가 하나의 연결을 공유
+        self.conn = connect_database(db_file, cached_statements)
+
+    def close(self):
+        """데이터베이스 연결을 닫습니다"""
+        with self._lock:
+            self.conn.close()
+
+    @contextmanager
+    def transaction(self):
+        """
+        쓰기 트랜잭션 범위
+
+        블록 안의 모든 쓰기 작업을 하나의 커밋(한 번의 fsync)으로 묶습니다.
+        블록에서 예외가 발생하면 전체 작업을 롤백합니다.
+        중첩 호출 시 바깥 트랜잭션에 합류합니다.
+        """
+        with self._lock:
+            if self.conn.in_transaction:
+                yield self.conn
+                return
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.conn
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            else:
+                self.conn.execute("COMMIT")
+
+    # ===== 스키마 =====
+    def setup_database(self):
+        """
+        데이터베이스 및 필요한 테이블 생성
+
+        거래 기록과 AI 분석 결과를 저장하기 위한 테이블을 생성합니다.
+        - trades: 모든 거래 정보 (진입가, 청산가, 손익 등)
+        - ai_analysis: AI의 분석 결과 및 추천 사항
+
+        아직 적용되지 않은 마이그레이션을 버전 순서대로 실행한 뒤,
+        주요 조회 쿼리가 전체 테이블 스캔을 하지 않는지 점검합니다.
+        """
+        current_version = self.get_schema_version()
+        for version, description, migrate in MIGRATIONS:
+            if version <= current_version:
+                continue
+            # 마이그레이션 본문과 버전 기록을 같은 트랜잭션으로 커밋
+            with self.transaction() as conn:
+                migrate(conn)
+                conn.execute(f"PRAGMA user_version = {version}")
+            print(f"스키마 마이그레이션 적용: v{version} ({description})")
+
+        for name, details in self.find_full_scans().items():
+            print(f"경고: {name} 쿼리가 인덱스를 사용하지 않습니다 - {details}")
+        print("데이터베이스 설정 완료")
+
+    def get_schema_version(self):
+        """
+        현재 적용된 스키마 버전을 반환합니다
+
+        반환값:
+            int: PRAGMA user_version 값 (마이그레이션 전이면 0)
+        """
+        with self._lock:
+            return self.conn.execute("PRAGMA user_version").fetchone()[0]
+
+    def explain_query_plans(self):
+        """
+        주요 조회 쿼리의 실행 계획을 조회합니다 (EXPLAIN QUERY PLAN)
+
+        반환값:
+            dict: 쿼리 이름별 실행 계획 설명 문자열 목록
+        """
+        plans = {}
+        with self._lock:
+            for name, sql, params in QUERY_PLAN_CHECKS:
+                rows = self.conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+                plans[name] = [row[3] for row in rows]
+        return plans
+
+    def find_full_scans(self):
+        """
+        인덱스 없이 테이블 전체를 읽거나 임시 정렬이 필요한 쿼리를 찾습니다
+
+        반환값:
+            dict: 문제가 있는 쿼리 이름별 해당 실행 계획 단계 목록 (없으면 빈 dict)
+        """
+        regressions = {}
+        for name, details in self.explain_query_plans().items():
+            bad_steps = [
+                detail
+                for detail in details
+                if (detail.startswith("SCAN") and "INDEX" not in detail)
+                or "TEMP B-TREE" in detail
+            ]
+            if bad_steps:
+                regressions[name] = bad_steps
+        return regressions
+
+    # ===== 쓰기 작업 =====
+    def save_ai_analysis(self, analysis_data, trade_id=None):
+        """
+        AI 분석 결과를 데이터베이스에 저장
+
+        매개변수:
+            analysis_data (dict): AI 분석 결과 데이터
+            trade_id (int, optional): 연결된 거래 ID
+
+        반환값:
+            int: 생성된 분석 기록의 ID
+        """
+        with self.transaction() as conn:
+            return self._insert_ai_analysis(conn, analysis_data, trade_id)
+
+    def save_trade(self, trade_data):
+        """
+        거래 정보를 데이터베이스에 저장
+
+        매개변수:
+            trade_data (dict): 거래 정보 데이터
+
+        반환값:
+            int: 생성된 거래 기록의 ID
+        """
+        with self.transaction() as conn:
+            return self._insert_trade(conn, trade_data)
+
+    def record_trade_open(self, analysis_data, trade_data):
+        """
+        포지션 진입 시 AI 분석, 거래, 두 기록의 연결을 하나의 커밋으로 저장합니다
+
+        분석 행은 trade_id가 채워진 상태로 바로 추가되므로 별도의 UPDATE가 필요 없고,
+        중간에 프로그램이 중단되어도 연결되지 않은 분석 행이 남지 않습니다.
+        trade_data에 entry_order_id가 있으면 같은 주문이 이미 기록된 경우
+        새로 추가하지 않고 기존 기록의 ID를 반환합니다 (재시도 시 중복 방지).
+
+        매개변수:
+            analysis_data (dict): AI 분석 결과 데이터
+            trade_data (dict): 거래 정보 데이터 (entry_order_id 포함 권장)
+
+        반환값:
+            tuple: (거래 ID, 분석 기록 ID)
+        """
+        entry_order_id = trade_data.get("entry_order_id")
+        with self.transaction() as conn:
+            if entry_order_id is not None:
+                existing = conn.execute(
+                    SELECT_TRADE_BY_ENTRY_ORDER_SQL, (entry_order_id,)
+                ).fetchone()
+                if existing:
+                    trade_id, analysis_id = existing
+                    if analysis_id is None:
+                        analysis_id = self._insert_ai_analysis(
+                            conn, analysis_data, trade_id
+                        )
+                    return trade_id, analysis_id
+
+            trade_id = self._insert_trade(conn, trade_data)
+            analysis_id = self._insert_ai_analysis(conn, analysis_data, trade_id)
+            return trade_id, analysis_id
+
+    def import_trades(self, trades):
+        """
+        진입/청산 결과까지 정해진 거래 기록을 한 번의 커밋으로 추가합니다 (백테스트 결과 저장)
+
+        추가 후 누적 성과 집계를 전체 종료 거래로 다시 계산합니다.
+
+        매개변수:
+            trades (list): trades 테이블 컬럼 이름을 키로 가진 dict 목록
+                (열린 거래는 status='OPEN', 청산 필드는 None)
+
+        반환값:
+            int: 추가한 거래 수
+        """
+        with self.transaction() as conn:
+            conn.executemany(INSERT_TRADE_HISTORY_SQL, trades)
+            conn.execute(
+                BACKFILL_PERFORMANCE_STATS_SQL.format(scope="'overall'", group_by="")
+            )
+            conn.execute(
+                BACKFILL_PERFORMANCE_STATS_SQL.format(
+                    scope="action", group_by="GROUP BY action"
+                )
+            )
+        return len(trades)
+
+    def close_trade(
+        self,
+        trade_id,
+        exit_price,
+        exit_timestamp,
+        profit_loss,
+        profit_loss_percentage,
+    ):
+        """
+        열린 거래를 종료하고 누적 성과 집계를 함께 갱신합니다
+
+        거래 종료와 전체/방향별 집계 갱신은 하나의 트랜잭션으로 커밋됩니다.
+        이미 종료된 거래에 대해 다시 호출하면 아무것도 변경하지 않습니다.
+
+        매개변수:
+            trade_id (int): 종료할 거래의 ID
+            exit_price (float): 청산 가격
+            exit_timestamp (str): 청산 시간
+            profit_loss (float): 손익 금액
+            profit_loss_percentage (float): 손익 비율
+
+        반환값:
+            bool: 거래가 새로 종료되었으면 True
+        """
+        is_win = profit_loss is not None and profit_loss > 0
+        is_loss = profit_loss is not None and profit_loss < 0
+        # 손익률이 없는 거래는 손익률 합계/평균의 분모에서 제외 (AVG와 같은 NULL 처리)
+        has_pct = profit_loss_percentage is not None
+        pnl_pct = profit_loss_percentage if has_pct else 0
+
+        with self.transaction() as conn:
+            row = conn.execute(SELECT_OPEN_TRADE_ACTION_SQL, (trade_id,)).fetchone()
+            if row is None:
+                return False  # 없는 거래이거나 이미 종료됨
+
+            conn.execute(
+                CLOSE_TRADE_SQL,
+                (
+                    exit_price,
+                    exit_timestamp,
+                    profit_loss,
+                    profit_loss_percentage,
+                    trade_id,
+                ),
+            )
+
+            updated_at = datetime.now().isoformat()
+            for scope in ("overall", row[0]):
+                conn.execute(
+                    UPSERT_PERFORMANCE_STATS_SQL,
+                    (
+                        scope,
+                        int(is_win),
+                        int(is_loss),
+                        profit_loss or 0,
+                        pnl_pct,
+                        pnl_pct if is_win else 0,
+                        pnl_pct if is_loss else 0,
+                        int(has_pct),
+                        int(has_pct and is_win),
+                        int(has_pct and is_loss),
+                        profit_loss_percentage,
+                        profit_loss_percentage,
+                        updated_at,
+                    ),
+                )
+            return True
+
+    @staticmethod
+    def _insert_ai_analysis(conn, analysis_data, trade_id=None):
+        """현재 트랜잭션 안에서 ai_analysis 행을 추가하고 ID를 반환합니다"""
+        cursor = conn.execute(
+            INSERT_AI_ANALYSIS_SQL,
+            (
+                datetime.now().isoformat(),  # 현재 시간
+                analysis_data.get("current_price", 0),  # 현재 가격
+                analysis_data.get("direction", "NO_POSITION"),  # 추천 방향
+                analysis_data.get("recommended_position_size", 0),  # 추천 포지션 크기
+                analysis_data.get("recommended_leverage", 0),  # 추천 레버리지
+                analysis_data.get("stop_loss_percentage", 0),  # 스탑로스 비율
+                analysis_data.get("take_profit_percentage", 0),  # 테이크프로핏 비율
+                analysis_data.get("reasoning", ""),  # 분석 근거
+                trade_id,  # 연결된 거래 ID
+            ),
+        )
+        return cursor.lastrowid
+
+    @staticmethod
+    def _insert_trade(conn, trade_data):
+        """현재 트랜잭션 안에서 trades 행을 추가하고 ID를 반환합니다"""
+        cursor = conn.execute(
+            INSERT_TRADE_SQL,
+            (
+                datetime.now().isoformat(),  # 진입 시간
+                trade_data.get("action", ""),  # 포지션 방향
+                trade_data.get("entry_price", 0),  # 진입 가격
+                trade_data.get("amount", 0),  # 거래량
+                trade_data.get("leverage", 0),  # 레버리지
+                trade_data.get("sl_price", 0),  # 스탑로스 가격
+                trade_data.get("tp_price", 0),  # 테이크프로핏 가격
+                trade_data.get("sl_percentage", 0),  # 스탑로스 비율
+                trade_data.get("tp_percentage", 0),  # 테이크프로핏 비율
+                trade_data.get("position_size_percentage", 0),  # 자본 대비 포지션 크기
+                trade_data.get("investment_amount", 0),  # 투자 금액
+                trade_data.get("entry_order_id"),  # 진입 주문 ID
+            ),
+        )
+        return cursor.lastrowid
+
+    # ===== 읽기 작업 =====
+    def get_latest_open_trade(self):
+        """
+        가장 최근의 열린 거래 정보를 가져옵니다
+
+        반환값:
+            dict: 거래 정보 또는 None (열린 거래가 없는 경우)
+        """
+        with self._lock:
+            result = self.conn.execute(SELECT_LATEST_OPEN_TRADE_SQL).fetchone()
+
+        # 결과가 있을 경우 사전 형태로 변환하여 반환
+        if result:
+            return {
+                "id": result[0],
+                "action": result[1],
+                "entry_price": result[2],
+                "amount": result[3],
+                "leverage": result[4],
+                "sl_price": result[5],
+                "tp_price": result[6],
+            }
+        return None  # 열린 거래가 없음
+
+    def get_trade_summary(self, days=7):
+        """
+        지정된 일수 동안의 거래 요약 정보를 가져옵니다
+
+        매개변수:
+            days (int): 요약할 기간(일)
+
+        반환값:
+            dict: 거래 요약 정보 또는 None
+        """
+        with self._lock:
+            result = self.conn.execute(
+                SELECT_TRADE_SUMMARY_SQL, (f"-{days} days",)
+            ).fetchone()
+
+        # 결과가 있을 경우 사전 형태로 변환하여 반환
+        if result:
+            return {
+                "total_trades": result[0] or 0,
+                "winning_trades": result[1] or 0,
+                "losing_trades": result[2] or 0,
+                "total_profit_loss": result[3] or 0,
+                "avg_profit_loss_percentage": result[4] or 0,
+            }
+        return None
+
+    def get_historical_trading_data(self, limit=10):
+        """
+        과거 거래 내역과 관련 AI 분석 결과를 가져옵니다
+
+        매개변수:
+            limit (int): 가져올 최대 거래 기록 수
+
+        반환값:
+            list: 거래 및 분석 데이터 사전 목록
+        """
+        with self._lock:
+            cursor = self.conn.execute(SELECT_HISTORICAL_TRADING_SQL, (limit,))
+            columns = [description[0] for description in cursor.description]
+            results = cursor.fetchall()
+
+        # 결과를 사전 목록으로 변환
+        return [dict(zip(columns, row)) for row in results]
+
+    def get_performance_metrics(self):
+        """
+        거래 성과 메트릭스를 계산합니다
+
+        이 함수는 다음을 포함한 전체 및 방향별(롱/숏) 성과 지표를 계산합니다:
+        - 총 거래 수
+        - 승률
+        - 평균 수익률
+        - 최대 이익/손실
+        - 방향별 성과
+
+        반환값:
+            dict: 성과 메트릭스 데이터
+        """
+        # 누적 집계 테이블에서 전체/방향별 행만 읽음 (거래 수와 무관한 비용)
+        with self._lock:
+            rows = self.conn.execute(SELECT_PERFORMANCE_STATS_SQL).fetchall()
+
+        stats = {row[0]: row for row in rows}
+        overall = stats.get("overall")
+
+        # 결과 구성
+        metrics = {
+            "overall": {
+                "total_trades": 0,
+                "winning_trades": 0,
+                "losing_trades": 0,
+                "total_profit_loss": 0,
+                "avg_profit_loss_percentage": 0,
+                "max_profit_percentage": 0,
+                "max_loss_percentage": 0,
+                "avg_win_percentage": 0,
+                "avg_loss_percentage": 0,
+            },
+            "directional": {},
+        }
+        if overall and overall[1] > 0:
+            metrics["overall"] = {
+                "total_trades": overall[1],
+                "winning_trades": overall[2],
+                "losing_trades": overall[3],
+                "total_profit_loss": overall[4],
+                "avg_profit_loss_percentage": (
+                    overall[5] / overall[10] if overall[10] else 0
+                ),
+                "max_profit_percentage": overall[8] or 0,
+                "max_loss_percentage": overall[9] or 0,
+                "avg_win_percentage": overall[6] / overall[11] if overall[11] else 0,
+                "avg_loss_percentage": overall[7] / overall[12] if overall[12] else 0,
+            }
+
+        # 승률 계산
+        if metrics["overall"]["total_trades"] > 0:
+            metrics["overall"]["win_rate"] = (
+                metrics["overall"]["winning_trades"]
+                / metrics["overall"]["total_trades"]
+            ) * 100
+        else:
+            metrics["overall"]["win_rate"] = 0
+
+        # 방향별 메트릭스 추가
+        for action, row in stats.items():
+            if action == "overall":
+                continue
+            total = row[1] or 0
+            winning = row[2] or 0
+
+            direction_metrics = {
+                "total_trades": total,
+                "winning_trades": winning,
+                "losing_trades": row[3] or 0,
+                "total_profit_loss": row[4] or 0,
+                "avg_profit_loss_percentage": (row[5] / row[10]) if row[10] else 0,
+                "win_rate": (winning / total * 100) if total > 0 else 0,
+            }
+
+            metrics["directional"][action] = direction_metrics
+
+        return metrics
@@ -0,0 +1,143 @@
+"""
+거래 성과 지표 계산
+--------------------------------------------------------
+기능:
+- 종료된 거래 배열로 대시보드(app_future.calculate_trading_metrics)와 같은 방식의
+  수익률, 샤프 비율, 승률, 손익비, 최대 낙폭 계산
+- 차트용 시간 구간 지표: 일별 손익/수익률, 이동 샤프 비율
+- Streamlit/DataFrame 없이 NumPy 배열만 사용 (백테스트/파라미터 탐색 작업 프로세스용)
+--------------------------------------------------------
+"""
+
+import numpy as np  # 벡터 연산
+
+EMPTY_METRICS = {
+    "total_return": 0,
+    "sharpe_ratio": 0,
+    "win_rate": 0,
+    "profit_factor": 0,
+    "max_drawdown": 0,
+    "total_trades": 0,
+    "avg_profit_loss": 0,
+}
+
+ANNUALIZATION = 365  # 샤프 비율 연율화 기간 수
+
+
+def estimate_initial_investment(entry_price, amount):
+    """
+    초기 투자 금액 추정 (처음 3개 거래의 평균 진입가 × 평균 수량)
+
+    너무 작은 경우(100 미만) 10000으로 설정합니다.
+    """
+    initial_investment = entry_price[:3].mean() * amount[:3].mean()
+    if initial_investment < 100:  # 너무 작은 경우 합리적인 값으로 설정
+        initial_investment = 10000
+    return float(initial_investment)
+
+
+def closed_trade_metrics(entry_price, amount, profit_loss, profit_loss_percentage):
+    """
+    종료된 거래의 성과 지표를 계산합니다
+
+    모든 배열은 거래 시작 시간 순서로 정렬되어 있어야 합니다.
+
+    매개변수:
+        entry_price (ndarray): 진입 가격
+        amount (ndarray): 거래량
+        profit_loss (ndarray): 손익 (USDT)
+        profit_loss_percentage (ndarray): 손익률 (%)
+
+    반환값:
+        dict: total_return, sharpe_ratio, win_rate, profit_factor,
+            max_drawdown, total_trades, avg_profit_loss
+    """
+    total_trades = len(profit_loss)
+    if total_trades == 0:
+        return dict(EMPTY_METRICS)
+
+    initial_investment = estimate_initial_investment(entry_price, amount)
+    total_profit_loss = profit_loss.sum()
+    total_return = (total_profit_loss / initial_investment) * 100
+
+    # 승률 / 손익비
+    win_rate = (profit_loss > 0).sum() / total_trades * 100
+    total_profit = profit_loss[profit_loss > 0].sum()
+    total_loss = abs(profit_loss[profit_loss < 0].sum())
+    profit_factor = total_profit / total_loss if total_loss > 0 else 0
+
+    # 최대 낙폭 (각 거래 후 계좌 잔고 기준)
+    balances = initial_investment + np.cumsum(profit_loss)
+    peak_balances = np.maximum.accumulate(balances)
+    max_drawdown = ((peak_balances - balances) / peak_balances).max() * 100
+
+    # 샤프 비율 (거래별 수익률, 표본 표준편차)
+    if total_trades > 1:
+        returns = profit_loss_percentage / 100
+        std = returns.std(ddof=1)
+        sharpe_ratio = (returns.mean() / std) * np.sqrt(ANNUALIZATION) if std > 0 else 0
+    else:
+        sharpe_ratio = 0
+
+    return {
+        "total_return": float(total_return),
+        "sharpe_ratio": float(sharpe_ratio),
+        "win_rate": float(win_rate),
+        "profit_factor": float(profit_factor),
+        "max_drawdown": float(max_drawdown),
+        "total_trades": total_trades,
+        "avg_profit_loss": float(profit_loss.mean()),
+    }
+
+
+def daily_returns(days, profit_loss, initial_investment):
+    """
+    실현 손익을 일별로 합산하고 전일 잔고 대비 수익률을 계산합니다
+
+    거래가 없는 날은 손익 0으로 포함하여 첫날부터 마지막 날까지 연속된 구간을 반환합니다.
+
+    매개변수:
+        days (ndarray): 거래별 손익 실현 날짜 (datetime64[D], 순서 무관)
+        profit_loss (ndarray): 거래별 손익 (USDT)
+        initial_investment (float): 첫날 시작 잔고
+
+    반환값:
+        tuple: (날짜 ndarray, 일별 손익 ndarray, 일별 수익률 ndarray)
+    """
+    if len(days) == 0:
+        return np.array([], dtype="datetime64[D]"), np.array([]), np.array([])
+    first_day = days.min()
+    dates = np.arange(first_day, days.max() + 1)
+    pnl = np.bincount(
+        (days - first_day).astype(np.int64), weights=profit_loss, minlength=len(dates)
+    )
+    start_balances = initial_investment + np.concatenate(([0.0], np.cumsum(pnl)[:-1]))
+    return dates, pnl, pnl / start_balances
+
+
+def rolling_sharpe(returns, window, periods_per_year=ANNUALIZATION):
+    """
+    이동 구간 샤프 비율 (표본 표준편차, 연율화)
+
+    매개변수:
+        returns (ndarray): 기간별 수익률
+        window (int): 이동 구간 길이 (2 이상)
+        periods_per_year (int): 연율화 기간 수
+
+    반환값:
+        ndarray: 구간이 다 차지 않았거나 변동이 없는 위치는 NaN
+    """
+    result = np.full(len(returns), np.nan)
+    if window < 2 or len(returns) < window:
+        return result
+    sums = np.cumsum(np.concatenate(([0.0], returns)))
+    squares = np.cumsum(np.concatenate(([0.0], returns**2)))
+    window_sum = sums[window:] - sums[:-window]
+    window_squares = squares[window:] - squares[:-window]
+    mean = window_sum / window
+    variance = np.maximum(window_squares - window * mean**2, 0) / (window - 1)
+    std = np.sqrt(variance)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(std > 1e-12, mean / std * np.sqrt(periods_per_year), np.nan)
+    result[window - 1 :] = sharpe
+    return result